@@ -0,0 +1,136 @@
+"""
+Control de admisión: límites por cliente y de concurrencia por ruta.
+
+Las reglas se definen en `ADMISSION_CONTROL` por nombre de ruta. El estado
+vive en la caché `ADMISSION_CACHE_ALIAS`, que debe ser compartida (Redis,
+Memcached) para que los límites valgan para todos los procesos. Sobre una
+caché local sólo se registra una advertencia, salvo con `REQUIRE_SHARED_CACHE`,
+que impide arrancar.
+
+El cliente se identifica por su API key o por su IP. La IP es `REMOTE_ADDR`
+salvo que `NUM_PROXIES` de DRF declare cuántos proxies de confianza hay
+delante: entonces se toma de `X-Forwarded-For` contando desde la derecha, de
+modo que un cliente no puede elegir su cubeta enviando la cabecera.
+"""
+import hashlib
+import logging
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+from .cache import is_shared_cache
+
+logger = logging.getLogger(__name__)
+
+# Prefijo de las claves de control de admisión en la caché
+KEY_PREFIX = 'warehouse:admission:'
+
+# Cabecera con la que un cliente se identifica por API key
+API_KEY_HEADER = 'X-Api-Key'
+
+
+def get_cache():
+    return caches[getattr(settings, 'ADMISSION_CACHE_ALIAS', 'default')]
+
+
+def check_cache():
+    """
+    Advierte si `ADMISSION_CACHE_ALIAS` no es una caché compartida entre
+    procesos: cada worker aplicaría sus propios límites. Con
+    `REQUIRE_SHARED_CACHE` lanza `ImproperlyConfigured` en su lugar.
+    """
+    alias = getattr(settings, 'ADMISSION_CACHE_ALIAS', 'default')
+    if is_shared_cache(alias):
+        return
+    message = (
+        f"ADMISSION_CONTROL necesita una caché compartida entre procesos y ADMISSION_CACHE_ALIAS='{alias}' "
+        f"es local al proceso; configure CACHE_REDIS_URL o desactive las reglas."
+    )
+    if getattr(settings, 'REQUIRE_SHARED_CACHE', False):
+        raise ImproperlyConfigured(message)
+    logger.warning(message)
+
+
+def get_rule(route):
+    """
+    Regla de admisión de la ruta `route`, o `None` si no tiene límites.
+    """
+    return getattr(settings, 'ADMISSION_CONTROL', {}).get(route)
+
+
+def get_client_ident(request):
+    """
+    Identificador del cliente: su API key (resumida) o, si no envía una, su IP
+    (`REMOTE_ADDR`, o `X-Forwarded-For` sólo si `NUM_PROXIES` lo permite).
+    """
+    api_key = request.headers.get(API_KEY_HEADER)
+    if api_key:
+        return 'key:' + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+    return 'ip:' + BaseThrottle().get_ident(request)
+
+
+class TokenBucket:
+    """
+    Cubeta de tokens de `rate` peticiones por segundo con capacidad `burst`.
+
+    Se implementa como GCRA: por cada cliente sólo se guarda el instante
+    teórico de la próxima llegada, así que cada comprobación es una lectura y
+    una escritura en la caché. Entre procesos la lectura y la escritura no son
+    atómicas; en una carrera se puede admitir alguna petición de más.
+    """
+
+    def __init__(self, cache, rate, burst):
+        self.cache = cache
+        self.interval = 1 / rate
+        self.tolerance = self.interval * burst
+
+    def take(self, key):
+        """
+        Consume un token. Retorna 0 si se admite la petición o los segundos que
+        hay que esperar para el próximo token.
+        """
+        now = time.time()
+        arrival = max(self.cache.get(key) or now, now) + self.interval
+        wait = arrival - now - self.tolerance
+        if wait > 0:
+            return wait
+        self.cache.set(key, arrival, timeout=math.ceil(self.tolerance) + 1)
+        return 0
+
+
+class ConcurrencyLimiter:
+    """
+    Semáforo de `limit` plazas compartido a través de la caché.
+
+    Cada plaza es una clave que se ocupa con `cache.add` (atómico en Redis,
+    Memcached y la caché local) y expira tras `lease` segundos por si el
+    proceso que la ocupa muere sin liberarla. Nunca espera: si no hay plaza
+    libre retorna `None` de inmediato.
+    """
+
+    def __init__(self, cache, name, limit, lease):
+        self.cache = cache
+        self.name = name
+        self.limit = limit
+        self.lease = lease
+
+    def acquire(self):
+        token = uuid.uuid4().hex
+        start = random.randrange(self.limit)
+        for offset in range(self.limit):
+            slot = f'{KEY_PREFIX}slot:{self.name}:{(start + offset) % self.limit}'
+            if self.cache.add(slot, token, timeout=self.lease):
+                return slot, token
+        return None
+
+    def release(self, held):
+        slot, token = held
+        # Sólo se libera la plaza si sigue siendo nuestra (no expiró y la tomó otro).
+        if self.cache.get(slot) == token:
+            self.cache.delete(slot)
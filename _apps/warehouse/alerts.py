@@ -0,0 +1,215 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+# Configurar el logger
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LowStockAlert:
+    """
+    Alerta de stock bajo de un producto.
+    """
+    product_id: str
+    sku: str
+    name: str
+    stock: str
+    threshold: int
+    created_at: datetime
+
+    @classmethod
+    def from_product(cls, product):
+        return cls(
+            product_id=str(product.pk),
+            sku=product.sku,
+            name=product.name,
+            stock=str(product.stock),
+            threshold=product.low_stock_threshold,
+            created_at=timezone.now(),
+        )
+
+
+class LogSink:
+    """
+    Escribe cada alerta como warning en el logger de la app.
+    """
+    def send(self, alerts):
+        for alert in alerts:
+            logger.warning(f"Alerta: El stock del producto '{alert.name}' es bajo ({alert.stock}).")
+
+
+class DatabaseSink:
+    """
+    Guarda las alertas en la tabla `StockAlert` con una sola inserción por lote.
+
+    Las alertas de productos eliminados antes del envío se guardan sin
+    producto, igual que las que quedan al eliminarlo después.
+    """
+    def send(self, alerts):
+        from .models import Product, StockAlert
+
+        existing = {
+            str(pk) for pk in Product.objects.filter(pk__in=[alert.product_id for alert in alerts]).values_list('pk', flat=True)
+        }
+        StockAlert.objects.bulk_create([
+            StockAlert(
+                product_id=alert.product_id if alert.product_id in existing else None,
+                sku=alert.sku,
+                name=alert.name,
+                stock=alert.stock,
+                threshold=alert.threshold,
+                created_at=alert.created_at,
+            )
+            for alert in alerts
+        ])
+
+
+class WebhookSink:
+    """
+    Envía el lote de alertas como JSON a `LOW_STOCK_ALERT_WEBHOOK_URL`.
+    """
+    def send(self, alerts):
+        import requests
+
+        url = getattr(settings, 'LOW_STOCK_ALERT_WEBHOOK_URL', '')
+        if not url:
+            return
+        payload = [{**asdict(alert), 'created_at': alert.created_at.isoformat()} for alert in alerts]
+        requests.post(url, json={'alerts': payload}, timeout=5)
+
+
+class AlertDispatcher:
+    """
+    Despachador de alertas de stock bajo fuera del camino de la petición.
+
+    `enqueue` sólo agrega la alerta a una cola acotada; un hilo en segundo
+    plano la vacía cada `LOW_STOCK_ALERT_FLUSH_INTERVAL` segundos, descarta
+    las alertas repetidas de un mismo SKU dentro de `LOW_STOCK_ALERT_DEDUP_SECONDS`
+    y entrega cada lote a los destinos configurados en `LOW_STOCK_ALERT_SINKS`.
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._sinks = None
+        self._last_sent = {}
+        self.dropped = 0
+
+    def _settings(self, name, default):
+        return getattr(settings, name, default)
+
+    @property
+    def sinks(self):
+        if self._sinks is None:
+            self._sinks = [
+                import_string(path)()
+                for path in self._settings('LOW_STOCK_ALERT_SINKS', ['_apps.warehouse.alerts.LogSink'])
+            ]
+        return self._sinks
+
+    def enqueue(self, product, using=DEFAULT_DB_ALIAS):
+        """
+        Encola una alerta para el producto sin bloquear al llamador, cuando se
+        confirme la transacción en curso; si se revierte, no hay alerta.
+        """
+        alert = LowStockAlert.from_product(product)
+        transaction.on_commit(lambda: self._put(alert), using=using, robust=True)
+
+    def _put(self, alert):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """
+        Vacía la cola y entrega a los destinos las alertas no duplicadas.
+
+        Returns:
+            int: Cantidad de alertas entregadas.
+        """
+        if self._queue is None:
+            return 0
+
+        delivered = 0
+        batch_size = self._settings('LOW_STOCK_ALERT_BATCH_SIZE', 500)
+        window = self._settings('LOW_STOCK_ALERT_DEDUP_SECONDS', 300)
+        with self._flush_lock:
+            while not self._queue.empty():
+                # Se conserva la alerta más reciente de cada SKU del lote.
+                pending = {}
+                while len(pending) < batch_size:
+                    try:
+                        alert = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    pending[alert.sku] = alert
+
+                now = time.monotonic()
+                self._last_sent = {sku: sent for sku, sent in self._last_sent.items() if now - sent < window}
+                alerts = [alert for sku, alert in pending.items() if sku not in self._last_sent]
+                if not alerts:
+                    continue
+
+                for sink in self.sinks:
+                    try:
+                        sink.send(alerts)
+                    except Exception:
+                        logger.exception(f"Error al enviar alertas de stock con {type(sink).__name__}")
+                for alert in alerts:
+                    self._last_sent[alert.sku] = now
+                delivered += len(alerts)
+        return delivered
+
+    def reset(self):
+        """
+        Descarta las alertas pendientes, la deduplicación y los destinos cargados.
+        """
+        with self._flush_lock:
+            if self._queue is not None:
+                while not self._queue.empty():
+                    self._queue.get_nowait()
+            self._last_sent = {}
+            self._sinks = None
+
+    def _ensure_worker(self):
+        # El hilo no sobrevive a un fork: cada proceso arranca el suyo.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self._settings('LOW_STOCK_ALERT_QUEUE_SIZE', 10000))
+            self._last_sent = {}
+            self._pid = os.getpid()
+            if self._settings('LOW_STOCK_ALERT_WORKER', True):
+                self._thread = threading.Thread(target=self._run, name='low-stock-alerts', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        interval = self._settings('LOW_STOCK_ALERT_FLUSH_INTERVAL', 5)
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+alert_dispatcher = AlertDispatcher()
+atexit.register(alert_dispatcher.flush)
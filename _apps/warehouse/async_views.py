@@ -0,0 +1,200 @@
+"""
+Vistas asíncronas para servir lecturas de productos y pedidos bajo ASGI.
+
+Responden en las mismas rutas, con los mismos nombres y el mismo formato que
+las vistas de `views.py`. Sólo los caminos calientes (listar y consultar
+productos, crear un pedido JSON, exportar el catálogo) son nativamente
+asíncronos; el resto de métodos se delega en la vista síncrona equivalente.
+El stream de stock sólo existe bajo ASGI.
+
+Las vistas nativas no pasan por `APIView`, así que no aplican las clases de
+autenticación, permisos ni throttling de DRF; el control de admisión de
+`AdmissionControlMiddleware` sí las cubre.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .cache import product_cache
+from .events import Subscription, broker, stock_event, stream_events
+from .exporter import EXPORT_FORMATS, agzip_stream, aiter_export
+from .fastpath import PRODUCT_COLUMNS, fast_serialization_enabled, map_product_row
+from .filters import ProductSearchFilter
+from .idempotency import IDEMPOTENCY_HEADER
+from .metrics import registry
+from .models import Product
+from .pagination import AsyncProductCursorPagination
+from .renderers import FastJSONRenderer
+from .routers import is_pinned
+from .serializers import OrderSerializer, ProductSerializer, StockStreamSerializer
+from .views import OrderCreateView, ProductListCreateView, ProductRetrieveUpdateDestroyView, export_response
+
+_list_create_view = sync_to_async(ProductListCreateView.as_view())
+_detail_view = sync_to_async(ProductRetrieveUpdateDestroyView.as_view())
+_order_view = sync_to_async(OrderCreateView.as_view())
+
+
+def json_response(data, status=status.HTTP_200_OK, headers=None):
+    """
+    Respuesta JSON codificada con el mismo renderer que usa DRF.
+    """
+    return HttpResponse(FastJSONRenderer().render(data), status=status, headers=headers, content_type='application/json')
+
+
+@csrf_exempt
+async def product_list_create(request):
+    """
+    Lista productos paginados por cursor y filtrados con `ProductSearchFilter`;
+    el resto de métodos se delega.
+    """
+    if request.method != 'GET':
+        return await _list_create_view(request)
+
+    fast = fast_serialization_enabled()
+    paginator = AsyncProductCursorPagination()
+    try:
+        queryset = ProductSearchFilter().filter_queryset(Request(request), Product.objects.all(), None)
+        if fast:
+            queryset = queryset.values_list(*PRODUCT_COLUMNS, named=True)
+        page = await paginator.apaginate_queryset(queryset, request)
+    except ValidationError as exc:
+        return json_response(exc.detail, status=status.HTTP_400_BAD_REQUEST)
+    except NotFound as exc:
+        return json_response({'detail': exc.detail}, status=status.HTTP_404_NOT_FOUND)
+
+    return json_response({
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'results': [map_product_row(row) for row in page] if fast else ProductSerializer(page, many=True).data,
+    })
+
+
+@csrf_exempt
+async def product_detail(request, pk):
+    """
+    Devuelve un producto desde la caché de lectura con ETag, salvo a los
+    clientes fijados en la primaria (como la vista síncrona); el resto de
+    métodos se delega.
+    """
+    if request.method != 'GET':
+        return await _detail_view(request, pk=pk)
+
+    async def load():
+        if fast_serialization_enabled():
+            return map_product_row(await Product.objects.values_list(*PRODUCT_COLUMNS).aget(pk=pk))
+        return ProductSerializer(await Product.objects.aget(pk=pk)).data
+
+    try:
+        data, etag = await product_cache.aget(pk, load, refresh=is_pinned())
+    except Product.DoesNotExist:
+        return json_response({'detail': 'No Product matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return json_response(data, headers={'ETag': etag})
+
+
+@csrf_exempt
+async def order_create(request):
+    """
+    Crea una orden de compra a partir de un cuerpo JSON.
+
+    El descuento y su registro en el libro de movimientos son transaccionales,
+    y el ORM asíncrono de Django no admite transacciones, así que se ejecutan
+    con un único salto a un hilo mediante `sync_to_async`.
+    """
+    # Las peticiones con Idempotency-Key usan el manejo de claves de la vista síncrona.
+    if request.method != 'POST' or request.content_type != 'application/json' or IDEMPOTENCY_HEADER in request.headers:
+        return await _order_view(request)
+
+    try:
+        payload = json.loads(request.body or b'null')
+    except ValueError as exc:
+        return json_response({'detail': f'JSON parse error - {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = OrderSerializer(data=payload)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    product_id = serializer.validated_data['product_id']
+    quantity = serializer.validated_data['quantity']
+    product = await sync_to_async(Product.objects.decrement_stock)(product_id, quantity)
+
+    if product is None:
+        if not await Product.objects.filter(id=product_id).aexists():
+            return json_response(
+                {api_settings.NON_FIELD_ERRORS_KEY: [f"El producto con ID {product_id} no existe."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        registry.inc('warehouse_stock_rejected_total')
+        return json_response(
+            {"error": "No hay suficiente stock para completar la compra."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    registry.inc('warehouse_orders_placed_total')
+    return json_response(
+        {"message": "Compra realizada con éxito", "remaining_stock": product.stock},
+        status=status.HTTP_200_OK
+    )
+
+
+async def product_export(request):
+    """
+    Exporta el catálogo completo en streaming, como `ProductExportView`, con
+    un iterador asíncrono para que ASGI no acumule el cuerpo en memoria.
+    """
+    if request.method != 'GET':
+        return json_response({'detail': f'Método "{request.method}" no permitido.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    file_format = request.GET.get('file_format', 'ndjson')
+    if file_format not in EXPORT_FORMATS:
+        return json_response({"error": f"Formato no soportado: {file_format}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    compress = request.GET.get('gzip', '').lower() in ('1', 'true')
+    chunks = aiter_export(file_format)
+    return export_response(agzip_stream(chunks) if compress else chunks, file_format, compress)
+
+
+async def product_stock_stream(request):
+    """
+    Stream de server-sent events con el stock de los productos indicados por
+    `id` y `sku` (repetibles): primero el stock actual de cada uno y después
+    un evento `stock` por cada cambio, agrupados por `STOCK_STREAM_INTERVAL`.
+    """
+    if request.method != 'GET':
+        return json_response({'detail': f'Método "{request.method}" no permitido.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    serializer = StockStreamSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    if not broker.has_capacity():
+        return json_response(
+            {"error": "El stream de stock está saturado; intente de nuevo más tarde."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '5'},
+        )
+
+    product_ids = [str(product_id) for product_id in serializer.validated_data['id']]
+    skus = serializer.validated_data['sku']
+    subscription = Subscription(asyncio.get_running_loop(), product_ids, skus)
+
+    async def load_initial():
+        products = Product.objects.filter(Q(pk__in=product_ids) | Q(sku__in=skus)).only('id', 'sku', 'stock')
+        return [stock_event(product) async for product in products]
+
+    return StreamingHttpResponse(
+        stream_events(subscription, load_initial),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
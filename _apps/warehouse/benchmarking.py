@@ -0,0 +1,39 @@
+"""
+Utilidades compartidas por los comandos de benchmark.
+"""
+import statistics
+
+
+def percentile(values, fraction):
+    """
+    Retorna el percentil `fraction` (0-1) de una lista, por el método del rango más cercano.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(samples, elapsed):
+    """
+    Resume las muestras `(latencia, consultas, status)` de un tipo de petición.
+    """
+    latencies = [latency * 1000 for latency, _, _ in samples]
+    queries = [count for _, count, _ in samples]
+    statuses = {}
+    for _, _, code in samples:
+        statuses[str(code)] = statuses.get(str(code), 0) + 1
+    return {
+        'requests': len(samples),
+        'req_per_s': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'max': round(max(latencies), 3) if latencies else 0.0,
+        },
+        'queries_per_request': round(statistics.fmean(queries), 2) if queries else 0.0,
+        'status': statuses,
+    }
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+# Prefijo de las claves en el nivel compartido
+SHARED_KEY_PREFIX = 'warehouse:product:'
+
+
+class LRUCache:
+    """
+    Caché en memoria del proceso, acotada en tamaño y con expiración (TTL).
+
+    Lleva contadores de aciertos, fallos y desalojos. Es segura entre hilos.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ProductCache:
+    """
+    Caché de lectura (read-through) de la representación serializada de productos.
+
+    Tiene un nivel local `LRUCache` por proceso y, si `PRODUCT_CACHE_ALIAS`
+    apunta a una caché de `CACHES`, un nivel compartido entre procesos. Cada
+    entrada guarda los datos serializados y su ETag. Las entradas se invalidan
+    desde las señales del modelo y desde `ProductQuerySet`; en otros procesos
+    el nivel local caduca por TTL.
+
+    Con `refresh=True` no se consulta ningún nivel: se carga con `loader()` y
+    se reemplaza la entrada. Las vistas lo usan para los clientes fijados en
+    la primaria, que así leen sus propias escrituras aunque otra petición haya
+    llenado la caché desde una réplica retrasada, y de paso la corrigen.
+    """
+
+    def __init__(self):
+        self._local = None
+        self._lock = threading.Lock()
+
+    @property
+    def local(self):
+        if self._local is None:
+            with self._lock:
+                if self._local is None:
+                    self._local = LRUCache(
+                        max_entries=getattr(settings, 'PRODUCT_CACHE_MAX_ENTRIES', 10000),
+                        ttl=getattr(settings, 'PRODUCT_CACHE_TTL', 30),
+                    )
+        return self._local
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'PRODUCT_CACHE_ALIAS', None)
+        return caches[alias] if alias else None
+
+    def get(self, pk, loader, refresh=False):
+        """
+        Devuelve `(datos, etag)` del producto, cargándolo con `loader()` si no
+        está en ninguno de los niveles o si `refresh` es True.
+        """
+        key = str(pk)
+        entry = None if refresh else self.local.get(key)
+        if entry is not None:
+            return entry
+
+        shared = self.shared
+        if shared is not None and not refresh:
+            entry = shared.get(SHARED_KEY_PREFIX + key)
+            if entry is not None:
+                self.local.set(key, entry)
+                return entry
+
+        data = dict(loader())
+        entry = (data, compute_etag(data))
+        self.local.set(key, entry)
+        if shared is not None:
+            shared.set(SHARED_KEY_PREFIX + key, entry, timeout=self.local.ttl)
+        return entry
+
+    async def aget(self, pk, loader, refresh=False):
+        """
+        Versión asíncrona de `get`: `loader` es una corrutina y el nivel
+        compartido se consulta con la API asíncrona de la caché de Django.
+        """
+        key = str(pk)
+        entry = None if refresh else self.local.get(key)
+        if entry is not None:
+            return entry
+
+        shared = self.shared
+        if shared is not None and not refresh:
+            entry = await shared.aget(SHARED_KEY_PREFIX + key)
+            if entry is not None:
+                self.local.set(key, entry)
+                return entry
+
+        data = dict(await loader())
+        entry = (data, compute_etag(data))
+        self.local.set(key, entry)
+        if shared is not None:
+            await shared.aset(SHARED_KEY_PREFIX + key, entry, timeout=self.local.ttl)
+        return entry
+
+    def invalidate(self, pk, using=None):
+        self.invalidate_many([pk], using=using)
+
+    def invalidate_many(self, pks, using=None):
+        """
+        Invalida las entradas de `pks` y, si hay una transacción abierta en
+        `using`, otra vez al confirmarse: mientras tanto otra petición puede
+        volver a llenarlas con los datos anteriores al commit.
+        """
+        keys = [str(pk) for pk in pks]
+        if not keys:
+            return
+        self._delete(keys)
+        if transaction.get_connection(using).in_atomic_block:
+            transaction.on_commit(lambda: self._delete(keys), using=using)
+
+    def _delete(self, keys):
+        for key in keys:
+            self.local.delete(key)
+        shared = self.shared
+        if shared is not None:
+            shared.delete_many([SHARED_KEY_PREFIX + key for key in keys])
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        local = self.local
+        return {
+            'hits': local.hits,
+            'misses': local.misses,
+            'evictions': local.evictions,
+            'entries': len(local),
+            'max_entries': local.max_entries,
+        }
+
+
+def is_shared_cache(alias):
+    """
+    Retorna si la caché `alias` de `CACHES` la comparten todos los procesos,
+    es decir, si existe y no es la caché en memoria ni la nula.
+    """
+    if not alias or alias not in settings.CACHES:
+        return False
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def compute_etag(data):
+    """
+    Calcula un ETag fuerte a partir de la representación serializada.
+    """
+    payload = json.dumps(data, sort_keys=True, default=str).encode()
+    return '"%s"' % hashlib.sha1(payload).hexdigest()
+
+
+product_cache = ProductCache()
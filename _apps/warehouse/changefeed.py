@@ -0,0 +1,356 @@
+"""
+Feed de cambios del catálogo de productos.
+
+Cada alta o modificación de un producto, y cada cambio de stock de una de sus
+particiones (`StockShard`), recibe un `change_seq` mayor que cualquier otro,
+y cada borrado inserta un `ProductTombstone` con la misma secuencia. Los
+clientes que replican el catálogo parten de una foto completa
+(`build_snapshot`) y después piden sólo lo que cambió desde la secuencia de
+esa foto (`read_changes`).
+
+La secuencia la mantienen triggers propios de cada motor, de modo que también
+cubre las escrituras que no pasan por `save()` (`update`, `bulk_update`,
+`bulk_create`, el `UPDATE ... RETURNING` de los pedidos):
+
+- PostgreSQL: los triggers sólo marcan la fila como pendiente (`change_seq`
+  0, o NULL en las marcas de borrado). `stamp_changes` numera después, con la
+  secuencia `warehouse_product_change_seq` y bajo un candado consultivo, las
+  filas pendientes ya confirmadas. Una transacción larga no puede dejar una
+  secuencia baja detrás de otras ya entregadas: sus filas reciben número
+  recién cuando son visibles, así que la secuencia sigue el orden de los
+  commits.
+- SQLite: una tabla contador de una fila y triggers `AFTER`. Como SQLite
+  serializa las escrituras, la secuencia sigue el orden de los commits.
+
+Al rehacer una tabla, SQLite elimina sus triggers, por lo que
+`ensure_change_triggers` se ejecuta tras cada `migrate`.
+"""
+import gzip
+import os
+from decimal import Decimal
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import ChangeFeedState, Product, ProductTombstone, StockShard
+from .renderers import FastJSONRenderer
+
+PRODUCT_TABLE = 'warehouse_product'
+TOMBSTONE_TABLE = 'warehouse_producttombstone'
+SHARD_TABLE = 'warehouse_stockshard'
+SEQUENCE = 'warehouse_product_change_seq'
+COUNTER_TABLE = 'warehouse_product_change_counter'
+
+# Columnas cuyo cambio avanza la secuencia
+TRACKED_COLUMNS = ('sku', 'name', 'description', 'stock', 'low_stock_threshold')
+
+# Columnas de cada producto en las páginas del feed y en la foto, en orden
+FEED_COLUMNS = ('id', 'sku', 'name', 'description', 'stock', 'low_stock_threshold', 'change_seq')
+
+# Filas de la foto leídas por viaje a la base de datos
+SNAPSHOT_CHUNK_SIZE = 2000
+
+# Clave del candado consultivo de PostgreSQL que serializa `stamp_changes`
+STAMP_LOCK_KEY = 7340132
+
+_old = ', '.join(f'OLD.{column}' for column in TRACKED_COLUMNS)
+_new = ', '.join(f'NEW.{column}' for column in TRACKED_COLUMNS)
+
+POSTGRESQL_CREATE = [
+    f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE}',
+    f"""CREATE OR REPLACE FUNCTION {SEQUENCE}_bump() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO {TOMBSTONE_TABLE} (product_id, sku, change_seq, deleted_at)
+            VALUES (OLD.id, OLD.sku, NULL, clock_timestamp());
+            RETURN OLD;
+        END IF;
+        NEW.change_seq := 0;
+        NEW.changed_at := clock_timestamp();
+        RETURN NEW;
+    END $$""",
+    f"""CREATE OR REPLACE FUNCTION {SEQUENCE}_shard_bump() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.change_seq := 0;
+        RETURN NEW;
+    END $$""",
+    f"""CREATE TRIGGER {SEQUENCE}_bi BEFORE INSERT ON {PRODUCT_TABLE}
+        FOR EACH ROW EXECUTE FUNCTION {SEQUENCE}_bump()""",
+    f"""CREATE TRIGGER {SEQUENCE}_bu BEFORE UPDATE ON {PRODUCT_TABLE}
+        FOR EACH ROW WHEN (({_old}) IS DISTINCT FROM ({_new})) EXECUTE FUNCTION {SEQUENCE}_bump()""",
+    f"""CREATE TRIGGER {SEQUENCE}_ad AFTER DELETE ON {PRODUCT_TABLE}
+        FOR EACH ROW EXECUTE FUNCTION {SEQUENCE}_bump()""",
+    f"""CREATE TRIGGER {SEQUENCE}_su BEFORE UPDATE ON {SHARD_TABLE}
+        FOR EACH ROW WHEN (OLD.stock IS DISTINCT FROM NEW.stock) EXECUTE FUNCTION {SEQUENCE}_shard_bump()""",
+]
+POSTGRESQL_DROP = [
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_bi ON {PRODUCT_TABLE}',
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_bu ON {PRODUCT_TABLE}',
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_ad ON {PRODUCT_TABLE}',
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_su ON {SHARD_TABLE}',
+    f'DROP FUNCTION IF EXISTS {SEQUENCE}_bump()',
+    f'DROP FUNCTION IF EXISTS {SEQUENCE}_shard_bump()',
+    f'DROP SEQUENCE IF EXISTS {SEQUENCE}',
+]
+# Las filas bloqueadas por una transacción en curso se saltan: su nueva
+# versión quedará pendiente y se numerará cuando se confirme.
+POSTGRESQL_STAMP = [
+    f"""UPDATE {PRODUCT_TABLE} SET change_seq = nextval('{SEQUENCE}') WHERE id IN (
+        SELECT id FROM {PRODUCT_TABLE} WHERE change_seq = 0 ORDER BY changed_at FOR UPDATE SKIP LOCKED)""",
+    f"""UPDATE {SHARD_TABLE} SET change_seq = nextval('{SEQUENCE}') WHERE id IN (
+        SELECT id FROM {SHARD_TABLE} WHERE change_seq = 0 FOR UPDATE SKIP LOCKED)""",
+    f"""UPDATE {TOMBSTONE_TABLE} SET change_seq = nextval('{SEQUENCE}') WHERE id IN (
+        SELECT id FROM {TOMBSTONE_TABLE} WHERE change_seq IS NULL ORDER BY deleted_at FOR UPDATE SKIP LOCKED)""",
+]
+
+_now = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+_next = f'UPDATE {COUNTER_TABLE} SET value = value + 1;'
+_changed = ' OR '.join(f'old.{column} IS NOT new.{column}' for column in TRACKED_COLUMNS)
+
+SQLITE_TRIGGERS = [
+    f'{SEQUENCE}_ai',
+    f'{SEQUENCE}_au',
+    f'{SEQUENCE}_ad',
+    f'{SEQUENCE}_su',
+]
+SQLITE_CREATE = [
+    f'CREATE TABLE IF NOT EXISTS {COUNTER_TABLE} (value integer NOT NULL)',
+    f"""INSERT INTO {COUNTER_TABLE} (value)
+        SELECT COALESCE((SELECT MAX(rowid) FROM {PRODUCT_TABLE}), 0)
+        WHERE NOT EXISTS (SELECT 1 FROM {COUNTER_TABLE})""",
+    f"""UPDATE {PRODUCT_TABLE} SET change_seq = rowid, changed_at = {_now} WHERE change_seq = 0""",
+    f"""CREATE TRIGGER {SEQUENCE}_ai AFTER INSERT ON {PRODUCT_TABLE} BEGIN
+        {_next}
+        UPDATE {PRODUCT_TABLE} SET change_seq = (SELECT value FROM {COUNTER_TABLE}), changed_at = {_now}
+        WHERE rowid = new.rowid;
+    END""",
+    f"""CREATE TRIGGER {SEQUENCE}_au AFTER UPDATE ON {PRODUCT_TABLE} WHEN {_changed} BEGIN
+        {_next}
+        UPDATE {PRODUCT_TABLE} SET change_seq = (SELECT value FROM {COUNTER_TABLE}), changed_at = {_now}
+        WHERE rowid = new.rowid;
+    END""",
+    f"""CREATE TRIGGER {SEQUENCE}_ad AFTER DELETE ON {PRODUCT_TABLE} BEGIN
+        {_next}
+        INSERT INTO {TOMBSTONE_TABLE} (product_id, sku, change_seq, deleted_at)
+        VALUES (old.id, old.sku, (SELECT value FROM {COUNTER_TABLE}), {_now});
+    END""",
+    f"""CREATE TRIGGER {SEQUENCE}_su AFTER UPDATE OF stock ON {SHARD_TABLE} WHEN old.stock IS NOT new.stock BEGIN
+        {_next}
+        UPDATE {SHARD_TABLE} SET change_seq = (SELECT value FROM {COUNTER_TABLE}) WHERE rowid = new.rowid;
+    END""",
+]
+SQLITE_DROP = [
+    *(f'DROP TRIGGER IF EXISTS {name}' for name in SQLITE_TRIGGERS),
+    f'DROP TABLE IF EXISTS {COUNTER_TABLE}',
+]
+
+
+def feed_row(values):
+    """
+    Convierte una fila de `FEED_COLUMNS` en la lista que se envía al cliente.
+    Los decimales van como texto, igual que en `ProductSerializer`.
+    """
+    return [str(value) if isinstance(value, Decimal) else value for value in values]
+
+
+def feed_rows(rows, using):
+    """
+    Convierte filas de `FEED_COLUMNS` seguidas de `stock_shards` en filas del
+    feed. En los productos particionados el stock es la suma de sus
+    particiones, igual que `Product.total_stock`.
+    """
+    rows = list(rows)
+    sharded = [row[0] for row in rows if row[-1]]
+    totals = {}
+    if sharded:
+        totals = dict(
+            StockShard.objects.using(using).filter(product_id__in=sharded)
+            .values('product_id').annotate(total=Sum('stock')).values_list('product_id', 'total')
+        )
+    stock = FEED_COLUMNS.index('stock')
+    for row in rows:
+        values = list(row[:-1])
+        if row[-1]:
+            values[stock] = Decimal(totals.get(row[0], 0)).quantize(Decimal('0.01'))
+        yield feed_row(values)
+
+
+def create_change_triggers(connection):
+    """
+    Crea la secuencia y los triggers del feed para el motor de `connection` y
+    numera los productos existentes.
+
+    En otros motores no hace nada y la secuencia no avanza.
+    """
+    statements = {'postgresql': POSTGRESQL_CREATE, 'sqlite': SQLITE_CREATE}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # El contador se conserva: la secuencia nunca retrocede.
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def drop_change_triggers(connection):
+    """
+    Elimina la secuencia y los triggers del feed, si existen.
+    """
+    statements = {'postgresql': POSTGRESQL_DROP, 'sqlite': SQLITE_DROP}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def ensure_change_triggers(connection):
+    """
+    Vuelve a crear los triggers de SQLite si una migración rehízo una de las tablas del feed.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    names = [COUNTER_TABLE, *SQLITE_TRIGGERS]
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT name FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(names))})", names)
+        found = {name for name, in cursor.fetchall()}
+    # Sin la tabla contador, la migración del feed aún no se ha aplicado.
+    if COUNTER_TABLE in found and not found.issuperset(SQLITE_TRIGGERS):
+        create_change_triggers(connection)
+
+
+def stamp_changes():
+    """
+    Numera en la primaria los cambios confirmados que esperan secuencia.
+
+    Sólo hace algo en PostgreSQL. Si otro proceso ya está numerando, no
+    espera: lo pendiente lo numera ese proceso o la siguiente llamada. Usa la
+    conexión de la primaria directamente para que leer el feed no fije al
+    cliente en ella (ver `ReplicaRouter.db_for_write`).
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor != 'postgresql':
+        return
+    with transaction.atomic(using=DEFAULT_DB_ALIAS), connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_xact_lock(%s)', [STAMP_LOCK_KEY])
+        if not cursor.fetchone()[0]:
+            return
+        for sql in POSTGRESQL_STAMP:
+            cursor.execute(sql)
+
+
+def read_changes(since, limit):
+    """
+    Retorna la página del feed con los cambios posteriores a `since`.
+
+    La página trae hasta `limit` cambios en orden de secuencia: productos
+    creados o modificados (`upserts`, como listas en el orden de
+    `FEED_COLUMNS`, con la secuencia del último cambio incluido) e IDs de
+    productos eliminados (`deletes`). El cambio de stock de una partición se
+    entrega como el producto completo. `next` es la secuencia desde la que
+    pedir la página siguiente y `has_more` indica si ya hay más cambios
+    disponibles. Cada consulta lee un rango de un índice de `change_seq`, así
+    que el costo depende de los cambios y no del catálogo. Todo se lee de la
+    misma base de datos para que la página sea un prefijo coherente del feed.
+    """
+    stamp_changes()
+    using = router.db_for_read(Product)
+    upserts = (
+        Product.objects.using(using).filter(change_seq__gt=since).order_by('change_seq')
+        .values_list('change_seq', 'pk')[:limit + 1]
+    )
+    shards = (
+        StockShard.objects.using(using).filter(change_seq__gt=since).order_by('change_seq')
+        .values_list('change_seq', 'product_id')[:limit + 1]
+    )
+    deletes = (
+        ProductTombstone.objects.using(using).filter(change_seq__gt=since).order_by('change_seq')
+        .values_list('change_seq', 'product_id')[:limit + 1]
+    )
+    events = sorted(
+        [(seq, product_id, True) for seq, product_id in [*upserts, *shards]]
+        + [(seq, product_id, False) for seq, product_id in deletes],
+        key=lambda event: event[0],
+    )
+
+    page = {'since': since, 'next': since, 'has_more': False, 'columns': FEED_COLUMNS, 'upserts': [], 'deletes': []}
+    changed = {}
+    for position, (seq, product_id, upsert) in enumerate(events):
+        if position == limit:
+            page['has_more'] = True
+            break
+        changed.pop(product_id, None)
+        if upsert:
+            changed[product_id] = seq
+        else:
+            page['deletes'].append(product_id)
+        page['next'] = seq
+
+    rows = Product.objects.using(using).filter(pk__in=changed).values_list(*FEED_COLUMNS, 'stock_shards')
+    rows = {row[0]: row for row in feed_rows(rows, using)}
+    seq = FEED_COLUMNS.index('change_seq')
+    for product_id, change_seq in changed.items():
+        # Un producto ya borrado llega en una página posterior como eliminado.
+        if product_id in rows:
+            row = rows[product_id]
+            row[seq] = change_seq
+            page['upserts'].append(row)
+    return page
+
+
+def safe_head():
+    """
+    Retorna la mayor secuencia ya asignada: todos los cambios hasta ella ya
+    se entregan en el feed.
+    """
+    stamp_changes()
+    using = router.db_for_read(Product)
+    latest = [
+        Product.objects.using(using).aggregate(seq=Max('change_seq'))['seq'],
+        StockShard.objects.using(using).aggregate(seq=Max('change_seq'))['seq'],
+        ProductTombstone.objects.using(using).aggregate(seq=Max('change_seq'))['seq'],
+        ChangeFeedState.objects.horizon(),
+    ]
+    return max(seq for seq in latest if seq is not None)
+
+
+def snapshot_path():
+    return Path(settings.PRODUCT_SNAPSHOT_PATH)
+
+
+def build_snapshot(path=None):
+    """
+    Escribe la foto completa del catálogo en `path`, comprimida con gzip.
+
+    La foto es un objeto JSON con la secuencia `seq` desde la que el cliente
+    debe seguir el feed, las columnas y las filas de todos los productos. Se
+    toma la secuencia antes de leer las filas, de modo que ningún cambio
+    queda fuera: los posteriores llegan también por el feed, donde volver a
+    aplicarlos no tiene efecto. El archivo se escribe en uno temporal y se
+    reemplaza de forma atómica. Retorna `(seq, filas)`.
+    """
+    path = Path(path or snapshot_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    renderer = FastJSONRenderer()
+    seq = safe_head()
+    using = router.db_for_read(Product)
+    rows = (
+        Product.objects.using(using).order_by('sku').values_list(*FEED_COLUMNS, 'stock_shards')
+        .iterator(chunk_size=SNAPSHOT_CHUNK_SIZE)
+    )
+
+    count = 0
+    temporary = path.with_name(f'.{path.name}.tmp')
+    with gzip.open(temporary, 'wb', compresslevel=6) as output:
+        output.write(b'{"seq":%d,"generated_at":%s,"columns":%s,"rows":[' % (
+            seq, renderer.render(timezone.now()), renderer.render(FEED_COLUMNS),
+        ))
+        for chunk in iter(lambda: list(islice(rows, SNAPSHOT_CHUNK_SIZE)), []):
+            for row in feed_rows(chunk, using):
+                output.write((b',' if count else b'') + renderer.render(row))
+                count += 1
+        output.write(b']}')
+    os.replace(temporary, path)
+    return seq, count
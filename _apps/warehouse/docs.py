@@ -0,0 +1,26 @@
+"""
+Acceso a drf_yasg para documentar las vistas.
+
+Con `API_SCHEMA_PREBUILT_ONLY` el esquema ya está generado y drf_yasg no se
+importa: `swagger_auto_schema` deja la vista intacta y `openapi` es un
+objeto inerte que acepta cualquier atributo o llamada.
+"""
+from django.conf import settings
+
+if getattr(settings, 'API_SCHEMA_PREBUILT_ONLY', False):
+    class _Inert:
+        def __getattr__(self, name):
+            return self
+
+        def __call__(self, *args, **kwargs):
+            return self
+
+    openapi = _Inert()
+
+    def swagger_auto_schema(**kwargs):
+        return lambda view_method: view_method
+else:
+    from drf_yasg import openapi
+    from drf_yasg.utils import swagger_auto_schema
+
+__all__ = ['openapi', 'swagger_auto_schema']
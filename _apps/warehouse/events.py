@@ -0,0 +1,308 @@
+"""
+Eventos de cambios de stock para el stream SSE de productos.
+
+Cada cambio de stock confirmado (pedidos, reposiciones, ajustes) se publica
+con el backend `STOCK_EVENT_BACKEND`, que lo hace llegar al `broker` de cada
+proceso; el broker lo reparte entre las suscripciones de ese producto o SKU:
+
+- `LocalBackend` (por defecto) entrega directamente al broker del proceso
+  que hizo el cambio. Sirve con un solo proceso ASGI.
+- `PostgresNotifyBackend` publica con `pg_notify` y cada proceso con
+  suscriptores escucha el canal en un hilo propio, así que los cambios hechos
+  en cualquier worker (WSGI o ASGI) llegan a los clientes de todos. Es el
+  que usa `manage.py serve` con varios workers uvicorn si no se configuró
+  otro (ver `check_backend`).
+
+Tanto los eventos como el estado inicial del stream leen la columna `stock`,
+que en los productos particionados es el total de sus particiones.
+
+Cada suscripción guarda sólo el último evento pendiente de cada producto y
+el stream los envía como mucho una vez cada `STOCK_STREAM_INTERVAL`
+segundos: un SKU muy activo produce a lo sumo un evento por intervalo y
+cliente, y un cliente lento acumula, como mucho, un evento por producto
+suscrito en lugar de una cola sin límite.
+"""
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.module_loading import import_string
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Canal de PostgreSQL por el que viajan los eventos entre procesos
+NOTIFY_CHANNEL = 'warehouse_stock_events'
+
+# Backends incluidos: el del proceso y el que reparte entre procesos
+LOCAL_BACKEND = '_apps.warehouse.events.LocalBackend'
+NOTIFY_BACKEND = '_apps.warehouse.events.PostgresNotifyBackend'
+
+
+def stock_event(product):
+    return {'product_id': str(product.pk), 'sku': product.sku, 'stock': str(product.stock)}
+
+
+def publish_stock_change(product, using=DEFAULT_DB_ALIAS):
+    """
+    Publica el stock de `product` cuando se confirme la transacción en curso.
+
+    Un fallo al publicar se registra y no impide los demás callbacks de la
+    transacción.
+    """
+    event = stock_event(product)
+    transaction.on_commit(lambda: get_backend().publish([event]), using=using, robust=True)
+
+
+def format_event(event):
+    """
+    Codifica un evento en el formato de server-sent events.
+    """
+    return f"event: stock\ndata: {json.dumps(event)}\n\n"
+
+
+class Subscription:
+    """
+    Suscripción de un cliente del stream a productos y SKU.
+
+    `offer` se llama desde cualquier hilo y sólo reemplaza el evento pendiente
+    del producto; el bucle de eventos del cliente se despierta una vez por
+    tanda, no una vez por evento.
+    """
+
+    def __init__(self, loop, product_ids=(), skus=()):
+        self.loop = loop
+        self.product_ids = frozenset(product_ids)
+        self.skus = frozenset(skus)
+        self.ready = asyncio.Event()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._notified = False
+
+    def offer(self, event):
+        with self._lock:
+            self._pending[event['product_id']] = event
+            if self._notified:
+                return
+            self._notified = True
+        self.loop.call_soon_threadsafe(self.ready.set)
+
+    def drain(self):
+        """
+        Retorna los eventos pendientes (el último de cada producto) y los descarta.
+        """
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending.clear()
+            self._notified = False
+            self.ready.clear()
+        return events
+
+
+class StockEventBroker:
+    """
+    Reparte los eventos de stock entre las suscripciones del proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_product = {}
+        self._by_sku = {}
+        self.clients = 0
+
+    def has_capacity(self):
+        return self.clients < getattr(settings, 'STOCK_STREAM_MAX_CLIENTS', 1000)
+
+    def subscribe(self, subscription):
+        """
+        Registra `subscription`. Retorna False si el proceso ya tiene
+        `STOCK_STREAM_MAX_CLIENTS` clientes.
+        """
+        with self._lock:
+            if not self.has_capacity():
+                return False
+            self.clients += 1
+            for product_id in subscription.product_ids:
+                self._by_product.setdefault(product_id, set()).add(subscription)
+            for sku in subscription.skus:
+                self._by_sku.setdefault(sku, set()).add(subscription)
+        registry.inc('stock_stream_clients')
+        return True
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self.clients -= 1
+            for index, keys in ((self._by_product, subscription.product_ids), (self._by_sku, subscription.skus)):
+                for key in keys:
+                    subscribers = index.get(key)
+                    if subscribers is not None:
+                        subscribers.discard(subscription)
+                        if not subscribers:
+                            del index[key]
+        registry.inc('stock_stream_clients', -1)
+
+    def dispatch(self, events):
+        for event in events:
+            with self._lock:
+                targets = self._by_product.get(event['product_id'], set()) | self._by_sku.get(event['sku'], set())
+            for subscription in targets:
+                try:
+                    subscription.offer(event)
+                except RuntimeError:
+                    # El bucle del cliente ya se cerró; el stream lo dará de baja.
+                    pass
+
+
+broker = StockEventBroker()
+
+
+class LocalBackend:
+    """
+    Entrega los eventos al broker del proceso que hizo el cambio.
+    """
+
+    def publish(self, events):
+        broker.dispatch(events)
+
+    def start(self):
+        pass
+
+
+class PostgresNotifyBackend:
+    """
+    Publica los eventos con `pg_notify` y los recibe con `LISTEN` en un hilo
+    por proceso, que se inicia con el primer suscriptor.
+
+    El hilo usa una conexión propia en autocommit y se reconecta si la pierde.
+    Los eventos publicados mientras no está escuchando se pierden; el cliente
+    recibe el stock actual cada vez que se conecta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def publish(self, events):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            for event in events:
+                cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, json.dumps(event)])
+
+    def start(self):
+        # El hilo no sobrevive a un fork: cada proceso arranca el suyo.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='stock-events', daemon=True).start()
+
+    def _run(self):
+        while True:
+            connection = connections.create_connection(DEFAULT_DB_ALIAS)
+            try:
+                connection.ensure_connection()
+                connection.set_autocommit(True)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+                self._listen(connection.connection)
+            except Exception:
+                logger.exception("Error al escuchar los eventos de stock; se reintenta en 5 segundos")
+                time.sleep(5)
+            finally:
+                connection.close()
+
+    def _listen(self, raw):
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        while True:
+            if is_psycopg3:
+                payloads = [notify.payload for notify in raw.notifies(timeout=5)]
+            else:
+                payloads = []
+                if select.select([raw], [], [], 5)[0]:
+                    raw.poll()
+                    while raw.notifies:
+                        payloads.append(raw.notifies.pop(0).payload)
+            if payloads:
+                broker.dispatch([json.loads(payload) for payload in payloads])
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    path = getattr(settings, 'STOCK_EVENT_BACKEND', None) or LOCAL_BACKEND
+    if _backend is None or _backend[0] != path:
+        _backend = (path, import_string(path)())
+    return _backend[1]
+
+
+def check_backend(workers):
+    """
+    Comprueba que los eventos lleguen a los clientes de `workers` procesos ASGI.
+
+    Con más de uno y sin `STOCK_EVENT_BACKEND`, elige `PostgresNotifyBackend`.
+    Retorna la ruta del backend elegido.
+
+    Raises:
+        ImproperlyConfigured: Si hay más de un proceso y el backend es
+            `LocalBackend`, o no hay backend y la base no es PostgreSQL.
+    """
+    path = getattr(settings, 'STOCK_EVENT_BACKEND', None)
+    if workers <= 1:
+        return path or LOCAL_BACKEND
+    if path == LOCAL_BACKEND:
+        raise ImproperlyConfigured(
+            f"STOCK_EVENT_BACKEND={LOCAL_BACKEND} sólo entrega los eventos del propio proceso; "
+            f"con {workers} workers use {NOTIFY_BACKEND}."
+        )
+    if path is None:
+        if connections[DEFAULT_DB_ALIAS].vendor != 'postgresql':
+            raise ImproperlyConfigured(
+                f"Con {workers} workers el stream de stock necesita un STOCK_EVENT_BACKEND entre procesos."
+            )
+        settings.STOCK_EVENT_BACKEND = path = NOTIFY_BACKEND
+    return path
+
+
+async def stream_events(subscription, load_initial):
+    """
+    Genera el stream SSE de `subscription`.
+
+    Primero registra la suscripción y después envía el stock actual
+    (`await load_initial()`), de modo que ningún cambio queda entre ambos.
+    Luego envía los cambios agrupados por intervalo, con un comentario de
+    keepalive cada `STOCK_STREAM_HEARTBEAT` segundos sin cambios. Si el
+    proceso ya tiene el máximo de clientes, termina y el cliente reintenta.
+    """
+    interval = getattr(settings, 'STOCK_STREAM_INTERVAL', 1)
+    heartbeat = getattr(settings, 'STOCK_STREAM_HEARTBEAT', 15)
+    yield f"retry: {int(getattr(settings, 'STOCK_STREAM_RETRY', 3) * 1000)}\n\n"
+    if not broker.subscribe(subscription):
+        return
+    try:
+        get_backend().start()
+        for event in await load_initial():
+            yield format_event(event)
+        while True:
+            try:
+                await asyncio.wait_for(subscription.ready.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            for event in subscription.drain():
+                yield format_event(event)
+            # Ventana de agrupación: lo que llegue mientras tanto se fusiona por producto.
+            await asyncio.sleep(interval)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,123 @@
+import csv
+import json
+import zlib
+
+from .models import Product
+
+# Formatos de archivo soportados por la exportación
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+# Columnas exportadas, en orden
+EXPORT_FIELDS = ('id', 'sku', 'name', 'description', 'stock')
+
+# Filas leídas del cursor del servidor por viaje a la base de datos
+DEFAULT_CHUNK_SIZE = 2000
+
+# Filas agrupadas en cada fragmento de salida
+ROWS_PER_FRAGMENT = 500
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class _Echo:
+    """
+    Pseudo-buffer que devuelve lo escrito, para usar `csv.writer` sin archivo.
+    """
+    def write(self, value):
+        return value
+
+
+def _format_ndjson(row):
+    row['id'] = str(row['id'])
+    row['stock'] = str(row['stock'])
+    return json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def _row_formatter(file_format):
+    """
+    Retorna `(cabecera, formateador)` de `file_format`: los bytes con los que
+    empieza el archivo y la función que convierte una fila en texto.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato no soportado: {file_format}")
+
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        format_row = lambda row: writer.writerow([row[name] for name in EXPORT_FIELDS])
+        return format_row(dict(zip(EXPORT_FIELDS, EXPORT_FIELDS))).encode(), format_row
+    return b'', _format_ndjson
+
+
+def _export_queryset():
+    return Product.objects.order_by('sku').values(*EXPORT_FIELDS)
+
+
+def iter_export(file_format='ndjson', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Genera el catálogo completo como fragmentos de bytes en NDJSON o CSV.
+
+    Las filas se leen con `values().iterator()`, que en PostgreSQL usa un
+    cursor del lado del servidor, y se escriben a medida que llegan; ni el
+    tiempo hasta el primer byte ni la memoria dependen del tamaño del catálogo.
+    """
+    header, format_row = _row_formatter(file_format)
+    if header:
+        yield header
+
+    fragment = []
+    for row in _export_queryset().iterator(chunk_size=chunk_size):
+        fragment.append(format_row(row))
+        if len(fragment) >= ROWS_PER_FRAGMENT:
+            yield ''.join(fragment).encode()
+            fragment = []
+    if fragment:
+        yield ''.join(fragment).encode()
+
+
+async def aiter_export(file_format='ndjson', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Versión asíncrona de `iter_export`, para responder bajo ASGI.
+
+    `StreamingHttpResponse` consume un iterador síncrono bajo ASGI de una sola
+    vez y guarda todo el cuerpo en memoria; con este, las filas se leen con
+    `aiterator()` y cada fragmento se envía en cuanto está listo.
+    """
+    header, format_row = _row_formatter(file_format)
+    if header:
+        yield header
+
+    fragment = []
+    async for row in _export_queryset().aiterator(chunk_size=chunk_size):
+        fragment.append(format_row(row))
+        if len(fragment) >= ROWS_PER_FRAGMENT:
+            yield ''.join(fragment).encode()
+            fragment = []
+    if fragment:
+        yield ''.join(fragment).encode()
+
+
+def gzip_stream(chunks):
+    """
+    Comprime al vuelo una secuencia de fragmentos de bytes en formato gzip.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def agzip_stream(chunks):
+    """
+    Versión asíncrona de `gzip_stream`, para los fragmentos de `aiter_export`.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
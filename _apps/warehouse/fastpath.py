@@ -0,0 +1,66 @@
+"""
+Serialización rápida de lecturas de productos.
+
+Con `PRODUCT_FAST_SERIALIZATION` activo, el listado y el detalle leen tuplas
+con `values_list()` y las convierten con un mapeador precompilado a partir
+de `ProductSerializer`, sin crear instancias de `Product` ni recorrer los
+campos del serializador por fila. El resultado es el mismo diccionario que
+produce `ProductSerializer(...).data`.
+"""
+from django.conf import settings
+from rest_framework import serializers
+
+from .serializers import ProductSerializer
+
+# Campos cuya representación es el propio valor de la base de datos
+IDENTITY_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField)
+
+
+def fast_serialization_enabled():
+    return getattr(settings, 'PRODUCT_FAST_SERIALIZATION', False)
+
+
+def _converter(field):
+    """
+    Función que convierte el valor de la base de datos en la representación
+    del campo, o `None` si el valor se usa tal cual.
+    """
+    if isinstance(field, serializers.UUIDField) and field.uuid_format == 'hex_verbose':
+        return str
+    if isinstance(field, IDENTITY_FIELDS) and not isinstance(field, serializers.ChoiceField):
+        return None
+    return field.to_representation
+
+
+def compile_row_mapper(serializer_class):
+    """
+    Precompila la conversión de filas para `serializer_class`.
+
+    Retorna `(columnas, mapear)`: las columnas que hay que pedir a
+    `values_list()` y una función que convierte cada fila en el diccionario
+    que produciría el serializador. Sólo admite campos que leen un atributo
+    directo del modelo.
+    """
+    fields = [field for field in serializer_class().fields.values() if not field.write_only]
+    for field in fields:
+        if len(field.source_attrs) != 1 or field.source == '*':
+            raise ValueError(f"El campo {field.field_name} no lee un atributo directo del modelo.")
+
+    names = tuple(field.field_name for field in fields)
+    columns = tuple(field.source for field in fields)
+    converters = tuple(_converter(field) for field in fields)
+
+    if not any(converters):
+        def map_row(row):
+            return dict(zip(names, row))
+    else:
+        def map_row(row):
+            return {
+                name: value if convert is None or value is None else convert(value)
+                for name, convert, value in zip(names, converters, row)
+            }
+
+    return columns, map_row
+
+
+PRODUCT_COLUMNS, map_product_row = compile_row_mapper(ProductSerializer)
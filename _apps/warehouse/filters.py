@@ -0,0 +1,28 @@
+from rest_framework.filters import BaseFilterBackend
+
+from .docs import openapi
+from .serializers import ProductSearchSerializer
+
+# Parámetros de búsqueda del listado de productos, para la documentación
+PRODUCT_SEARCH_PARAMETERS = [
+    openapi.Parameter('sku', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Prefijo del SKU'),
+    openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Texto contenido en el nombre (mínimo 3 caracteres)'),
+    openapi.Parameter('stock_min', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, description='Stock mínimo'),
+    openapi.Parameter('stock_max', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, description='Stock máximo'),
+    openapi.Parameter('low_stock', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, description='Sólo productos con stock bajo'),
+]
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Filtra el listado de productos por SKU, nombre y stock.
+
+    Valida los parámetros con `ProductSearchSerializer` (responde 400 si no
+    son válidos) y aplica `ProductQuerySet.search`, que sólo usa condiciones
+    respaldadas por índices.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        serializer = ProductSearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return queryset.search(**serializer.validated_data)
@@ -0,0 +1,102 @@
+"""
+Soporte de la cabecera `Idempotency-Key` en las vistas que modifican stock.
+
+La reserva de la clave (`IdempotencyKey`), el cambio que hace la vista y
+la respuesta guardada se confirman en una sola transacción. Las repeticiones
+con la misma clave y el mismo cuerpo reciben la respuesta guardada, sin tocar
+`Product`; si la original sigue en curso, esperan a que termine. Las
+respuestas 5xx y las excepciones revierten la transacción completa, así que
+la clave sólo queda libre si el cambio tampoco se aplicó; una vez confirmada
+nunca se borra antes de expirar.
+"""
+import functools
+import hashlib
+import json
+
+from django.db import router, transaction
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+from .docs import openapi
+from .metrics import registry
+from .models import IdempotencyKey
+from .renderers import FastJSONRenderer
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Cabecera documentada en las vistas idempotentes
+IDEMPOTENCY_PARAMETER = openapi.Parameter(
+    IDEMPOTENCY_HEADER, openapi.IN_HEADER, type=openapi.TYPE_STRING,
+    description='Clave única del cliente; las repeticiones reciben la respuesta original'
+)
+
+
+def fingerprint(data):
+    """
+    Huella SHA-256 del cuerpo de la petición, independiente del orden de las claves.
+    """
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def replay(record, request_fingerprint):
+    """
+    Respuesta para una repetición de una clave ya reservada.
+    """
+    if record.fingerprint != request_fingerprint:
+        return Response(
+            {"error": "La Idempotency-Key ya se usó con un cuerpo de petición distinto."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record.response_status is None:
+        return Response(
+            {"error": "Una petición con esta Idempotency-Key sigue en curso."},
+            status=status.HTTP_409_CONFLICT,
+            headers={'Retry-After': '1'}
+        )
+    registry.inc('warehouse_idempotent_replays_total')
+    return HttpResponse(
+        record.response_body,
+        status=record.response_status,
+        content_type='application/json',
+        headers={'Idempotent-Replayed': 'true'}
+    )
+
+
+def idempotent(handler):
+    """
+    Decorador para los métodos de un `APIView` que deben ser idempotentes.
+
+    Sin la cabecera `Idempotency-Key` la petición se procesa como siempre.
+    """
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return handler(view, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"La cabecera {IDEMPOTENCY_HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        request_fingerprint = fingerprint(request.data)
+        using = router.db_for_write(IdempotencyKey)
+        with transaction.atomic(using=using):
+            record, claimed = IdempotencyKey.objects.claim(f'{request.method} {request.path}', key, request_fingerprint)
+            if not claimed:
+                return replay(record, request_fingerprint)
+
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True, using=using)
+                return response
+
+            IdempotencyKey.objects.filter(pk=record.pk).update(
+                response_status=response.status_code,
+                response_body=FastJSONRenderer().render(response.data).decode(),
+            )
+        return response
+
+    return wrapper
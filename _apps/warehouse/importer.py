@@ -0,0 +1,223 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import DatabaseError, router, transaction
+from django.db.models.signals import post_save
+from rest_framework import serializers
+
+from .models import Product, StockMovement, StockShard, distribute_stock
+from .serializers import ProductSerializer
+
+# Formatos de archivo soportados por la importación
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# Filas validadas e insertadas por sentencia
+DEFAULT_CHUNK_SIZE = 1000
+
+# Campos que sólo se actualizan en SKU existentes si vienen en la fila
+OPTIONAL_UPDATE_FIELDS = ('stock', 'low_stock_threshold')
+
+# Máximo de errores por fila que se conservan en el reporte
+MAX_REPORTED_ERRORS = 1000
+
+
+class ProductImportSerializer(ProductSerializer):
+    """
+    Serializador de una fila de importación.
+
+    Aplica las mismas reglas que `ProductSerializer` para `sku` y `name`, pero
+    sin el validador de unicidad del SKU (que consultaría la base por fila):
+    un SKU existente se actualiza en lugar de rechazarse.
+    """
+    stock = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+
+    class Meta(ProductSerializer.Meta):
+        fields = ['sku', 'name', 'description', 'stock', 'low_stock_threshold']
+        extra_kwargs = {'sku': {'validators': []}}
+
+
+@dataclass
+class ImportReport:
+    """
+    Resultado de una importación: filas procesadas, importadas y errores.
+    """
+    processed: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, detail):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': detail})
+
+    def as_dict(self):
+        return {
+            'processed': self.processed,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+def detect_format(filename, default='csv'):
+    """
+    Deduce el formato a partir de la extensión del archivo.
+    """
+    suffix = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    if suffix in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    if suffix == 'csv':
+        return 'csv'
+    return default
+
+
+def iter_rows(stream, file_format):
+    """
+    Recorre un archivo binario fila a fila sin cargarlo completo en memoria.
+
+    Yields:
+        tuple[int, dict | None, str | None]: Número de línea, fila y error de
+        lectura (si la línea no pudo interpretarse).
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Las celdas vacías se tratan como campos ausentes.
+            yield reader.line_num, {key: value for key, value in row.items() if key and value != ''}, None
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None, "JSON inválido."
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Cada línea debe ser un objeto JSON."
+            continue
+        yield line_number, row, None
+
+
+def import_products(stream, file_format='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Importa productos desde un archivo CSV o NDJSON por bloques.
+
+    Cada bloque se valida fila a fila con `ProductImportSerializer` y se escribe
+    con un único `bulk_create(update_conflicts=True)` sobre `sku`. Las filas
+    inválidas se reportan sin detener la carga y la memoria usada depende sólo
+    del tamaño del bloque. Si la base de datos rechaza el bloque, se reintenta
+    fila a fila para reportar sólo las líneas que fallan.
+
+    Como `bulk_create` no emite `post_save`, se emite a mano por producto
+    (alertas de stock bajo, caché, eventos de stock y el ajuste inicial de
+    los productos nuevos en el libro) y los cambios de stock de los productos
+    existentes se registran como ajustes en `StockMovement`. En los productos
+    con stock particionado, el nuevo stock se reparte entre sus particiones.
+
+    Returns:
+        ImportReport: Resumen de la importación.
+    """
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Formato no soportado: {file_format}")
+
+    report = ImportReport()
+    rows = iter_rows(stream, file_format)
+    while chunk := list(islice(rows, chunk_size)):
+        _import_chunk(chunk, report)
+    return report
+
+
+def _import_chunk(chunk, report):
+    # Las filas se agrupan según qué campos opcionales traen, para no pisar con
+    # el valor por defecto los que no vienen en el archivo. Se conserva la
+    # última aparición de cada SKU dentro del bloque.
+    groups = {}
+    for line, row, error in chunk:
+        report.processed += 1
+        if error:
+            report.add_error(line, {'non_field_errors': [error]})
+            continue
+        serializer = ProductImportSerializer(data=row)
+        if not serializer.is_valid():
+            report.add_error(line, serializer.errors)
+            continue
+        data = serializer.validated_data
+        for pending in groups.values():
+            pending.pop(data['sku'], None)
+        optional = tuple(name for name in OPTIONAL_UPDATE_FIELDS if name in data)
+        groups.setdefault(optional, {})[data['sku']] = (line, Product(**data))
+
+    for optional, pending in groups.items():
+        if not pending:
+            continue
+        try:
+            _write_group(list(pending.values()), optional)
+        except DatabaseError:
+            # Se reintenta fila a fila para reportar la línea que falla.
+            for item in pending.values():
+                try:
+                    _write_group([item], optional)
+                except DatabaseError as exc:
+                    report.add_error(item[0], {'non_field_errors': [str(exc)]})
+                else:
+                    report.imported += 1
+        else:
+            report.imported += len(pending)
+
+
+def _write_group(items, optional):
+    """
+    Escribe en una transacción los productos de `items` (`(línea, producto)`)
+    que traen los mismos campos opcionales, con su libro y sus señales.
+    """
+    using = router.db_for_write(Product)
+    skus = [product.sku for _, product in items]
+    with transaction.atomic(using=using):
+        previous = {
+            sku: (stock, shards) for sku, stock, shards in
+            Product.objects.using(using).select_for_update().filter(sku__in=skus).order_by('pk')
+            .values_list('sku', 'stock', 'stock_shards')
+        }
+        Product.objects.using(using).bulk_create(
+            [product for _, product in items],
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=['name', 'description', *optional],
+        )
+        products = list(Product.objects.using(using).filter(sku__in=skus).order_by('pk'))
+
+        movements = []
+        for product in products:
+            if product.sku not in previous:
+                # Stock inicial en el mismo `bulk_create` que los cambios; ver `record_initial_stock`.
+                movements.append(StockMovement(product=product, kind=StockMovement.Kind.ADJUSTMENT, delta=product.stock, applied=True))
+                product._initial_stock_recorded = True
+                continue
+            if 'stock' not in optional:
+                continue
+            old_stock, shards = previous[product.sku]
+            if product.stock == old_stock:
+                continue
+            movements.append(StockMovement(product=product, kind=StockMovement.Kind.ADJUSTMENT, delta=product.stock - old_stock, applied=True))
+            if shards:
+                locked = list(StockShard.objects.using(using).select_for_update().filter(product=product).order_by('index'))
+                distribute_stock(locked, product.stock)
+                StockShard.objects.using(using).bulk_update(locked, ['stock'])
+        StockMovement.objects.using(using).bulk_create(movements)
+
+        for product in products:
+            post_save.send(
+                sender=Product,
+                instance=product,
+                created=product.sku not in previous,
+                update_fields=None,
+                raw=False,
+                using=using,
+            )
@@ -0,0 +1,60 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from _apps.warehouse.models import Product
+from _apps.warehouse.serializers import MAX_ADJUSTMENT_LINES, StockAdjustmentLineSerializer
+
+
+class Command(BaseCommand):
+    """
+    Ajusta el stock de muchos productos desde un archivo CSV.
+
+    El archivo tiene una columna `product_id` o `sku` y una columna `delta`.
+    Si alguna fila no es válida no se aplica ninguna.
+
+    Uso:
+        python manage.py adjust_stock entrega.csv --all-or-nothing
+    """
+    help = "Suma al stock de varios productos las cantidades de un archivo CSV (product_id o sku, delta)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Ruta del archivo CSV.")
+        parser.add_argument('--all-or-nothing', action='store_true', help="No aplicar nada si algún producto no existe.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Productos por sentencia UPDATE.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as stream:
+                rows = [{key: value for key, value in row.items() if value} for row in csv.DictReader(stream)]
+        except OSError as exc:
+            raise CommandError(f"No se pudo leer el archivo: {exc}")
+
+        if not rows:
+            raise CommandError("El archivo no contiene líneas.")
+        if len(rows) > MAX_ADJUSTMENT_LINES:
+            raise CommandError(f"El archivo no puede tener más de {MAX_ADJUSTMENT_LINES} líneas.")
+
+        serializer = StockAdjustmentLineSerializer(data=rows, many=True)
+        if not serializer.is_valid():
+            for line, errors in enumerate(serializer.errors, start=2):
+                if errors:
+                    self.stderr.write(f"Línea {line}: {errors}")
+            raise CommandError("El archivo tiene líneas con errores; no se aplicó ningún ajuste.")
+
+        applied, results = Product.objects.adjust_stock_batch(
+            serializer.validated_data,
+            all_or_nothing=options['all_or_nothing'],
+            batch_size=options['batch_size'],
+        )
+        for line, result in enumerate(results, start=2):
+            if result['status'] == 'not_found':
+                self.stderr.write(f"Línea {line}: {result['error']}")
+        if not applied:
+            raise CommandError("El ajuste no se aplicó porque algún producto no existe.")
+
+        statuses = [result['status'] for result in results]
+        self.stdout.write(self.style.SUCCESS(
+            f"Líneas procesadas: {len(results)}, aplicadas: {statuses.count('ok')}, "
+            f"productos inexistentes: {statuses.count('not_found')}"
+        ))
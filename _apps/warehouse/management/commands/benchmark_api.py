@@ -0,0 +1,222 @@
+import json
+import platform
+import random
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from _apps.warehouse.benchmarking import summarize
+from _apps.warehouse.models import Product, StockShard
+
+# Prefijo reservado para los SKU de los productos de prueba
+BENCHMARK_SKU_PREFIX = 'BENCH'
+
+
+class Command(BaseCommand):
+    """
+    Prueba de carga concurrente de las rutas de pedidos y reposición.
+
+    Crea productos temporales, lanza varios hilos que envían pedidos y
+    reposiciones a `create-order` y `product-update-stock` a través del
+    manejador de Django, verifica que el stock nunca quede negativo y que
+    los totales cuadren, y guarda los resultados en un archivo JSON. Con
+    `--baseline` compara contra una ejecución anterior y falla si hay una
+    regresión mayor a `--tolerance`. Debe ejecutarse contra una base de
+    datos desechable.
+
+    Uso:
+        python manage.py benchmark_api --threads 16 --requests 5000 --output bench.json
+        python manage.py benchmark_api --baseline bench.json --tolerance 0.15
+    """
+    help = "Mide req/s, latencias p50/p95/p99 y consultas por petición bajo concurrencia."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Hilos concurrentes.")
+        parser.add_argument('--requests', type=int, default=2000, help="Peticiones totales.")
+        parser.add_argument('--products', type=int, default=5, help="Productos sobre los que se reparte la carga.")
+        parser.add_argument('--initial-stock', type=int, default=500, help="Stock inicial de cada producto.")
+        parser.add_argument('--restock-ratio', type=float, default=0.2, help="Fracción de peticiones que son reposiciones.")
+        parser.add_argument('--seed', type=int, default=0, help="Semilla para reproducir la carga.")
+        parser.add_argument('--output', default='bench_results.json', help="Archivo JSON de resultados.")
+        parser.add_argument('--baseline', help="Resultados previos contra los que comparar.")
+        parser.add_argument('--tolerance', type=float, default=0.10, help="Regresión relativa tolerada frente a la línea base.")
+        parser.add_argument('--keep', action='store_true', help="No elimina los productos de prueba al terminar.")
+
+    def handle(self, *args, **options):
+        products = self._create_products(options['products'], options['initial_stock'])
+        plan = self._plan(products, options)
+        per_thread = [plan[slot::options['threads']] for slot in range(options['threads'])]
+        samples = {'order': [], 'restock': []}
+        accepted = {product.pk: Decimal(0) for product in products}
+        negative = []
+        lock = threading.Lock()
+
+        def worker(requests, spawned):
+            client = Client(HTTP_HOST=(settings.ALLOWED_HOSTS or ['localhost'])[0])
+            secure = getattr(settings, 'SECURE_SSL_REDIRECT', False)
+            local = {'order': [], 'restock': []}
+            local_accepted = {pk: Decimal(0) for pk in accepted}
+            local_negative = []
+            try:
+                for kind, product, amount in requests:
+                    with CaptureQueriesContext(connection) as context:
+                        start = time.perf_counter()
+                        if kind == 'order':
+                            response = client.post(
+                                reverse('create-order'),
+                                {'product_id': str(product.pk), 'quantity': amount},
+                                content_type='application/json',
+                                secure=secure,
+                            )
+                        else:
+                            response = client.patch(
+                                reverse('product-update-stock', args=[product.pk]),
+                                {'stock': amount},
+                                content_type='application/json',
+                                secure=secure,
+                            )
+                        latency = time.perf_counter() - start
+                    local[kind].append((latency, len(context.captured_queries), response.status_code))
+                    if response.status_code == 200:
+                        data = response.json()
+                        local_accepted[product.pk] += amount if kind == 'restock' else -amount
+                        if Decimal(str(data.get('remaining_stock', data.get('new_stock', 0)))) < 0:
+                            local_negative.append(str(product.pk))
+            finally:
+                with lock:
+                    for kind in samples:
+                        samples[kind].extend(local[kind])
+                    for pk, delta in local_accepted.items():
+                        accepted[pk] += delta
+                    negative.extend(local_negative)
+                if spawned:
+                    connections.close_all()
+
+        start = time.perf_counter()
+        # Se mide la capacidad de la API, no los límites del control de admisión.
+        with override_settings(ADMISSION_CONTROL={}):
+            if options['threads'] == 1:
+                worker(per_thread[0], spawned=False)
+            else:
+                threads = [threading.Thread(target=worker, args=(requests, True)) for requests in per_thread]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        elapsed = time.perf_counter() - start
+
+        invariants = self._check(products, options['initial_stock'], accepted, negative)
+        results = {
+            'timestamp': timezone.now().isoformat(),
+            'environment': {
+                'database': connection.vendor,
+                'python': platform.python_version(),
+            },
+            'config': {
+                name: options[name]
+                for name in ('threads', 'requests', 'products', 'initial_stock', 'restock_ratio', 'seed')
+            },
+            'elapsed_s': round(elapsed, 3),
+            'overall': summarize(samples['order'] + samples['restock'], elapsed),
+            'order': summarize(samples['order'], elapsed),
+            'restock': summarize(samples['restock'], elapsed),
+            'invariants': invariants,
+        }
+        if not options['keep']:
+            Product.objects.filter(pk__in=[product.pk for product in products]).delete()
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self._report(results)
+
+        if not invariants['ok']:
+            raise CommandError("Se violaron las invariantes de stock.")
+        if options['baseline']:
+            self._compare(results, options['baseline'], options['tolerance'])
+
+    def _create_products(self, count, initial_stock):
+        Product.objects.filter(sku__startswith=BENCHMARK_SKU_PREFIX).delete()
+        return [
+            Product.objects.create(
+                sku=f'{BENCHMARK_SKU_PREFIX}{index:05d}',
+                name=f'Benchmark {index}',
+                stock=initial_stock,
+                low_stock_threshold=0,
+            )
+            for index in range(count)
+        ]
+
+    def _plan(self, products, options):
+        rng = random.Random(options['seed'])
+        plan = []
+        for _ in range(options['requests']):
+            product = rng.choice(products)
+            if rng.random() < options['restock_ratio']:
+                plan.append(('restock', product, rng.randint(1, 10)))
+            else:
+                plan.append(('order', product, rng.randint(1, 5)))
+        return plan
+
+    def _check(self, products, initial_stock, accepted, negative):
+        mismatches = []
+        for product in products:
+            product.refresh_from_db()
+            expected = initial_stock + accepted[product.pk]
+            actual = product.total_stock
+            if actual != expected:
+                mismatches.append({'sku': product.sku, 'expected': str(expected), 'actual': str(actual)})
+        negative_rows = (
+            Product.objects.filter(pk__in=[product.pk for product in products], stock__lt=0).count()
+            + StockShard.objects.filter(product__in=products, stock__lt=0).count()
+        )
+        return {
+            'ok': not mismatches and not negative and not negative_rows,
+            'balance_mismatches': mismatches,
+            'negative_responses': len(negative),
+            'negative_rows': negative_rows,
+        }
+
+    def _report(self, results):
+        for kind in ('order', 'restock', 'overall'):
+            summary = results[kind]
+            latency = summary['latency_ms']
+            self.stdout.write(
+                f"{kind:<8} req={summary['requests']:<6} req/s={summary['req_per_s']:<9} "
+                f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms "
+                f"consultas/pet={summary['queries_per_request']}"
+            )
+        status = 'OK' if results['invariants']['ok'] else 'FALLO'
+        self.stdout.write(f"invariantes de stock: {status}")
+
+    def _compare(self, results, baseline_path, tolerance):
+        try:
+            with open(baseline_path) as baseline_file:
+                baseline = json.load(baseline_file)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"No se pudo leer la línea base: {exc}")
+
+        regressions = []
+        for kind in ('order', 'restock', 'overall'):
+            before, after = baseline[kind], results[kind]
+            if before['req_per_s'] and after['req_per_s'] < before['req_per_s'] * (1 - tolerance):
+                regressions.append(f"{kind}: req/s {before['req_per_s']} -> {after['req_per_s']}")
+            for name in ('p95', 'p99'):
+                old, new = before['latency_ms'][name], after['latency_ms'][name]
+                if old and new > old * (1 + tolerance):
+                    regressions.append(f"{kind}: {name} {old}ms -> {new}ms")
+            if after['queries_per_request'] > before['queries_per_request']:
+                regressions.append(
+                    f"{kind}: consultas/pet {before['queries_per_request']} -> {after['queries_per_request']}"
+                )
+
+        if regressions:
+            raise CommandError("Regresiones frente a la línea base:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Sin regresiones frente a la línea base."))
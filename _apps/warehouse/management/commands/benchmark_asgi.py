@@ -0,0 +1,151 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from _apps.warehouse.benchmarking import summarize
+from _apps.warehouse.models import Product
+
+# Prefijo reservado para los SKU de los productos de prueba
+BENCHMARK_SKU_PREFIX = 'ASGI'
+
+
+class Command(BaseCommand):
+    """
+    Compara el camino síncrono (WSGI) con el asíncrono (ASGI) bajo alta concurrencia.
+
+    Envía la misma mezcla de listados, consultas de detalle y pedidos primero
+    a través del manejador WSGI, con un número fijo de hilos de trabajo (como
+    un worker de gunicorn), y luego a través del manejador ASGI, con todas las
+    peticiones concurrentes en un único bucle de eventos. `--io-delay` agrega
+    una espera a cada consulta para simular una base de datos remota. Debe
+    ejecutarse contra una base de datos desechable.
+
+    Uso:
+        python manage.py benchmark_asgi --concurrency 200 --wsgi-threads 8 --io-delay 5
+    """
+    help = "Compara req/s, latencias y threads entre las vistas síncronas (WSGI) y asíncronas (ASGI)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Peticiones totales por modo.")
+        parser.add_argument('--concurrency', type=int, default=200, help="Clientes concurrentes.")
+        parser.add_argument('--wsgi-threads', type=int, default=8, help="Hilos de trabajo del modo WSGI.")
+        parser.add_argument('--io-delay', type=float, default=5.0, help="Milisegundos de espera simulada por consulta.")
+        parser.add_argument('--products', type=int, default=50, help="Productos de prueba.")
+        parser.add_argument('--seed', type=int, default=0, help="Semilla para reproducir la carga.")
+        parser.add_argument('--output', default='bench_asgi.json', help="Archivo JSON de resultados.")
+
+    def handle(self, *args, **options):
+        Product.objects.filter(sku__startswith=BENCHMARK_SKU_PREFIX).delete()
+        products = [
+            Product.objects.create(sku=f'{BENCHMARK_SKU_PREFIX}{index:05d}', name=f'Benchmark {index}', stock=10000, low_stock_threshold=0)
+            for index in range(options['products'])
+        ]
+        rng = random.Random(options['seed'])
+        plan = [(rng.choice(('list', 'detail', 'detail', 'order')), rng.choice(products)) for _ in range(options['requests'])]
+        delay = options['io_delay'] / 1000
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            connection.execute_wrappers.append(slow_query)
+
+        connection_created.connect(add_delay)
+        connection.execute_wrappers.append(slow_query)
+        # Los clientes de prueba envían siempre el host 'testserver'; el control
+        # de admisión se desactiva para medir la capacidad de cada servidor.
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], ADMISSION_CONTROL={}):
+                results = {
+                    'wsgi': self._measure(lambda: self._run_wsgi(plan, options['wsgi_threads'])),
+                    'asgi': self._measure(lambda: asyncio.run(self._run_asgi(plan, options['concurrency']))),
+                }
+        finally:
+            connection_created.disconnect(add_delay)
+            connection.execute_wrappers.remove(slow_query)
+            Product.objects.filter(pk__in=[product.pk for product in products]).delete()
+
+        results.update({
+            'timestamp': timezone.now().isoformat(),
+            'config': {name: options[name] for name in ('requests', 'concurrency', 'wsgi_threads', 'io_delay', 'products', 'seed')},
+        })
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+
+        for mode in ('wsgi', 'asgi'):
+            summary = results[mode]
+            latency = summary['latency_ms']
+            self.stdout.write(
+                f"{mode:<5} req/s={summary['req_per_s']:<9} p50={latency['p50']}ms "
+                f"p95={latency['p95']}ms p99={latency['p99']}ms hilos_max={summary['peak_threads']}"
+            )
+
+    def _measure(self, run):
+        peak = [threading.active_count()]
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(0.01):
+                peak[0] = max(peak[0], threading.active_count())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+        samples = run()
+        elapsed = time.perf_counter() - start
+        done.set()
+        sampler.join()
+        return {**summarize(samples, elapsed), 'peak_threads': peak[0]}
+
+    def _request_args(self, kind, product):
+        if kind == 'list':
+            return 'get', reverse('product-list-create'), {'page_size': 20}, {}
+        if kind == 'detail':
+            return 'get', reverse('product-detail', args=[product.pk]), None, {}
+        payload = {'product_id': str(product.pk), 'quantity': 1}
+        return 'post', reverse('create-order'), payload, {'content_type': 'application/json'}
+
+    def _run_wsgi(self, plan, threads):
+        local = threading.local()
+
+        def send(item):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            method, url, data, extra = self._request_args(*item)
+            start = time.perf_counter()
+            response = getattr(local.client, method)(url, data, **extra)
+            return time.perf_counter() - start, 0, response.status_code
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            samples = list(executor.map(send, plan))
+            executor.map(lambda _: connections.close_all(), range(threads))
+        return samples
+
+    async def _run_asgi(self, plan, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send(item):
+            method, url, data, extra = self._request_args(*item)
+            async with semaphore:
+                # Cada petición tiene su propio contexto de hilos, como en ASGIHandler.
+                async with ThreadSensitiveContext():
+                    start = time.perf_counter()
+                    response = await getattr(client, method)(url, data, **extra)
+                    return time.perf_counter() - start, 0, response.status_code
+
+        return await asyncio.gather(*(send(item) for item in plan))
@@ -0,0 +1,94 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from _apps.warehouse.fastpath import PRODUCT_COLUMNS, map_product_row
+from _apps.warehouse.models import Product
+from _apps.warehouse.renderers import FastJSONRenderer, orjson
+from _apps.warehouse.serializers import ProductSerializer
+
+# Prefijo reservado para los SKU de los productos de prueba
+BENCHMARK_SKU_PREFIX = 'SER'
+
+
+class Command(BaseCommand):
+    """
+    Mide filas por segundo al serializar páginas de productos.
+
+    Compara el camino actual (instancias de `Product` + `ProductSerializer` +
+    `JSONRenderer`) con el rápido (`values_list()` + mapeador precompilado +
+    `FastJSONRenderer`), separando el costo de la consulta del de la
+    serialización, y comprueba que ambos producen los mismos bytes.
+
+    Uso:
+        python manage.py benchmark_serialization --products 5000 --page-size 1000
+    """
+    help = "Compara filas/s del serializador DRF frente a values_list + orjson en el listado de productos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000, help="Productos de prueba.")
+        parser.add_argument('--page-size', type=int, default=1000, help="Filas por página serializada.")
+        parser.add_argument('--repeat', type=int, default=5, help="Repeticiones de cada medición.")
+        parser.add_argument('--output', default='bench_serialization.json', help="Archivo JSON de resultados.")
+
+    def handle(self, *args, **options):
+        Product.objects.filter(sku__startswith=BENCHMARK_SKU_PREFIX).delete()
+        Product.objects.bulk_create(
+            Product(sku=f'{BENCHMARK_SKU_PREFIX}{index:07d}', name=f'Benchmark ñ {index}', description='Producto de prueba' if index % 2 else None)
+            for index in range(options['products'])
+        )
+        queryset = Product.objects.filter(sku__startswith=BENCHMARK_SKU_PREFIX).order_by('sku')[:options['page_size']]
+
+        def baseline():
+            return JSONRenderer().render(ProductSerializer(list(queryset), many=True).data)
+
+        def fast():
+            return FastJSONRenderer().render([map_product_row(row) for row in queryset.values_list(*PRODUCT_COLUMNS)])
+
+        try:
+            if baseline() != fast():
+                raise CommandError("Las dos rutas no producen la misma salida.")
+
+            instances = list(queryset)
+            rows = list(queryset.values_list(*PRODUCT_COLUMNS))
+            results = {
+                'baseline': {
+                    'end_to_end': self._rows_per_second(baseline, len(rows), options['repeat']),
+                    'serialize_only': self._rows_per_second(
+                        lambda: JSONRenderer().render(ProductSerializer(instances, many=True).data), len(rows), options['repeat']
+                    ),
+                },
+                'fast': {
+                    'end_to_end': self._rows_per_second(fast, len(rows), options['repeat']),
+                    'serialize_only': self._rows_per_second(
+                        lambda: FastJSONRenderer().render([map_product_row(row) for row in rows]), len(rows), options['repeat']
+                    ),
+                },
+            }
+        finally:
+            Product.objects.filter(sku__startswith=BENCHMARK_SKU_PREFIX).delete()
+
+        results.update({
+            'timestamp': timezone.now().isoformat(),
+            'orjson': orjson is not None,
+            'config': {name: options[name] for name in ('products', 'page_size', 'repeat')},
+        })
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+
+        for mode in ('baseline', 'fast'):
+            self.stdout.write(
+                f"{mode:<9} filas/s={results[mode]['end_to_end']:<12} "
+                f"(sólo serialización: {results[mode]['serialize_only']})"
+            )
+
+    def _rows_per_second(self, run, rows, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        return round(rows / best) if best else 0
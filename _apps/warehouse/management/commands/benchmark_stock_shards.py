@@ -0,0 +1,67 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from _apps.warehouse.models import Product
+
+# SKU reservado para el producto de prueba
+BENCHMARK_SKU = 'BENCHSHARD'
+
+
+class Command(BaseCommand):
+    """
+    Mide pedidos por segundo sobre un único SKU con y sin stock particionado.
+
+    Crea un producto temporal, lanza varios hilos que descuentan una unidad por
+    pedido y reporta el rendimiento de cada modo. Debe ejecutarse contra una
+    base de datos desechable.
+
+    Uso:
+        python manage.py benchmark_stock_shards --shards 8 --threads 16 --orders 4000
+    """
+    help = "Compara pedidos/segundo en un SKU caliente con y sin particiones de stock."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, default=8, help="Particiones del modo particionado.")
+        parser.add_argument('--threads', type=int, default=16, help="Hilos concurrentes.")
+        parser.add_argument('--orders', type=int, default=4000, help="Pedidos totales por modo.")
+
+    def handle(self, *args, **options):
+        for shards in (0, options['shards']):
+            elapsed, placed, consistent = self._run(shards, options['threads'], options['orders'])
+            self.stdout.write(
+                f"particiones={shards:<3} pedidos={placed:<6} tiempo={elapsed:.2f}s "
+                f"pedidos/s={placed / elapsed:.1f} consistente={'sí' if consistent else 'NO'}"
+            )
+
+    def _run(self, shards, threads, orders):
+        Product.objects.filter(sku=BENCHMARK_SKU).delete()
+        product = Product.objects.create(sku=BENCHMARK_SKU, name='Benchmark', stock=orders, low_stock_threshold=0)
+        if shards:
+            product.set_stock_shards(shards)
+
+        placed = [0] * threads
+        per_thread = orders // threads
+
+        def worker(slot):
+            try:
+                for _ in range(per_thread):
+                    if Product.objects.decrement_stock(product.pk, 1) is not None:
+                        placed[slot] += 1
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        product.refresh_from_db()
+        consistent = product.total_stock == orders - sum(placed)
+        product.delete()
+        return elapsed, sum(placed), consistent
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.schema import build_artifacts
+
+
+class Command(BaseCommand):
+    """
+    Genera el esquema OpenAPI y las páginas de Swagger UI y ReDoc.
+
+    Los archivos (y su versión gzip) se escriben en `API_SCHEMA_DIR` y se
+    sirven tal cual en `swagger.json`, `swagger/` y `redoc/`.
+
+    Uso:
+        python manage.py build_api_schema
+        python manage.py build_api_schema --output-dir /srv/schema
+    """
+    help = "Genera el esquema OpenAPI precalculado y las páginas de documentación."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', default=settings.API_SCHEMA_DIR, help="Directorio de salida.")
+
+    def handle(self, *args, **options):
+        sizes = build_artifacts(options['output_dir'])
+        for name, size in sizes.items():
+            self.stdout.write(f"{name}: {size} bytes")
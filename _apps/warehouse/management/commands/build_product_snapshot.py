@@ -0,0 +1,41 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from _apps.warehouse.changefeed import build_snapshot
+from _apps.warehouse.models import ProductTombstone
+
+
+class Command(BaseCommand):
+    """
+    Genera la foto comprimida del catálogo que sirve `products/snapshot/`.
+
+    Después de cada foto purga las marcas de borrado con más de
+    `CHANGE_FEED_TOMBSTONE_DAYS` días: los clientes que quedaron más atrás
+    reciben 410 en el feed y vuelven a partir de la foto.
+
+    Uso:
+        python manage.py build_product_snapshot
+        python manage.py build_product_snapshot --interval 900
+    """
+    help = "Genera la foto del catálogo y purga las marcas de borrado antiguas; con --interval se ejecuta de forma periódica."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.PRODUCT_SNAPSHOT_PATH, help="Archivo de salida (.json.gz).")
+        parser.add_argument('--interval', type=float, help="Segundos entre fotos (se ejecuta indefinidamente).")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            seq, rows = build_snapshot(options['output'])
+            before = timezone.now() - timedelta(days=settings.CHANGE_FEED_TOMBSTONE_DAYS)
+            purged = ProductTombstone.objects.purge(before)
+            self.stdout.write(f"Foto en la secuencia {seq}: {rows} productos; marcas de borrado purgadas: {purged}")
+            if not interval:
+                return
+            close_old_connections()
+            time.sleep(interval)
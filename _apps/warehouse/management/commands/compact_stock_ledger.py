@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from _apps.warehouse.models import StockMovement
+
+
+class Command(BaseCommand):
+    """
+    Toma fotos del stock de los productos con movimientos nuevos en el libro.
+
+    Es opcional: el stock se actualiza al registrar cada movimiento y las
+    fotos sólo acortan la suma que hace `Product.stock_as_of`.
+
+    Uso:
+        python manage.py compact_stock_ledger
+        python manage.py compact_stock_ledger --interval 30
+    """
+    help = "Toma fotos del stock de los productos con movimientos nuevos; con --interval se ejecuta de forma periódica."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help="Segundos entre fotos (se ejecuta indefinidamente).")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            compacted = StockMovement.objects.compact()
+            self.stdout.write(f"Productos fotografiados: {compacted}")
+            if not interval:
+                return
+            close_old_connections()
+            time.sleep(interval)
@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from _apps.warehouse.exporter import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, gzip_stream, iter_export
+
+
+class Command(BaseCommand):
+    """
+    Exporta el catálogo de productos en NDJSON o CSV.
+
+    Uso:
+        python manage.py export_products --format csv --gzip -o catalogo.csv.gz
+    """
+    help = "Exporta el catálogo de productos en streaming (NDJSON o CSV)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('-o', '--output', help="Archivo de salida (por defecto, la salida estándar).")
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson', help="Formato de salida.")
+        parser.add_argument('--gzip', action='store_true', help="Comprime la salida con gzip.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Filas leídas por viaje a la base de datos.")
+
+    def handle(self, *args, **options):
+        chunks = iter_export(options['format'], chunk_size=options['chunk_size'])
+        if options['gzip']:
+            chunks = gzip_stream(chunks)
+
+        try:
+            output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        except OSError as exc:
+            raise CommandError(f"No se pudo abrir el archivo de salida: {exc}")
+
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from _apps.warehouse.importer import DEFAULT_CHUNK_SIZE, IMPORT_FORMATS, detect_format, import_products
+
+
+class Command(BaseCommand):
+    """
+    Importa productos desde un archivo CSV o NDJSON.
+
+    Uso:
+        python manage.py import_products productos.csv --chunk-size 5000
+    """
+    help = "Importa (o actualiza por SKU) productos desde un archivo CSV o NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Ruta del archivo a importar.")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Formato del archivo (por defecto se deduce de la extensión).")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Filas por bloque de inserción.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or detect_format(path)
+
+        try:
+            with open(path, 'rb') as stream:
+                report = import_products(stream, file_format, chunk_size=options['chunk_size'])
+        except OSError as exc:
+            raise CommandError(f"No se pudo leer el archivo: {exc}")
+
+        for error in report.errors:
+            self.stderr.write(f"Línea {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Filas procesadas: {report.processed}, importadas: {report.imported}, con error: {report.failed}"
+        ))
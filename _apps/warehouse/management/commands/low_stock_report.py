@@ -0,0 +1,49 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from _apps.warehouse.models import Product
+
+# Columnas del reporte, en orden
+REPORT_FIELDS = ('sku', 'name', 'stock', 'low_stock_threshold', 'deficit')
+
+
+class Command(BaseCommand):
+    """
+    Muestra los productos con el stock por debajo de su umbral.
+
+    Lee el índice parcial `product_low_stock_idx`, así que el costo depende de
+    cuántos productos tienen stock bajo y no del tamaño del catálogo.
+
+    Uso:
+        python manage.py low_stock_report
+        python manage.py low_stock_report --order deficit --format csv > low_stock.csv
+    """
+    help = "Muestra los productos con stock bajo, ordenados por SKU o por faltante."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--order', choices=['sku', 'deficit'], default='sku', help="Orden: SKU o mayor faltante primero.")
+        parser.add_argument('--format', choices=['table', 'csv'], default='table', help="Formato de salida.")
+        parser.add_argument('--limit', type=int, help="Cantidad máxima de productos.")
+
+    def handle(self, *args, **options):
+        ordering = ('sku',) if options['order'] == 'sku' else ('-deficit', 'sku')
+        rows = Product.objects.low_stock().order_by(*ordering).values_list(*REPORT_FIELDS)
+        if options['limit']:
+            rows = rows[:options['limit']]
+
+        # El faltante se calcula en la base de datos; se muestra con dos decimales como el stock.
+        rows = ((sku, name, stock, threshold, f'{deficit:.2f}') for sku, name, stock, threshold, deficit in rows.iterator())
+
+        if options['format'] == 'csv':
+            writer = csv.writer(self.stdout, lineterminator='\n')
+            writer.writerow(REPORT_FIELDS)
+            writer.writerows(rows)
+            return
+
+        count = 0
+        self.stdout.write(f"{'SKU':<10}  {'Nombre':<50}  {'Stock':>10}  {'Umbral':>6}  {'Faltante':>10}")
+        for sku, name, stock, threshold, deficit in rows:
+            self.stdout.write(f"{sku:<10}  {name:<50}  {stock:>10}  {threshold:>6}  {deficit:>10}")
+            count += 1
+        self.stdout.write(f"Productos con stock bajo: {count}")
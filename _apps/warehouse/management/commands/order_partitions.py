@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections, router
+from django.utils import timezone
+
+from _apps.warehouse.models import Order
+from _apps.warehouse.partitions import add_months, drop_orders_before, maintain_partitions, month_of
+
+
+class Command(BaseCommand):
+    """
+    Mantiene las particiones mensuales de los pedidos.
+
+    Crea las particiones de los próximos `ORDER_PARTITION_MONTHS_AHEAD` meses
+    y, con `ORDER_RETENTION_MONTHS`, elimina los pedidos de los meses más
+    antiguos. Los acumulados de ventas (`DailySales`) no se eliminan.
+
+    Uso:
+        python manage.py order_partitions
+        python manage.py order_partitions --retain-months 12 --interval 86400
+    """
+    help = "Crea las particiones futuras de los pedidos y elimina los meses antiguos; con --interval se ejecuta de forma periódica."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=settings.ORDER_PARTITION_MONTHS_AHEAD, help="Meses de particiones a crear por adelantado.")
+        parser.add_argument('--retain-months', type=int, default=settings.ORDER_RETENTION_MONTHS, help="Meses de pedidos a conservar, incluido el actual (0 = todos).")
+        parser.add_argument('--interval', type=float, help="Segundos entre ejecuciones (se ejecuta indefinidamente).")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            connection = connections[router.db_for_write(Order)]
+            created = maintain_partitions(connection, options['months_ahead'])
+            self.stdout.write(f"Particiones creadas: {', '.join(created) or 'ninguna'}")
+            if options['retain_months'] > 0:
+                before = add_months(month_of(timezone.now()), 1 - options['retain_months'])
+                dropped, deleted = drop_orders_before(connection, before)
+                self.stdout.write(
+                    f"Pedidos anteriores a {before:%Y-%m}: particiones eliminadas: {', '.join(dropped) or 'ninguna'}; "
+                    f"filas borradas: {deleted}"
+                )
+            if not interval:
+                return
+            close_old_connections()
+            time.sleep(interval)
@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from _apps.warehouse.profiling import aggregate, list_profiles, load_profiles, profile_dir
+
+
+class Command(BaseCommand):
+    """
+    Agrega los perfiles guardados por `ProfilingMiddleware`.
+
+    Muestra las rutas perfiladas, las funciones con más tiempo y las
+    consultas SQL con más tiempo total entre todos los perfiles.
+
+    Uso:
+        python manage.py profile_report --top 30 --route create-order
+        python manage.py profile_report --format json
+    """
+    help = "Reporta las funciones y consultas más costosas de los perfiles de peticiones guardados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="Directorio de los perfiles (por defecto PROFILING_DIR).")
+        parser.add_argument('--route', help="Sólo los perfiles de esta ruta.")
+        parser.add_argument('--top', type=int, default=20, help="Funciones y consultas a mostrar.")
+        parser.add_argument('--sort', choices=('tottime', 'cumtime', 'calls'), default='tottime', help="Orden de las funciones.")
+        parser.add_argument('--format', choices=('table', 'json'), default='table', help="Formato de salida.")
+        parser.add_argument('--clear', action='store_true', help="Borrar los perfiles después del reporte.")
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or profile_dir()
+        report = aggregate(load_profiles(directory, options['route']), top=options['top'], sort=options['sort'])
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._write_table(report)
+
+        if options['clear']:
+            for path in list_profiles(directory):
+                path.unlink(missing_ok=True)
+
+    def _write_table(self, report):
+        self.stdout.write(f"Perfiles: {report['profiles']}")
+        if not report['profiles']:
+            return
+
+        self.stdout.write("\nRutas")
+        self.stdout.write(f"{'peticiones':>10} {'ms prom.':>10} {'consultas':>10}  ruta")
+        for row in report['routes']:
+            average = row['duration'] / row['requests'] * 1000
+            self.stdout.write(f"{row['requests']:>10} {average:>10.2f} {row['queries'] / row['requests']:>10.1f}  {row['route']}")
+
+        self.stdout.write("\nFunciones")
+        self.stdout.write(f"{'llamadas':>10} {'propio ms':>10} {'acum. ms':>10}  función")
+        for row in report['functions']:
+            self.stdout.write(f"{row['calls']:>10} {row['tottime'] * 1000:>10.2f} {row['cumtime'] * 1000:>10.2f}  {row['function']}")
+
+        self.stdout.write("\nConsultas")
+        self.stdout.write(f"{'veces':>10} {'total ms':>10} {'máx. ms':>10}  sql")
+        for row in report['queries']:
+            self.stdout.write(f"{row['count']:>10} {row['total'] * 1000:>10.2f} {row['max'] * 1000:>10.2f}  {row['sql']}")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from _apps.warehouse.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    """
+    Elimina por lotes las claves de idempotencia expiradas.
+
+    Uso:
+        python manage.py purge_idempotency_keys
+        python manage.py purge_idempotency_keys --interval 3600
+    """
+    help = "Elimina las claves de idempotencia expiradas; con --interval se ejecuta de forma periódica."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help="Claves eliminadas por sentencia.")
+        parser.add_argument('--interval', type=float, help="Segundos entre limpiezas (se ejecuta indefinidamente).")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            deleted = IdempotencyKey.objects.purge_expired(batch_size=options['batch_size'])
+            self.stdout.write(f"Claves eliminadas: {deleted}")
+            if not interval:
+                return
+            close_old_connections()
+            time.sleep(interval)
@@ -0,0 +1,167 @@
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, router
+
+from _apps.warehouse.events import check_backend
+from _apps.warehouse.models import Order
+from _apps.warehouse.partitions import ensure_partitions, maintain_partitions
+
+logger = logging.getLogger(__name__)
+
+# Clases de worker admitidas y la aplicación que sirve cada una
+WORKER_CLASSES = {
+    'sync': ('sync', 'core.wsgi:application'),
+    'gthread': ('gthread', 'core.wsgi:application'),
+    'uvicorn': ('uvicorn.workers.UvicornWorker', 'core.asgi:application'),
+}
+
+
+def default_workers(worker_class):
+    """
+    Número de procesos según las CPUs disponibles: (2 x CPUs) + 1 para los
+    workers WSGI, que se bloquean en la base de datos, y uno por CPU para
+    uvicorn, cuyo bucle de eventos ya atiende muchas peticiones a la vez.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    return cpus if worker_class == 'uvicorn' else cpus * 2 + 1
+
+
+def close_connections(server, worker):
+    """
+    Cierra las conexiones (y el pool, si existe) del proceso maestro antes de
+    crear los workers, para que ningún socket se comparta entre procesos.
+    """
+    for conn in connections.all(initialized_only=True):
+        conn.close()
+        if hasattr(conn, 'close_pool'):
+            conn.close_pool()
+
+
+def keep_partitions(server):
+    """
+    Hook `when_ready`: en el proceso maestro, revisa las particiones de los
+    pedidos cada `ORDER_PARTITION_INTERVAL` segundos en un hilo propio.
+    """
+    interval = settings.ORDER_PARTITION_INTERVAL
+    if interval:
+        threading.Thread(target=_partition_loop, args=(interval,), name='order-partitions', daemon=True).start()
+
+
+def _partition_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            maintain_partitions(connections[router.db_for_write(Order)], settings.ORDER_PARTITION_MONTHS_AHEAD)
+        except DatabaseError:
+            logger.exception("No se pudieron revisar las particiones de pedidos.")
+        finally:
+            # Las conexiones de este hilo no deben quedar abiertas al crear workers.
+            connections.close_all()
+
+
+class Command(BaseCommand):
+    """
+    Sirve la aplicación en producción con gunicorn.
+
+    Precarga la aplicación en el proceso maestro, crea los workers a partir del
+    número de CPUs y los recicla tras `--max-requests` peticiones (con un margen
+    aleatorio para que no se reinicien todos a la vez). Con `--worker-class uvicorn`
+    sirve la aplicación ASGI. Antes de iniciar crea las particiones de pedidos
+    que falten (y no arranca si no puede) y el proceso maestro las revisa de
+    forma periódica. Con varios workers uvicorn, el stream de stock usa un
+    backend de eventos entre procesos (ver `check_backend`). Las opciones por
+    defecto se leen de los settings SERVE_*.
+
+    Uso:
+        python manage.py serve --migrate
+        python manage.py serve --worker-class uvicorn --workers 4
+    """
+    help = "Sirve la aplicación en producción con gunicorn (WSGI) o uvicorn (ASGI)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', default=settings.SERVE_BIND, help="Dirección y puerto de escucha.")
+        parser.add_argument('--worker-class', choices=sorted(WORKER_CLASSES), default=settings.SERVE_WORKER_CLASS, help="Tipo de worker.")
+        parser.add_argument('--workers', type=int, default=settings.SERVE_WORKERS, help="Procesos de trabajo (por defecto, según las CPUs).")
+        parser.add_argument('--threads', type=int, default=settings.SERVE_THREADS, help="Hilos por proceso (solo gthread).")
+        parser.add_argument('--max-requests', type=int, default=settings.SERVE_MAX_REQUESTS, help="Peticiones antes de reciclar un worker (0 = nunca).")
+        parser.add_argument('--max-requests-jitter', type=int, default=settings.SERVE_MAX_REQUESTS_JITTER, help="Margen aleatorio de --max-requests.")
+        parser.add_argument('--timeout', type=int, default=settings.SERVE_TIMEOUT, help="Segundos antes de reiniciar un worker bloqueado.")
+        parser.add_argument('--forwarded-allow-ips', default=settings.SERVE_FORWARDED_ALLOW_IPS, help="IP (separadas por comas) cuyas cabeceras X-Forwarded-* se aceptan.")
+        parser.add_argument('--no-preload', action='store_true', help="Carga la aplicación en cada worker en lugar del proceso maestro.")
+        parser.add_argument('--migrate', action='store_true', help="Aplica las migraciones antes de iniciar.")
+        parser.add_argument('--print-config', action='store_true', help="Muestra la configuración de gunicorn y termina.")
+
+    def handle(self, *args, **options):
+        config = self.build_config(options)
+
+        if options['print_config']:
+            for name, value in sorted(config.items()):
+                if not callable(value):
+                    self.stdout.write(f"{name} = {value}")
+            return
+
+        try:
+            from gunicorn.app.base import BaseApplication
+        except ImportError:
+            raise CommandError("gunicorn no está instalado.")
+
+        if options['worker_class'] == 'uvicorn':
+            try:
+                check_backend(config['workers'])
+            except ImproperlyConfigured as exc:
+                raise CommandError(str(exc))
+
+        if options['migrate']:
+            call_command('migrate', interactive=False, verbosity=options['verbosity'])
+
+        try:
+            ensure_partitions(connections[router.db_for_write(Order)], settings.ORDER_PARTITION_MONTHS_AHEAD)
+        except DatabaseError as exc:
+            raise CommandError(f"No se pudieron crear las particiones de pedidos: {exc}")
+
+        app_path = WORKER_CLASSES[options['worker_class']][1]
+
+        class Application(BaseApplication):
+            def load_config(self):
+                for name, value in config.items():
+                    self.cfg.set(name, value)
+
+            def load(self):
+                module, name = app_path.split(':')
+                return getattr(__import__(module, fromlist=[name]), name)
+
+        self.stdout.write(
+            f"Sirviendo {app_path} en {config['bind'][0]} con {config['workers']} workers {options['worker_class']}"
+        )
+        Application().run()
+
+    def build_config(self, options):
+        """
+        Traduce las opciones del comando a la configuración de gunicorn.
+        """
+        worker_class = options['worker_class']
+        if worker_class == 'uvicorn' and settings.DATABASES['default'].get('CONN_MAX_AGE'):
+            self.stderr.write(
+                "Las conexiones persistentes no se reutilizan con workers ASGI; usa DB_POOL=1."
+            )
+        return {
+            'bind': [options['bind']],
+            'worker_class': WORKER_CLASSES[worker_class][0],
+            'workers': options['workers'] or default_workers(worker_class),
+            'threads': options['threads'] if worker_class == 'gthread' else 1,
+            'max_requests': options['max_requests'],
+            'max_requests_jitter': options['max_requests_jitter'],
+            'timeout': options['timeout'],
+            'preload_app': not options['no_preload'],
+            'pre_fork': close_connections,
+            'when_ready': keep_partitions,
+            'accesslog': '-',
+            'forwarded_allow_ips': options['forwarded_allow_ips'],
+        }
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from _apps.warehouse.models import Product
+
+
+class Command(BaseCommand):
+    """
+    Activa, cambia o desactiva el stock particionado de un producto.
+
+    Uso:
+        python manage.py shard_stock SKU123 --shards 8
+        python manage.py shard_stock SKU123 --shards 0
+        python manage.py shard_stock --sync
+    """
+    help = "Reparte el stock de un producto en N particiones (0 para desactivar) o repara los totales."
+
+    def add_arguments(self, parser):
+        parser.add_argument('sku', nargs='?', help="SKU del producto.")
+        parser.add_argument('--shards', type=int, help="Cantidad de particiones (0 desactiva el particionado).")
+        parser.add_argument('--sync', action='store_true', help="Vuelve a copiar en `stock` el total de todos los productos particionados (reparación).")
+
+    def handle(self, *args, **options):
+        if options['sync']:
+            synced = 0
+            for product in Product.objects.filter(stock_shards__gt=0).iterator():
+                product.sync_stock()
+                synced += 1
+            self.stdout.write(self.style.SUCCESS(f"Productos consolidados: {synced}"))
+            return
+
+        if not options['sku'] or options['shards'] is None:
+            raise CommandError("Indique el SKU y --shards, o use --sync.")
+        if options['shards'] < 0:
+            raise CommandError("--shards no puede ser negativo.")
+
+        try:
+            product = Product.objects.get(sku=options['sku'])
+        except Product.DoesNotExist:
+            raise CommandError(f"El producto con SKU {options['sku']} no existe.")
+
+        product.set_stock_shards(options['shards'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Producto {product.sku}: {product.stock_shards} particiones, stock total {product.stock}"
+        ))
@@ -0,0 +1,290 @@
+import contextvars
+import fcntl
+import json
+import os
+import threading
+import time
+from glob import glob
+
+from django.conf import settings
+
+# Límites de los histogramas de latencia (segundos) y de consultas por petición
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Definición de las métricas: tipo, ayuda, etiquetas y límites de los histogramas
+METRICS = {
+    'http_requests_total': ('counter', "Peticiones HTTP atendidas.", ('route', 'method', 'status'), None),
+    'http_request_duration_seconds': ('histogram', "Latencia de las peticiones HTTP.", ('route', 'method'), LATENCY_BUCKETS),
+    'http_requests_in_flight': ('gauge', "Peticiones HTTP en curso.", (), None),
+    'http_requests_shed_total': ('counter', "Peticiones rechazadas por el control de admisión.", ('route', 'reason'), None),
+    'db_queries_total': ('counter', "Consultas a la base de datos.", ('route',), None),
+    'db_query_duration_seconds_total': ('counter', "Tiempo total en consultas a la base de datos.", ('route',), None),
+    'db_queries_per_request': ('histogram', "Consultas a la base de datos por petición.", ('route',), QUERY_BUCKETS),
+    'warehouse_orders_placed_total': ('counter', "Líneas de pedido aceptadas.", (), None),
+    'warehouse_stock_rejected_total': ('counter', "Líneas de pedido rechazadas por falta de stock.", (), None),
+    'warehouse_restocks_total': ('counter', "Reposiciones de stock registradas.", (), None),
+    'warehouse_idempotent_replays_total': ('counter', "Respuestas repetidas desde una Idempotency-Key.", (), None),
+    'stock_stream_clients': ('gauge', "Clientes conectados al stream de stock.", (), None),
+}
+
+# Archivo con los contadores acumulados de los procesos que ya terminaron
+MERGED_FILE = 'metrics_merged.json'
+
+_request_queries = contextvars.ContextVar('warehouse_request_queries', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Envoltorio de consultas que suma cantidad y duración a la petición en
+    curso, si `MetricsMiddleware` abrió una en la variable de contexto.
+    """
+    queries = _request_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries[0] += 1
+        queries[1] += time.perf_counter() - start
+
+
+def install_query_counter(connection):
+    """
+    Agrega `count_query` a los envoltorios de `connection`, si no lo tiene.
+
+    Igual que `install_query_hook` del perfilado, se inserta primero para no
+    interferir con los envoltorios temporales de `connection.execute_wrapper`.
+    """
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_query)
+
+
+def track_queries():
+    """
+    Abre el contador de consultas de una petición; retorna `(contador, token)`.
+
+    El contador vive en una variable de contexto, que `sync_to_async` copia a
+    su hilo, así que también cuenta las consultas que una vista asíncrona
+    ejecuta fuera del bucle de eventos.
+    """
+    queries = [0, 0.0]
+    return queries, _request_queries.set(queries)
+
+
+def untrack_queries(token):
+    _request_queries.reset(token)
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas en memoria del proceso, con exposición en formato Prometheus.
+
+    Las actualizaciones sólo toman un candado y modifican un diccionario. Si
+    `METRICS_MULTIPROC_DIR` está configurado, un hilo en segundo plano vuelca
+    cada `METRICS_FLUSH_INTERVAL` segundos el estado del proceso a un archivo
+    propio de ese directorio y `render` suma los archivos de todos los procesos;
+    los gauges sólo se suman para procesos vivos. Los archivos de los procesos
+    que ya terminaron (por ejemplo, workers reciclados con `--max-requests`)
+    se funden en un único `metrics_merged.json` y se borran, así que el
+    directorio no crece con cada reciclaje.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._pid = None
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(labels[label] for label in METRICS[name][2]))
+        self._ensure_flusher()
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(labels[label] for label in METRICS[name][2]))
+        buckets = METRICS[name][3]
+        self._ensure_flusher()
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(buckets) + 2)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                [name, list(labels), list(value) if isinstance(value, list) else value]
+                for (name, labels), value in self._values.items()
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        """
+        Retorna todas las métricas en el formato de texto de Prometheus.
+        """
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+        if directory:
+            self.merge_dead(directory)
+        totals = {}
+        for pid, entries in self._collect():
+            _accumulate(totals, entries, gauges=pid == os.getpid() or _pid_alive(pid))
+
+        lines = []
+        for name, (kind, help_text, label_names, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            series = sorted((labels, value) for (metric, labels), value in totals.items() if metric == name)
+            if not series and not label_names and kind != 'histogram':
+                lines.append(f"{name} 0")
+            for labels, value in series:
+                pairs = list(zip(label_names, labels))
+                if kind != 'histogram':
+                    lines.append(f"{name}{_labels(pairs)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets, value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(pairs + [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(pairs + [('le', '+Inf')])} {value[-1]}")
+                lines.append(f"{name}_sum{_labels(pairs)} {_number(value[-2])}")
+                lines.append(f"{name}_count{_labels(pairs)} {value[-1]}")
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """
+        Vuelca el estado del proceso a su archivo en `METRICS_MULTIPROC_DIR`.
+        """
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+        if not directory:
+            return
+        path = os.path.join(directory, f'metrics_{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as output:
+            json.dump(self.snapshot(), output)
+        os.replace(f'{path}.tmp', path)
+
+    def merge_dead(self, directory):
+        """
+        Funde los archivos de los procesos que ya no existen en `MERGED_FILE`
+        (sin sus gauges) y los borra. Un candado de archivo evita que dos
+        procesos fundan el mismo archivo a la vez.
+        """
+        with open(os.path.join(directory, 'metrics.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead = [path for pid, path in _process_files(directory) if pid != os.getpid() and not _pid_alive(pid)]
+            if not dead:
+                return
+            merged_path = os.path.join(directory, MERGED_FILE)
+            totals = {}
+            for path in [merged_path, *dead]:
+                try:
+                    with open(path) as source:
+                        _accumulate(totals, json.load(source), gauges=False)
+                except (OSError, ValueError):
+                    continue
+            with open(f'{merged_path}.tmp', 'w') as output:
+                json.dump([[name, list(labels), value] for (name, labels), value in totals.items()], output)
+            os.replace(f'{merged_path}.tmp', merged_path)
+            for path in dead:
+                os.unlink(path)
+
+    def _collect(self):
+        yield os.getpid(), self.snapshot()
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+        if not directory:
+            return
+        for pid, path in [(None, os.path.join(directory, MERGED_FILE)), *_process_files(directory)]:
+            if pid == os.getpid():
+                continue
+            try:
+                with open(path) as source:
+                    yield pid, json.load(source)
+            except (OSError, ValueError):
+                continue
+
+    def _ensure_flusher(self):
+        # El hilo no sobrevive a un fork: cada proceso arranca el suyo y parte de cero.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                self._values.clear()
+            self._pid = os.getpid()
+            if getattr(settings, 'METRICS_MULTIPROC_DIR', None):
+                threading.Thread(target=self._run, name='metrics-flush', daemon=True).start()
+
+    def _run(self):
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1)
+        while True:
+            time.sleep(interval)
+            self.flush()
+
+
+def _process_files(directory):
+    """
+    Retorna `(pid, ruta)` de los archivos de cada proceso en `directory`.
+    """
+    files = []
+    for path in glob(os.path.join(directory, 'metrics_*.json')):
+        pid = os.path.basename(path)[len('metrics_'):-len('.json')]
+        if pid.isdigit():
+            files.append((int(pid), path))
+    return files
+
+
+def _accumulate(totals, entries, gauges):
+    """
+    Suma las series de `entries` a `totals`; los gauges sólo si `gauges` es True.
+    """
+    for name, labels, value in entries:
+        if name not in METRICS or (METRICS[name][0] == 'gauge' and not gauges):
+            continue
+        key = (name, tuple(labels))
+        if isinstance(value, list):
+            current = totals.setdefault(key, [0] * len(value))
+            for index, item in enumerate(value):
+                current[index] += item
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def _pid_alive(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+registry = MetricsRegistry()
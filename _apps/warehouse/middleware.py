@@ -0,0 +1,264 @@
+import logging
+import math
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+from .admission import KEY_PREFIX, ConcurrencyLimiter, TokenBucket, check_cache, get_cache, get_client_ident, get_rule
+from .metrics import registry, track_queries, untrack_queries
+from .profiling import PROFILE_ID_HEADER, RequestProfile, save_profile, should_profile
+from .renderers import FastJSONRenderer
+from .routers import begin_request, check_pin_cache, end_request
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """
+    Middleware que registra latencia, estado, peticiones en curso y consultas
+    a la base de datos por ruta.
+
+    Las consultas se cuentan y cronometran con `count_query`, un envoltorio
+    permanente de cada conexión que suma en una variable de contexto, así que
+    también se cuentan las que las vistas asíncronas ejecutan en los hilos de
+    `sync_to_async`. No activa el registro de consultas de depuración.
+    Funciona tanto en modo síncrono como asíncrono para no forzar saltos de
+    hilo bajo ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        queries, token = track_queries()
+        registry.inc('http_requests_in_flight')
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            registry.inc('http_requests_in_flight', -1)
+            untrack_queries(token)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries, token = track_queries()
+        registry.inc('http_requests_in_flight')
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            registry.inc('http_requests_in_flight', -1)
+            untrack_queries(token)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    def _record(self, request, response, elapsed, queries):
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        registry.inc('http_requests_total', route=route, method=request.method, status=str(response.status_code))
+        registry.observe('http_request_duration_seconds', elapsed, route=route, method=request.method)
+        registry.inc('db_queries_total', queries[0], route=route)
+        registry.inc('db_query_duration_seconds_total', queries[1], route=route)
+        registry.observe('db_queries_per_request', queries[0], route=route)
+
+
+class AsgiUrlconfMiddleware:
+    """
+    Middleware que resuelve las peticiones ASGI con `ASGI_URLCONF`, donde las
+    rutas calientes apuntan a las vistas asíncronas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        urlconf = getattr(settings, 'ASGI_URLCONF', None)
+        if urlconf and isinstance(request, ASGIRequest):
+            request.urlconf = urlconf
+        return self.get_response(request)
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware que aplica `ADMISSION_CONTROL` antes de que la petición llegue a la vista.
+
+    Para las rutas con regla, comprueba la cubeta de tokens del cliente
+    (429 si se agotó) y ocupa una plaza del límite de concurrencia de la ruta
+    (503 si no hay ninguna libre). Ambos rechazos son inmediatos, incluyen
+    `Retry-After` y no tocan la base de datos. La plaza se libera al terminar
+    la respuesta. La ruta se resuelve aquí, y no en `process_view`, para no
+    forzar un salto de hilo bajo ASGI. Con reglas definidas, advierte al
+    iniciar si la caché de admisión es local al proceso (ver `check_cache`).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        if getattr(settings, 'ADMISSION_CONTROL', None):
+            check_cache()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        rejected, held = self._admit(request)
+        if rejected is not None:
+            return rejected
+        try:
+            return self.get_response(request)
+        finally:
+            if held:
+                held[0].release(held[1])
+
+    async def __acall__(self, request):
+        rejected, held = self._admit(request)
+        if rejected is not None:
+            return rejected
+        try:
+            return await self.get_response(request)
+        finally:
+            if held:
+                held[0].release(held[1])
+
+    def _admit(self, request):
+        """
+        Retorna `(respuesta_de_rechazo, plaza)`; ambos son `None` si la ruta no tiene regla.
+        """
+        if not getattr(settings, 'ADMISSION_CONTROL', None):
+            return None, None
+        try:
+            route = resolve(request.path_info, getattr(request, 'urlconf', None)).url_name
+        except Resolver404:
+            return None, None
+        rule = get_rule(route)
+        if rule is None:
+            return None, None
+
+        cache = get_cache()
+        if rule.get('rate'):
+            bucket = TokenBucket(cache, rule['rate'], rule.get('burst', rule['rate']))
+            wait = bucket.take(f'{KEY_PREFIX}bucket:{route}:{get_client_ident(request)}')
+            if wait:
+                return self._reject(route, 'rate_limited', 429, "Demasiadas peticiones; intente de nuevo más tarde.", wait), None
+
+        if rule.get('concurrency'):
+            limiter = ConcurrencyLimiter(cache, route, rule['concurrency'], getattr(settings, 'ADMISSION_SLOT_LEASE', 30))
+            held = limiter.acquire()
+            if held is None:
+                return self._reject(route, 'overloaded', 503, "El servicio está saturado; intente de nuevo en unos segundos.", 1), None
+            return None, (limiter, held)
+        return None, None
+
+    def _reject(self, route, reason, status, message, retry_after):
+        registry.inc('http_requests_shed_total', route=route, reason=reason)
+        return HttpResponse(
+            FastJSONRenderer().render({"error": message}),
+            status=status,
+            content_type='application/json',
+            headers={'Retry-After': str(math.ceil(retry_after))},
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Middleware que abre el estado de `ReplicaRouter` para cada petición.
+
+    Decide al inicio si la petición lee de la primaria (método no seguro o
+    cliente que escribió hace poco) y, al terminar, fija en la primaria al
+    cliente cuya petición escribió. Con réplicas, advierte al iniciar si la
+    caché de las marcas es local al proceso (ver `check_pin_cache`).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        if getattr(settings, 'DATABASE_REPLICAS', None):
+            check_pin_cache()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state, token = begin_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            end_request(request, state, token)
+
+    async def __acall__(self, request):
+        state, token = begin_request(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            end_request(request, state, token)
+
+
+
+class ProfilingMiddleware:
+    """
+    Middleware que perfila las peticiones elegidas por `should_profile` y
+    guarda cada perfil en el anillo de `PROFILING_DIR`.
+
+    Las peticiones no elegidas pasan sin más costo que el sorteo. El perfil
+    cubre hasta que la vista retorna la respuesta; el cuerpo de una respuesta
+    en streaming se genera después y no queda incluido. A quien pidió el
+    perfil con la cabecera se le devuelve su ID en `X-Profile-Id`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        sampled, requested = should_profile(request)
+        if not sampled:
+            return self.get_response(request)
+        with RequestProfile(request) as profile:
+            response = self.get_response(request)
+        return self._save(profile, response, requested)
+
+    async def __acall__(self, request):
+        sampled, requested = should_profile(request)
+        if not sampled:
+            return await self.get_response(request)
+        with RequestProfile(request, functions=False) as profile:
+            response = await self.get_response(request)
+        return await sync_to_async(self._save)(profile, response, requested)
+
+    def _save(self, profile, response, requested):
+        try:
+            profile_id = save_profile(profile.as_dict(response))
+        except OSError as exc:
+            logger.warning(f"No se pudo guardar el perfil de {profile.request.path}: {exc}")
+            return response
+        if requested:
+            response[PROFILE_ID_HEADER] = profile_id
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0002_alter_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='low_stock_threshold',
+            field=models.PositiveIntegerField(default=10),
+        ),
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sku', models.CharField(max_length=10)),
+                ('name', models.CharField(max_length=50)),
+                ('stock', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('threshold', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_alerts', to='warehouse.product')),
+            ],
+        ),
+    ]
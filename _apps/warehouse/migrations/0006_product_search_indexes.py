@@ -0,0 +1,74 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:32
+
+from django.db import migrations, models
+
+# SQL congelado del índice de nombres de esta migración; no debe seguir a
+# `_apps.warehouse.search` si ese módulo cambia más adelante.
+PRODUCT_TABLE = 'warehouse_product'
+FTS_TABLE = 'warehouse_product_name_fts'
+
+POSTGRESQL_CREATE = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON {PRODUCT_TABLE} USING gin (UPPER(name) gin_trgm_ops)',
+]
+POSTGRESQL_DROP = [
+    'DROP INDEX IF EXISTS product_name_trgm_idx',
+]
+
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, content='{PRODUCT_TABLE}', content_rowid='rowid', tokenize='trigram')",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.rowid, new.name);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.rowid, old.name);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF name ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.rowid, old.name);
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.rowid, new.name);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            cursor.execute(sql)
+
+
+def create_product_name_index(apps, schema_editor):
+    """
+    Crea el índice de trigramas del nombre (GIN en PostgreSQL, FTS5 en SQLite).
+    """
+    run(schema_editor, {'postgresql': POSTGRESQL_DROP, 'sqlite': SQLITE_DROP})
+    run(schema_editor, {'postgresql': POSTGRESQL_CREATE, 'sqlite': SQLITE_CREATE})
+
+
+def drop_product_name_index(apps, schema_editor):
+    run(schema_editor, {'postgresql': POSTGRESQL_DROP, 'sqlite': SQLITE_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0005_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['stock'], name='product_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock__lte', models.F('low_stock_threshold'))), fields=['sku'], name='product_low_stock_idx'),
+        ),
+        migrations.RunPython(create_product_name_index, drop_product_name_index),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:47
+
+from django.db import migrations, models
+
+# SQL congelado del feed de cambios de esta migración; no debe seguir a
+# `_apps.warehouse.changefeed` si ese módulo cambia más adelante (la
+# migración 0012 reemplaza los triggers de PostgreSQL).
+PRODUCT_TABLE = 'warehouse_product'
+TOMBSTONE_TABLE = 'warehouse_producttombstone'
+SEQUENCE = 'warehouse_product_change_seq'
+COUNTER_TABLE = 'warehouse_product_change_counter'
+TRACKED_COLUMNS = ('sku', 'name', 'description', 'stock', 'low_stock_threshold')
+
+_old = ', '.join(f'OLD.{column}' for column in TRACKED_COLUMNS)
+_new = ', '.join(f'NEW.{column}' for column in TRACKED_COLUMNS)
+
+POSTGRESQL_CREATE = [
+    f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE}',
+    f"""CREATE OR REPLACE FUNCTION {SEQUENCE}_bump() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO {TOMBSTONE_TABLE} (product_id, sku, change_seq, deleted_at)
+            VALUES (OLD.id, OLD.sku, nextval('{SEQUENCE}'), clock_timestamp());
+            RETURN OLD;
+        END IF;
+        NEW.change_seq := nextval('{SEQUENCE}');
+        NEW.changed_at := clock_timestamp();
+        RETURN NEW;
+    END $$""",
+    f"""CREATE TRIGGER {SEQUENCE}_bi BEFORE INSERT ON {PRODUCT_TABLE}
+        FOR EACH ROW EXECUTE FUNCTION {SEQUENCE}_bump()""",
+    f"""CREATE TRIGGER {SEQUENCE}_bu BEFORE UPDATE ON {PRODUCT_TABLE}
+        FOR EACH ROW WHEN (({_old}) IS DISTINCT FROM ({_new})) EXECUTE FUNCTION {SEQUENCE}_bump()""",
+    f"""CREATE TRIGGER {SEQUENCE}_ad AFTER DELETE ON {PRODUCT_TABLE}
+        FOR EACH ROW EXECUTE FUNCTION {SEQUENCE}_bump()""",
+    f"UPDATE {PRODUCT_TABLE} SET change_seq = nextval('{SEQUENCE}'), changed_at = clock_timestamp() WHERE change_seq = 0",
+]
+POSTGRESQL_DROP = [
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_bi ON {PRODUCT_TABLE}',
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_bu ON {PRODUCT_TABLE}',
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_ad ON {PRODUCT_TABLE}',
+    f'DROP FUNCTION IF EXISTS {SEQUENCE}_bump()',
+    f'DROP SEQUENCE IF EXISTS {SEQUENCE}',
+]
+
+_now = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+_next = f'UPDATE {COUNTER_TABLE} SET value = value + 1;'
+_changed = ' OR '.join(f'old.{column} IS NOT new.{column}' for column in TRACKED_COLUMNS)
+
+SQLITE_TRIGGERS = [
+    f'{SEQUENCE}_ai',
+    f'{SEQUENCE}_au',
+    f'{SEQUENCE}_ad',
+]
+SQLITE_CREATE = [
+    *(f'DROP TRIGGER IF EXISTS {name}' for name in SQLITE_TRIGGERS),
+    f'CREATE TABLE IF NOT EXISTS {COUNTER_TABLE} (value integer NOT NULL)',
+    f"""INSERT INTO {COUNTER_TABLE} (value)
+        SELECT COALESCE((SELECT MAX(rowid) FROM {PRODUCT_TABLE}), 0)
+        WHERE NOT EXISTS (SELECT 1 FROM {COUNTER_TABLE})""",
+    f"""UPDATE {PRODUCT_TABLE} SET change_seq = rowid, changed_at = {_now} WHERE change_seq = 0""",
+    f"""CREATE TRIGGER {SEQUENCE}_ai AFTER INSERT ON {PRODUCT_TABLE} BEGIN
+        {_next}
+        UPDATE {PRODUCT_TABLE} SET change_seq = (SELECT value FROM {COUNTER_TABLE}), changed_at = {_now}
+        WHERE rowid = new.rowid;
+    END""",
+    f"""CREATE TRIGGER {SEQUENCE}_au AFTER UPDATE ON {PRODUCT_TABLE} WHEN {_changed} BEGIN
+        {_next}
+        UPDATE {PRODUCT_TABLE} SET change_seq = (SELECT value FROM {COUNTER_TABLE}), changed_at = {_now}
+        WHERE rowid = new.rowid;
+    END""",
+    f"""CREATE TRIGGER {SEQUENCE}_ad AFTER DELETE ON {PRODUCT_TABLE} BEGIN
+        {_next}
+        INSERT INTO {TOMBSTONE_TABLE} (product_id, sku, change_seq, deleted_at)
+        VALUES (old.id, old.sku, (SELECT value FROM {COUNTER_TABLE}), {_now});
+    END""",
+]
+SQLITE_DROP = [
+    *(f'DROP TRIGGER IF EXISTS {name}' for name in SQLITE_TRIGGERS),
+    f'DROP TABLE IF EXISTS {COUNTER_TABLE}',
+]
+
+
+def run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            cursor.execute(sql)
+
+
+def create_product_change_triggers(apps, schema_editor):
+    """
+    Crea la secuencia y los triggers del feed de cambios y numera los productos existentes.
+    """
+    run(schema_editor, {'postgresql': POSTGRESQL_CREATE, 'sqlite': SQLITE_CREATE})
+
+
+def drop_product_change_triggers(apps, schema_editor):
+    run(schema_editor, {'postgresql': POSTGRESQL_DROP, 'sqlite': SQLITE_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0007_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeedState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purged_through', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.UUIDField()),
+                ('sku', models.CharField(max_length=10)),
+                ('change_seq', models.BigIntegerField(unique=True)),
+                ('deleted_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='changed_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['change_seq'], name='product_change_seq_idx'),
+        ),
+        migrations.RunPython(create_product_change_triggers, drop_product_change_triggers),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:49
+
+from django.db import migrations, models
+
+
+class AddCheckConstraint(migrations.AddConstraint):
+    """
+    `AddConstraint` que en PostgreSQL agrega la restricción `NOT VALID` (sin
+    recorrer la tabla bajo el bloqueo exclusivo) y la valida después con un
+    bloqueo que no detiene las escrituras. En otros motores se comporta igual
+    que `AddConstraint`.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        table = schema_editor.quote_name(model._meta.db_table)
+        name = schema_editor.quote_name(self.constraint.name)
+        check = self.constraint._get_check_sql(model, schema_editor)
+        schema_editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({check}) NOT VALID')
+        schema_editor.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}')
+
+
+class Migration(migrations.Migration):
+
+    # Cada ALTER TABLE se confirma por separado para que VALIDATE no herede el bloqueo exclusivo.
+    atomic = False
+
+    dependencies = [
+        ('warehouse', '0008_product_change_feed'),
+    ]
+
+    operations = [
+        AddCheckConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(condition=models.Q(('stock__gte', 0)), name='product_stock_non_negative'),
+        ),
+        AddCheckConstraint(
+            model_name='stockshard',
+            constraint=models.CheckConstraint(condition=models.Q(('stock__gte', 0)), name='stock_shard_stock_non_negative'),
+        ),
+    ]
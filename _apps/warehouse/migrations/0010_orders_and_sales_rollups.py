@@ -0,0 +1,134 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:59
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+from django.db import migrations, models
+
+# SQL congelado de las tablas de pedidos de esta migración; no debe seguir a
+# `_apps.warehouse.partitions` si ese módulo cambia más adelante.
+POSTGRESQL_CREATE = [
+    """CREATE TABLE warehouse_order (
+        id uuid NOT NULL,
+        created_at timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)""",
+    'CREATE INDEX order_created_idx ON warehouse_order (created_at)',
+    """CREATE TABLE warehouse_orderline (
+        id uuid NOT NULL,
+        order_id uuid NOT NULL,
+        product_id uuid NULL,
+        sku varchar(10) NOT NULL,
+        quantity integer NOT NULL CHECK (quantity >= 0),
+        created_at timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)""",
+    'CREATE INDEX order_line_order_idx ON warehouse_orderline (order_id)',
+    'CREATE INDEX order_line_product_idx ON warehouse_orderline (product_id, created_at)',
+    'CREATE TABLE warehouse_order_default PARTITION OF warehouse_order DEFAULT',
+    'CREATE TABLE warehouse_orderline_default PARTITION OF warehouse_orderline DEFAULT',
+]
+POSTGRESQL_DROP = [
+    'DROP TABLE IF EXISTS warehouse_orderline',
+    'DROP TABLE IF EXISTS warehouse_order',
+]
+
+# Meses de particiones creados junto con las tablas, incluido el actual
+MONTHS = 4
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def order_models(apps):
+    return [apps.get_model('warehouse', 'Order'), apps.get_model('warehouse', 'OrderLine')]
+
+
+def create_partitioned_order_tables(apps, schema_editor):
+    """
+    Crea las tablas de pedidos: particionadas por mes en PostgreSQL, con las
+    particiones del mes actual y los tres siguientes; normales en otros motores.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        for model in order_models(apps):
+            schema_editor.create_model(model)
+        return
+    for sql in POSTGRESQL_CREATE:
+        schema_editor.execute(sql)
+    today = datetime.now(dt_timezone.utc).date()
+    current = date(today.year, today.month, 1)
+    for offset in range(MONTHS):
+        month = add_months(current, offset)
+        for table in ('warehouse_order', 'warehouse_orderline'):
+            schema_editor.execute(
+                f"CREATE TABLE {table}_p{month.year:04d}_{month.month:02d} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+                f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+            )
+
+
+def drop_partitioned_order_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        for model in reversed(order_models(apps)):
+            schema_editor.delete_model(model)
+        return
+    for sql in POSTGRESQL_DROP:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0009_stock_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('sku', models.CharField(max_length=10)),
+                ('product_id', models.UUIDField(null=True)),
+                ('units', models.PositiveBigIntegerField(default=0)),
+                ('lines', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'sku'), name='daily_sales_day_sku')],
+            },
+        ),
+        # Las tablas de pedidos no las crea CreateModel: en PostgreSQL su clave
+        # primaria debe incluir la columna de partición.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Order',
+                    fields=[
+                        ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                        ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['created_at'], name='order_created_idx')],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='OrderLine',
+                    fields=[
+                        ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                        ('sku', models.CharField(max_length=10)),
+                        ('quantity', models.PositiveIntegerField()),
+                        ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('order', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='lines', to='warehouse.order')),
+                        ('product', models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='warehouse.product')),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['order'], name='order_line_order_idx'), models.Index(fields=['product', 'created_at'], name='order_line_product_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_partitioned_order_tables, drop_partitioned_order_tables),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.15 on 2026-10-18 15:02
+
+from django.db import migrations
+from django.db.models import F, Sum
+
+
+def apply_pending_restocks(apps, schema_editor):
+    """
+    Suma al stock las reposiciones que quedaron pendientes de consolidar.
+
+    Desde esta versión cada reposición actualiza el stock en la misma
+    transacción que la registra, así que no se generan nuevas pendientes.
+    """
+    Product = apps.get_model('warehouse', 'Product')
+    StockShard = apps.get_model('warehouse', 'StockShard')
+    StockMovement = apps.get_model('warehouse', 'StockMovement')
+    pending = (
+        StockMovement.objects.filter(applied=False).order_by()
+        .values('product_id').annotate(total=Sum('delta')).values_list('product_id', 'total')
+    )
+    for product_id, total in list(pending):
+        Product.objects.filter(pk=product_id).update(stock=F('stock') + total)
+        StockShard.objects.filter(product_id=product_id, index=0).update(stock=F('stock') + total)
+        StockMovement.objects.filter(product_id=product_id, applied=False).update(applied=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0010_orders_and_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(apply_pending_restocks, migrations.RunPython.noop),
+    ]
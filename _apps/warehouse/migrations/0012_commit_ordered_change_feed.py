@@ -0,0 +1,126 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+# SQL congelado del feed de cambios a partir de esta migración; no debe
+# seguir a `_apps.warehouse.changefeed` si ese módulo cambia más adelante.
+PRODUCT_TABLE = 'warehouse_product'
+TOMBSTONE_TABLE = 'warehouse_producttombstone'
+SHARD_TABLE = 'warehouse_stockshard'
+SEQUENCE = 'warehouse_product_change_seq'
+COUNTER_TABLE = 'warehouse_product_change_counter'
+TRACKED_COLUMNS = ('sku', 'name', 'description', 'stock', 'low_stock_threshold')
+
+_old = ', '.join(f'OLD.{column}' for column in TRACKED_COLUMNS)
+_new = ', '.join(f'NEW.{column}' for column in TRACKED_COLUMNS)
+
+POSTGRESQL = [
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_bi ON {PRODUCT_TABLE}',
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_bu ON {PRODUCT_TABLE}',
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_ad ON {PRODUCT_TABLE}',
+    f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE}',
+    f"""CREATE OR REPLACE FUNCTION {SEQUENCE}_bump() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO {TOMBSTONE_TABLE} (product_id, sku, change_seq, deleted_at)
+            VALUES (OLD.id, OLD.sku, NULL, clock_timestamp());
+            RETURN OLD;
+        END IF;
+        NEW.change_seq := 0;
+        NEW.changed_at := clock_timestamp();
+        RETURN NEW;
+    END $$""",
+    f"""CREATE OR REPLACE FUNCTION {SEQUENCE}_shard_bump() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.change_seq := 0;
+        RETURN NEW;
+    END $$""",
+    f"""CREATE TRIGGER {SEQUENCE}_bi BEFORE INSERT ON {PRODUCT_TABLE}
+        FOR EACH ROW EXECUTE FUNCTION {SEQUENCE}_bump()""",
+    f"""CREATE TRIGGER {SEQUENCE}_bu BEFORE UPDATE ON {PRODUCT_TABLE}
+        FOR EACH ROW WHEN (({_old}) IS DISTINCT FROM ({_new})) EXECUTE FUNCTION {SEQUENCE}_bump()""",
+    f"""CREATE TRIGGER {SEQUENCE}_ad AFTER DELETE ON {PRODUCT_TABLE}
+        FOR EACH ROW EXECUTE FUNCTION {SEQUENCE}_bump()""",
+    f"""CREATE TRIGGER {SEQUENCE}_su BEFORE UPDATE ON {SHARD_TABLE}
+        FOR EACH ROW WHEN (OLD.stock IS DISTINCT FROM NEW.stock) EXECUTE FUNCTION {SEQUENCE}_shard_bump()""",
+]
+
+_next = f'UPDATE {COUNTER_TABLE} SET value = value + 1;'
+
+SQLITE = [
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_su',
+    f"""CREATE TRIGGER {SEQUENCE}_su AFTER UPDATE OF stock ON {SHARD_TABLE} WHEN old.stock IS NOT new.stock BEGIN
+        {_next}
+        UPDATE {SHARD_TABLE} SET change_seq = (SELECT value FROM {COUNTER_TABLE}) WHERE rowid = new.rowid;
+    END""",
+]
+
+# Reversión: numera lo pendiente y vuelve a la función de la migración 0008
+POSTGRESQL_REVERSE = [
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_su ON {SHARD_TABLE}',
+    f'DROP FUNCTION IF EXISTS {SEQUENCE}_shard_bump()',
+    f"UPDATE {PRODUCT_TABLE} SET change_seq = nextval('{SEQUENCE}') WHERE change_seq = 0",
+    f"UPDATE {TOMBSTONE_TABLE} SET change_seq = nextval('{SEQUENCE}') WHERE change_seq IS NULL",
+    f"""CREATE OR REPLACE FUNCTION {SEQUENCE}_bump() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO {TOMBSTONE_TABLE} (product_id, sku, change_seq, deleted_at)
+            VALUES (OLD.id, OLD.sku, nextval('{SEQUENCE}'), clock_timestamp());
+            RETURN OLD;
+        END IF;
+        NEW.change_seq := nextval('{SEQUENCE}');
+        NEW.changed_at := clock_timestamp();
+        RETURN NEW;
+    END $$""",
+]
+
+# Reversión en SQLite: sin triggers, rehacer la tabla de marcas de borrado no
+# choca con el que la referencia; `ensure_change_triggers` los vuelve a crear
+# al terminar `migrate`.
+SQLITE_REVERSE = [
+    f'DROP TRIGGER IF EXISTS {SEQUENCE}_{suffix}' for suffix in ('ai', 'au', 'ad', 'su')
+]
+
+
+def run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            cursor.execute(sql)
+
+
+def create_commit_ordered_triggers(apps, schema_editor):
+    """
+    En PostgreSQL, cambia los triggers del feed para que sólo marquen las
+    filas como pendientes; en ambos motores, agrega el trigger de las
+    particiones de stock.
+    """
+    run(schema_editor, {'postgresql': POSTGRESQL, 'sqlite': SQLITE})
+
+
+def restore_sequence_triggers(apps, schema_editor):
+    run(schema_editor, {'postgresql': POSTGRESQL_REVERSE, 'sqlite': SQLITE_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0011_apply_pending_restocks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='producttombstone',
+            name='change_seq',
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='stockshard',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='stockshard',
+            index=models.Index(fields=['change_seq'], name='stock_shard_change_seq_idx'),
+        ),
+        migrations.RunPython(create_commit_ordered_triggers, restore_sequence_triggers),
+    ]
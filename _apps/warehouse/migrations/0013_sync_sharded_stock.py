@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:40
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+def sync_sharded_stock(apps, schema_editor):
+    """
+    Copia en `stock` el total de las particiones de cada producto particionado.
+
+    Desde esta versión cada escritura en las particiones actualiza también la
+    columna, así que basta con igualarla una vez.
+    """
+    Product = apps.get_model('warehouse', 'Product')
+    StockShard = apps.get_model('warehouse', 'StockShard')
+    totals = (
+        StockShard.objects.order_by()
+        .values('product_id').annotate(total=Sum('stock')).values_list('product_id', 'total')
+    )
+    for product_id, total in list(totals):
+        Product.objects.filter(pk=product_id, stock_shards__gt=0).update(stock=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0012_commit_ordered_change_feed'),
+    ]
+
+    operations = [
+        migrations.RunPython(sync_sharded_stock, migrations.RunPython.noop),
+    ]
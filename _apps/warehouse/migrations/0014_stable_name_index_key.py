@@ -0,0 +1,84 @@
+# Generated by Django 5.1.15 on 2026-10-18 19:10
+
+from django.db import migrations
+
+# SQL congelado del índice de nombres de SQLite a partir de esta migración;
+# no debe seguir a `_apps.warehouse.search` si ese módulo cambia más adelante.
+PRODUCT_TABLE = 'warehouse_product'
+FTS_TABLE = 'warehouse_product_name_fts'
+KEY_TABLE = 'warehouse_product_name_key'
+
+_key = f'(SELECT id FROM {KEY_TABLE} WHERE product_id = %s.id)'
+
+SQLITE_DROP = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+    f'DROP TABLE IF EXISTS {KEY_TABLE}',
+]
+SQLITE_CREATE = [
+    f'CREATE TABLE {KEY_TABLE} (id integer NOT NULL PRIMARY KEY, product_id char(32) NOT NULL UNIQUE)',
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, tokenize='trigram')",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {KEY_TABLE}(product_id) VALUES (new.id);
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES ({_key % 'new'}, new.name);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {PRODUCT_TABLE} BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = {_key % 'old'};
+        DELETE FROM {KEY_TABLE} WHERE product_id = old.id;
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF name ON {PRODUCT_TABLE} BEGIN
+        UPDATE {FTS_TABLE} SET name = new.name WHERE rowid = {_key % 'new'};
+    END""",
+    f'INSERT INTO {KEY_TABLE}(product_id) SELECT id FROM {PRODUCT_TABLE}',
+    f"""INSERT INTO {FTS_TABLE}(rowid, name)
+        SELECT k.id, p.name FROM {KEY_TABLE} k JOIN {PRODUCT_TABLE} p ON p.id = k.product_id""",
+]
+
+# Índice de la migración 0006, indexado por el `rowid` implícito de la tabla
+PREVIOUS_SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, content='{PRODUCT_TABLE}', content_rowid='rowid', tokenize='trigram')",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.rowid, new.name);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.rowid, old.name);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF name ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.rowid, old.name);
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.rowid, new.name);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def run(schema_editor, *statements):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for group in statements:
+            for sql in group:
+                cursor.execute(sql)
+
+
+def key_name_index(apps, schema_editor):
+    """
+    Rehace el índice FTS5 de SQLite con una clave entera estable por producto.
+    """
+    run(schema_editor, SQLITE_DROP, SQLITE_CREATE)
+
+
+def unkey_name_index(apps, schema_editor):
+    run(schema_editor, SQLITE_DROP, PREVIOUS_SQLITE_CREATE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0013_sync_sharded_stock'),
+    ]
+
+    operations = [
+        migrations.RunPython(key_name_index, unkey_name_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouse', '0014_stable_name_index_key'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_low_stock_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock__lt', models.F('low_stock_threshold'))), fields=['sku'], name='product_low_stock_idx'),
+        ),
+    ]
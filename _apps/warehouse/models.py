@@ -1,5 +1,393 @@
+import random
 import uuid
-from django.db import models
+from datetime import timedelta
+from decimal import ROUND_DOWN, Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connections, models, router, transaction
+from django.db.models import Case, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from .cache import product_cache
+from .search import SQLITE_CANDIDATES
+
+# Campos de `Product` que mantienen los triggers del feed de cambios
+CHANGE_FEED_FIELDS = ('change_seq', 'changed_at')
+
+# Condición de stock bajo: por debajo del umbral del producto. La comparten el
+# reporte, la búsqueda, el índice parcial y `Product.is_low_stock` (alertas).
+LOW_STOCK = Q(stock__lt=F('low_stock_threshold'))
+
+
+class ProductQuerySet(models.QuerySet):
+    """
+    QuerySet de productos con operaciones de inventario atómicas.
+
+    Las escrituras masivas que no emiten señales (`update`, `bulk_update` y
+    `bulk_create` con `update_conflicts`) invalidan aquí la caché de productos.
+    """
+
+    def update(self, **kwargs):
+        """
+        Igual que `QuerySet.update`, pero antes lee en la misma transacción
+        los IDs de las filas a actualizar para invalidarlas en la caché.
+        """
+        self._for_write = True
+        using = self.db
+        with transaction.atomic(using=using, savepoint=False):
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+        product_cache.invalidate_many(pks, using=using)
+        return rows
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        rows = super().bulk_update(objs, fields, batch_size=batch_size)
+        product_cache.invalidate_many([obj.pk for obj in objs], using=self.db)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if kwargs.get('update_conflicts'):
+            # Las filas en conflicto conservan su ID original, que hay que buscar por SKU.
+            product_cache.invalidate_many(
+                self.filter(sku__in=[obj.sku for obj in objs]).values_list('pk', flat=True), using=self.db
+            )
+        return objs
+
+    def decrement_stock(self, product_id, quantity):
+        """
+        Descuenta `quantity` del stock de un producto en una sola sentencia.
+
+        Ejecuta un `UPDATE ... SET stock = stock - q WHERE id = ? AND stock >= q
+        RETURNING *`, de modo que la verificación y el descuento ocurren en el
+        mismo viaje a la base de datos y sin condiciones de carrera, y registra
+        el movimiento en el libro `StockMovement` y el pedido (`Order`) dentro de
+        la misma transacción. Como la fila devuelta ya trae el estado final, se emite `post_save` con
+        esa instancia sin necesidad de volver a leerla.
+
+        Los productos con stock particionado (`stock_shards > 0`) no se tocan en
+        esa sentencia: su descuento se hace sobre una de sus `StockShard`.
+
+        Returns:
+            Product | None: El producto actualizado, o None si no existe o no
+            tiene stock suficiente.
+        """
+        using = self._db or router.db_for_write(self.model)
+        product = self._decrement_stock(product_id, quantity, using)
+        if product is None:
+            return None
+
+        post_save.send(
+            sender=self.model,
+            instance=product,
+            created=False,
+            update_fields=frozenset({'stock'}),
+            raw=False,
+            using=using,
+        )
+        return product
+
+    def _decrement_stock(self, product_id, quantity, using):
+        connection = connections[using]
+        opts = self.model._meta
+        pk = opts.pk.get_db_prep_value(opts.pk.to_python(product_id), connection)
+        sql = (
+            f"UPDATE {connection.ops.quote_name(opts.db_table)} "
+            f"SET stock = stock - %s "
+            f"WHERE {connection.ops.quote_name(opts.pk.column)} = %s AND stock >= %s AND stock_shards = 0 "
+            f"RETURNING *"
+        )
+        with transaction.atomic(using=using):
+            # Se consume el cursor completo para que la sentencia termine de ejecutarse.
+            rows = list(self.raw(sql, [quantity, pk, quantity], using=using))
+            if rows:
+                product = rows[0]
+            else:
+                product = self.using(using).filter(pk=product_id, stock_shards__gt=0).first()
+                if product is None or not StockShard.objects.using(using).take(product, quantity):
+                    return None
+                product.stock = self.using(using).values_list('stock', flat=True).get(pk=product.pk)
+
+            StockMovement.objects.using(using).create(
+                product=product,
+                kind=StockMovement.Kind.ORDER,
+                delta=-quantity,
+                applied=True,
+            )
+            Order.objects.using(using).record([(product, quantity)])
+        return product
+
+    def decrement_stock_batch(self, lines, all_or_nothing=False):
+        """
+        Descuenta el stock de varias líneas de pedido en una sola transacción.
+
+        Los productos involucrados se bloquean con `SELECT ... FOR UPDATE`
+        ordenados por ID, de modo que dos cestas concurrentes siempre toman los
+        bloqueos en el mismo orden y no pueden provocar un interbloqueo. Las
+        líneas se aplican en el orden recibido sobre el stock bloqueado y los
+        cambios se escriben con un único `bulk_update`.
+
+        Para los productos con stock particionado se bloquean también sus
+        particiones, ordenadas por producto e índice, y el descuento se reparte
+        entre ellas; la columna `stock` se actualiza igual con el nuevo total.
+        Cada línea aplicada se registra en el libro `StockMovement` y en un
+        único pedido (`Order`).
+
+        Args:
+            lines (list[dict]): Líneas con `product_id` y `quantity`.
+            all_or_nothing (bool): Si es True, basta con que una línea falle
+                para que no se aplique ninguna.
+
+        Returns:
+            tuple[bool, list[dict]]: Si el lote se aplicó y el resultado por línea.
+        """
+        using = self._db or router.db_for_write(self.model)
+        product_ids = sorted({line['product_id'] for line in lines})
+
+        with transaction.atomic(using=using):
+            products = {
+                product.id: product
+                for product in self.using(using).select_for_update().filter(id__in=product_ids).order_by('id')
+            }
+            shards = {}
+            sharded_ids = sorted(pk for pk, product in products.items() if product.stock_shards)
+            if sharded_ids:
+                locked = (
+                    StockShard.objects.using(using).select_for_update()
+                    .filter(product_id__in=sharded_ids).order_by('product_id', 'index')
+                )
+                for shard in locked:
+                    shards.setdefault(shard.product_id, []).append(shard)
+                for product_id in sharded_ids:
+                    products[product_id].stock = sum((shard.stock for shard in shards.get(product_id, [])), Decimal(0))
+
+            changed = {}
+            results = []
+            movements = []
+            sold = []
+            for line in lines:
+                product_id, quantity = line['product_id'], line['quantity']
+                product = products.get(product_id)
+                result = {'product_id': product_id, 'quantity': quantity}
+                if product is None:
+                    result.update(status='not_found', error=f"El producto con ID {product_id} no existe.")
+                elif product.stock < quantity:
+                    result.update(status='insufficient_stock', error="No hay suficiente stock para completar la compra.")
+                else:
+                    product.stock -= quantity
+                    changed[product_id] = product
+                    movements.append(StockMovement(product=product, kind=StockMovement.Kind.ORDER, delta=-quantity, applied=True))
+                    sold.append((product, quantity))
+                    result.update(status='ok', remaining_stock=product.stock)
+                results.append(result)
+
+            applied = not (all_or_nothing and any(result['status'] != 'ok' for result in results))
+            if not applied:
+                # Nada se escribió todavía: sólo se informa qué líneas no se aplicaron.
+                for result in results:
+                    if result['status'] == 'ok':
+                        result['status'] = 'not_applied'
+                        del result['remaining_stock']
+                return applied, results
+
+            if changed:
+                self.using(using).bulk_update(list(changed.values()), ['stock'])
+                touched = []
+                for product in changed.values():
+                    if product.stock_shards:
+                        product_shards = shards.get(product.pk, [])
+                        distribute_stock(product_shards, product.stock)
+                        touched.extend(product_shards)
+                if touched:
+                    StockShard.objects.using(using).bulk_update(touched, ['stock'])
+                StockMovement.objects.using(using).bulk_create(movements)
+                if sold:
+                    Order.objects.using(using).record(sold)
+                for product in changed.values():
+                    post_save.send(
+                        sender=self.model,
+                        instance=product,
+                        created=False,
+                        update_fields=frozenset({'stock'}),
+                        raw=False,
+                        using=using,
+                    )
+
+        return applied, results
+
+    def adjust_stock_batch(self, lines, all_or_nothing=False, batch_size=500):
+        """
+        Suma al stock de muchos productos en unas pocas sentencias.
+
+        Cada línea identifica el producto por `product_id` o por `sku` y trae
+        el `delta` a sumar. Los productos se resuelven y se bloquean en lotes de
+        `batch_size` ordenados por ID (el mismo orden que `decrement_stock_batch`,
+        para no provocar interbloqueos) y cada lote se actualiza con un único
+        `UPDATE ... SET stock = stock + CASE id WHEN ... END`, en lugar de un
+        `save()` por producto. En los productos con stock particionado el delta
+        se suma además a su partición 0. Todo ocurre en una sola transacción: las
+        líneas se registran como reposiciones aplicadas en el libro
+        `StockMovement` y se emite `post_save` una vez por producto, de modo que
+        las alertas de stock bajo y la invalidación de la caché siguen operando.
+
+        Args:
+            lines (list[dict]): Líneas con `product_id` o `sku`, y `delta`.
+            all_or_nothing (bool): Si es True, basta con que un producto no
+                exista para que no se aplique ninguna línea.
+            batch_size (int): Productos por sentencia.
+
+        Returns:
+            tuple[bool, list[dict]]: Si el lote se aplicó y el resultado por
+            línea, con el stock del producto después de aplicar esa línea
+            (`new_stock`).
+        """
+        using = self._db or router.db_for_write(self.model)
+        skus = sorted({line['sku'] for line in lines if line.get('sku')})
+        ids_by_sku = {}
+        for start in range(0, len(skus), batch_size):
+            ids_by_sku.update(
+                (sku, pk) for pk, sku in
+                self.using(using).filter(sku__in=skus[start:start + batch_size]).values_list('pk', 'sku')
+            )
+        product_ids = sorted({line.get('product_id') or ids_by_sku.get(line.get('sku')) for line in lines} - {None})
+
+        with transaction.atomic(using=using):
+            sharded = {}
+            for start in range(0, len(product_ids), batch_size):
+                locked = (
+                    self.using(using).select_for_update().filter(pk__in=product_ids[start:start + batch_size])
+                    .order_by('pk').values_list('pk', 'stock_shards')
+                )
+                sharded.update(locked)
+
+            results = []
+            deltas = {}
+            for line in lines:
+                product_id = line.get('product_id') or ids_by_sku.get(line.get('sku'))
+                result = {**line, 'product_id': product_id}
+                if product_id not in sharded:
+                    identifier = line.get('sku') or line.get('product_id')
+                    result.update(status='not_found', error=f"El producto {identifier} no existe.")
+                else:
+                    deltas[product_id] = deltas.get(product_id, Decimal(0)) + line['delta']
+                    result['status'] = 'ok'
+                results.append(result)
+
+            applied = not (all_or_nothing and any(result['status'] != 'ok' for result in results))
+            if not applied:
+                # Nada se escribió todavía: sólo se informa qué líneas no se aplicaron.
+                for result in results:
+                    if result['status'] == 'ok':
+                        result['status'] = 'not_applied'
+                return applied, results
+
+            changed = sorted(deltas)
+            split = sorted(pk for pk in deltas if sharded[pk])
+            for start in range(0, len(changed), batch_size):
+                batch = changed[start:start + batch_size]
+                self.using(using).filter(pk__in=batch).update(stock=F('stock') + self._delta_case('pk', batch, deltas))
+            for start in range(0, len(split), batch_size):
+                batch = split[start:start + batch_size]
+                StockShard.objects.using(using).filter(product_id__in=batch, index=0).update(
+                    stock=F('stock') + self._delta_case('product_id', batch, deltas)
+                )
+
+            StockMovement.objects.using(using).bulk_create(
+                [
+                    StockMovement(product_id=result['product_id'], kind=StockMovement.Kind.RESTOCK, delta=result['delta'], applied=True)
+                    for result in results if result['status'] == 'ok'
+                ],
+                batch_size=batch_size,
+            )
+
+            products = {}
+            for start in range(0, len(changed), batch_size):
+                batch = changed[start:start + batch_size]
+                products.update((product.pk, product) for product in self.using(using).filter(pk__in=batch))
+
+            # El stock de cada línea se reconstruye hacia atrás desde el total final.
+            running = {pk: products[pk].stock - delta for pk, delta in deltas.items()}
+            for result in results:
+                if result['status'] == 'ok':
+                    running[result['product_id']] += result['delta']
+                    result['new_stock'] = running[result['product_id']]
+
+            for product in products.values():
+                post_save.send(
+                    sender=self.model,
+                    instance=product,
+                    created=False,
+                    update_fields=frozenset({'stock'}),
+                    raw=False,
+                    using=using,
+                )
+
+        return applied, results
+
+    @staticmethod
+    def _delta_case(field, pks, deltas):
+        return Case(
+            *[When(**{field: pk}, then=Value(deltas[pk])) for pk in pks],
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+
+    def low_stock(self):
+        """
+        Productos con el stock por debajo de su propio umbral, con el
+        faltante (`deficit`) hasta alcanzarlo.
+
+        La condición es la misma del índice parcial `product_low_stock_idx`,
+        que sólo contiene esos productos ordenados por SKU: el reporte lee el
+        índice en lugar de recorrer el catálogo.
+        """
+        return self.filter(LOW_STOCK).annotate(
+            deficit=ExpressionWrapper(
+                F('low_stock_threshold') - F('stock'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+        )
+
+    def search(self, sku=None, q=None, stock_min=None, stock_max=None, low_stock=False):
+        """
+        Filtra el catálogo con condiciones que resuelve un índice.
+
+        - `sku`: prefijo del SKU. En PostgreSQL usa `LIKE 'x%'` sobre el índice
+          `varchar_pattern_ops` que Django crea para el campo único; en otros
+          motores, un rango sobre el índice único de `sku`.
+        - `q`: texto contenido en el nombre, sin distinguir mayúsculas. Usa el
+          índice de trigramas de `search.py` (GIN `pg_trgm` en
+          PostgreSQL, FTS5 `trigram` en SQLite) para obtener candidatos, que
+          se confirman con `icontains`.
+        - `stock_min` / `stock_max`: rango sobre la columna `stock` consolidada.
+        - `low_stock`: productos con `stock < low_stock_threshold` (índice parcial).
+        """
+        queryset = self
+        vendor = connections[self.db].vendor
+
+        if sku:
+            if vendor == 'postgresql':
+                queryset = queryset.filter(sku__startswith=sku)
+            else:
+                # Todo SKU que empieza por `sku` queda en [sku, sku + U+10FFFF).
+                queryset = queryset.filter(sku__gte=sku, sku__lt=sku + '\U0010ffff')
+
+        if q:
+            if vendor == 'sqlite':
+                candidates = models.expressions.RawSQL(SQLITE_CANDIDATES, [f'%{q}%'])
+                queryset = queryset.filter(pk__in=candidates)
+            queryset = queryset.filter(name__icontains=q)
+
+        if stock_min is not None:
+            queryset = queryset.filter(stock__gte=stock_min)
+        if stock_max is not None:
+            queryset = queryset.filter(stock__lte=stock_max)
+        if low_stock:
+            queryset = queryset.filter(LOW_STOCK)
+
+        return queryset
+
 
 class Product(models.Model):
     """
@@ -10,7 +398,17 @@ class Product(models.Model):
         sku (str): Codigo del producto.
         name (str): Nombre del producto.
         description (str): Descripción corta del producto.
-        stock (str): Existencia del producto, valor inicial 100.
+        stock (str): Existencia del producto, valor inicial 100. Si el stock
+            está particionado, es el total de las particiones: cada escritura
+            en ellas lo actualiza en la misma transacción.
+        stock_shards (int): Cantidad de particiones del stock (0 = sin particionar).
+        low_stock_threshold (int): Stock por debajo del cual se emite una alerta.
+        change_seq (int): Posición del último cambio del producto en el feed de
+            cambios. La mantienen triggers de la base de datos en cada alta o
+            modificación (en PostgreSQL queda en 0 hasta que `stamp_changes`
+            la numera), así que en una instancia recién guardada puede estar
+            desactualizada.
+        changed_at (datetime): Momento del último cambio, asignado por los mismos triggers.
     """
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -18,7 +416,22 @@ class Product(models.Model):
     name = models.CharField(max_length=50)
     description = models.CharField(max_length=100, blank=True, null=True)
     stock = models.DecimalField(max_digits=10, decimal_places=2, default=100)
+    low_stock_threshold = models.PositiveIntegerField(default=10)
+    stock_shards = models.PositiveSmallIntegerField(default=0)
+    change_seq = models.BigIntegerField(default=0, editable=False)
+    changed_at = models.DateTimeField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['stock'], name='product_stock_idx'),
+            models.Index(fields=['change_seq'], name='product_change_seq_idx'),
+            models.Index(fields=['sku'], condition=LOW_STOCK, name='product_low_stock_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=Q(stock__gte=0), name='product_stock_non_negative'),
+        ]
 
     def __str__(self):
         """
@@ -27,4 +440,699 @@ class Product(models.Model):
         Returns:
             str: El nombre del producto.
         """
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def save(self, *args, update_fields=None, **kwargs):
+        """
+        Guarda el producto sin escribir `change_seq` ni `changed_at`, que
+        mantienen los triggers; así una instancia desactualizada no hace
+        retroceder la secuencia.
+        """
+        if update_fields is not None:
+            update_fields = [name for name in update_fields if name not in CHANGE_FEED_FIELDS]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # Un guardado completo tampoco escribe las columnas del feed; si no
+        # actualiza ninguna fila, Django sigue insertando el producto.
+        values = [value for value in values if value[0].name not in CHANGE_FEED_FIELDS]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+    @property
+    def is_low_stock(self):
+        """
+        Retorna si el stock está por debajo del umbral (ver `LOW_STOCK`).
+        """
+        return self.stock < self.low_stock_threshold
+
+    @property
+    def total_stock(self):
+        """
+        Retorna el stock actual del producto: la columna `stock` o, si está
+        particionado, la suma de sus particiones.
+        """
+        return StockShard.objects.total(self) if self.stock_shards else self.stock
+
+    def stock_as_of(self, when):
+        """
+        Retorna el stock que tenía el producto en el momento `when`.
+
+        Parte de la última foto (`StockSnapshot`) anterior a `when` y suma los
+        movimientos registrados hasta `when` que esa foto no incluye.
+        """
+        snapshot = self.snapshots.filter(taken_at__lte=when).order_by('-taken_at', '-id').first()
+        tail = self.movements.filter(created_at__lte=when)
+        if snapshot is None:
+            return tail.total()
+        return snapshot.stock + tail.exclude(snapshot_id__lte=snapshot.id).total()
+
+    def set_stock_shards(self, shards):
+        """
+        Reparte el stock total del producto en `shards` particiones.
+
+        Con `shards=0` el stock vuelve a la columna `stock` y se eliminan las
+        particiones. La operación bloquea el producto mientras redistribuye.
+        """
+        with transaction.atomic():
+            product = Product.objects.select_for_update().get(pk=self.pk)
+            current = list(StockShard.objects.select_for_update().filter(product=product).order_by('index'))
+            total = sum((shard.stock for shard in current), Decimal(0)) if product.stock_shards else product.stock
+
+            StockShard.objects.filter(product=product).delete()
+            new_shards = [StockShard(product=product, index=index) for index in range(shards)]
+            distribute_stock(new_shards, total)
+            StockShard.objects.bulk_create(new_shards)
+
+            Product.objects.filter(pk=product.pk).update(stock=total, stock_shards=shards)
+        self.stock, self.stock_shards = total, shards
+
+    def sync_stock(self):
+        """
+        Copia en la columna `stock` el total actual de las particiones. Las
+        escrituras ya la mantienen; sirve para reparar una desviación.
+        """
+        if self.stock_shards:
+            self.stock = self.total_stock
+            Product.objects.filter(pk=self.pk).update(stock=self.stock)
+        return self.stock
+
+
+def distribute_stock(shards, total):
+    """
+    Reparte `total` en partes iguales (al centésimo) entre `shards`; el resto
+    se asigna a la primera partición.
+    """
+    if not shards:
+        return
+    share = (Decimal(total) / len(shards)).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+    for shard in shards:
+        shard.stock = share
+    shards[0].stock += Decimal(total) - share * len(shards)
+
+
+class StockShardQuerySet(models.QuerySet):
+    """
+    QuerySet de particiones de stock.
+    """
+
+    def take(self, product, quantity):
+        """
+        Descuenta `quantity` de una partición del producto.
+
+        Primero intenta en una partición al azar; si no alcanza, en la que más
+        stock tiene; y si ninguna alcanza por sí sola pero el total sí, bloquea
+        todas las particiones y las rebalancea. En la misma transacción
+        descuenta `quantity` de la columna `stock` del producto, para que
+        quien la lea (listados, filtros, stock bajo, exportación) vea el total.
+
+        Returns:
+            bool: Si el descuento se aplicó.
+        """
+        with transaction.atomic(using=self._db or router.db_for_write(self.model)):
+            if not self._take(product, quantity):
+                return False
+            Product.objects.using(self._db).filter(pk=product.pk).update(stock=F('stock') - quantity)
+        return True
+
+    def _take(self, product, quantity):
+        shards = self.filter(product_id=product.pk)
+        index = random.randrange(product.stock_shards)
+        if shards.filter(index=index, stock__gte=quantity).update(stock=F('stock') - quantity):
+            return True
+
+        fullest = shards.filter(stock__gte=quantity).order_by('-stock').values('pk')[:1]
+        if shards.filter(pk__in=fullest, stock__gte=quantity).update(stock=F('stock') - quantity):
+            return True
+
+        with transaction.atomic(using=self._db or router.db_for_write(self.model)):
+            locked = list(shards.select_for_update().order_by('index'))
+            total = sum((shard.stock for shard in locked), Decimal(0))
+            if not locked or total < quantity:
+                return False
+            distribute_stock(locked, total - quantity)
+            self.bulk_update(locked, ['stock'])
+        return True
+
+    def add(self, product, amount):
+        """
+        Suma `amount` a una partición del producto elegida al azar y a la
+        columna `stock` del producto, en la misma transacción.
+        """
+        index = random.randrange(product.stock_shards)
+        with transaction.atomic(using=self._db or router.db_for_write(self.model)):
+            self.filter(product_id=product.pk, index=index).update(stock=F('stock') + amount)
+            Product.objects.using(self._db).filter(pk=product.pk).update(stock=F('stock') + amount)
+
+    def total(self, product):
+        """
+        Retorna la suma del stock de las particiones del producto.
+        """
+        return self.filter(product_id=product.pk).aggregate(total=Sum('stock'))['total'] or Decimal(0)
+
+
+class StockShard(models.Model):
+    """
+    Modelo que representa una partición del stock de un producto.
+
+    Repartir el stock de un producto muy demandado en varias filas permite que
+    pedidos concurrentes descuenten de filas distintas sin esperar el mismo bloqueo.
+
+    Atributos:
+        product (Product): Producto al que pertenece la partición.
+        index (int): Número de la partición, de 0 a `stock_shards - 1`.
+        stock (Decimal): Existencia asignada a la partición.
+        change_seq (int): Posición del último cambio de stock de la partición
+            en el feed de cambios del producto, igual que `Product.change_seq`.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveSmallIntegerField()
+    stock = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    change_seq = models.BigIntegerField(default=0, editable=False)
+
+    objects = StockShardQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['change_seq'], name='stock_shard_change_seq_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'index'], name='unique_stock_shard_index'),
+            models.CheckConstraint(condition=Q(stock__gte=0), name='stock_shard_stock_non_negative'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} #{self.index}"
+
+
+class StockMovementQuerySet(models.QuerySet):
+    """
+    QuerySet del libro de movimientos de stock.
+    """
+
+    def total(self):
+        """
+        Retorna la suma de `delta` de los movimientos.
+        """
+        return self.aggregate(total=Sum('delta'))['total'] or Decimal(0)
+
+    def compact(self, product_ids=None):
+        """
+        Toma una foto del stock de los productos con movimientos sin foto.
+
+        Por cada producto se bloquea su fila, se guarda un `StockSnapshot` con
+        su stock actual y los movimientos quedan incluidos en esa foto, de
+        modo que `stock_as_of` no tiene que sumar el libro completo. El stock
+        ya está al día: cada movimiento lo actualiza al registrarse.
+
+        Returns:
+            int: Cantidad de productos fotografiados.
+        """
+        using = self._db or router.db_for_write(self.model)
+        uncompacted = self.using(using).filter(snapshot__isnull=True)
+        if product_ids is not None:
+            uncompacted = uncompacted.filter(product_id__in=product_ids)
+
+        compacted = 0
+        for product_id in list(uncompacted.order_by().values_list('product_id', flat=True).distinct()):
+            with transaction.atomic(using=using):
+                product = Product.objects.using(using).select_for_update().filter(pk=product_id).first()
+                if product is None:
+                    continue
+                movements = list(self.using(using).filter(product=product, snapshot__isnull=True).values_list('id', flat=True))
+                stock = StockShard.objects.using(using).total(product) if product.stock_shards else product.stock
+                snapshot = StockSnapshot.objects.using(using).create(product=product, stock=stock, taken_at=timezone.now())
+                self.using(using).filter(id__in=movements).update(applied=True, snapshot=snapshot)
+            compacted += 1
+        return compacted
+
+
+class StockSnapshot(models.Model):
+    """
+    Modelo que representa una foto del stock consolidado de un producto.
+
+    Atributos:
+        product (Product): Producto fotografiado.
+        stock (Decimal): Stock consolidado al momento de la foto.
+        taken_at (datetime): Momento de la foto.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='snapshots')
+    stock = models.DecimalField(max_digits=10, decimal_places=2)
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'taken_at'], name='stock_snapshot_taken_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.taken_at}: {self.stock}"
+
+
+class StockMovement(models.Model):
+    """
+    Modelo que representa un movimiento del libro de inventario (sólo inserción).
+
+    Atributos:
+        product (Product): Producto afectado.
+        kind (str): Tipo de movimiento: reposición, pedido o ajuste.
+        delta (Decimal): Variación del stock (negativa en los pedidos).
+        created_at (datetime): Momento del movimiento.
+        applied (bool): Si ya está reflejado en `Product.stock`. Todo movimiento
+            se registra en la misma transacción que actualiza el stock, así que
+            se crea aplicado.
+        snapshot (StockSnapshot): Foto que ya incluye el movimiento, si existe.
+    """
+
+    class Kind(models.TextChoices):
+        RESTOCK = 'restock', 'Reposición'
+        ORDER = 'order', 'Pedido'
+        ADJUSTMENT = 'adjustment', 'Ajuste'
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='movements')
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    delta = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+    applied = models.BooleanField(default=False)
+    snapshot = models.ForeignKey(StockSnapshot, on_delete=models.SET_NULL, null=True, blank=True, related_name='movements')
+
+    objects = StockMovementQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'snapshot'], name='stock_movement_snapshot_idx'),
+            models.Index(fields=['product', 'created_at'], name='stock_movement_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.delta} ({self.product_id})"
+
+
+class ProductTombstoneQuerySet(models.QuerySet):
+    """
+    QuerySet de las marcas de borrado del feed de cambios.
+    """
+
+    def purge(self, before, batch_size=10000):
+        """
+        Elimina las marcas anteriores a `before` y adelanta el horizonte del feed
+        hasta la última eliminada. Retorna cuántas marcas borró.
+        """
+        using = self._db or router.db_for_write(self.model)
+        deleted = 0
+        while True:
+            with transaction.atomic(using=using):
+                batch = list(
+                    self.using(using).filter(deleted_at__lt=before, change_seq__isnull=False).order_by('change_seq')
+                    .values_list('pk', 'change_seq')[:batch_size]
+                )
+                if not batch:
+                    return deleted
+                ChangeFeedState.objects.using(using).advance_horizon(batch[-1][1])
+                deleted += self.using(using).filter(pk__in=[pk for pk, _ in batch]).delete()[0]
+
+
+class ProductTombstone(models.Model):
+    """
+    Modelo que registra el borrado de un producto para el feed de cambios.
+
+    Las filas las inserta un trigger de la base de datos al eliminar un
+    producto, con la misma secuencia que `Product.change_seq`.
+
+    Atributos:
+        product_id (UUID): ID del producto eliminado.
+        sku (str): Codigo del producto eliminado.
+        change_seq (int): Posición del borrado en el feed de cambios; en
+            PostgreSQL es NULL hasta que `stamp_changes` la numera.
+        deleted_at (datetime): Momento del borrado.
+    """
+
+    product_id = models.UUIDField()
+    sku = models.CharField(max_length=10)
+    change_seq = models.BigIntegerField(unique=True, null=True)
+    deleted_at = models.DateTimeField(db_index=True)
+
+    objects = ProductTombstoneQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.sku} #{self.change_seq}"
+
+
+class ChangeFeedStateQuerySet(models.QuerySet):
+    """
+    QuerySet del estado del feed de cambios (una sola fila).
+    """
+
+    def horizon(self):
+        """
+        Retorna la secuencia hasta la que se purgaron marcas de borrado. Un
+        cliente sincronizado antes de ese punto debe partir de una foto.
+        """
+        return self.filter(pk=1).values_list('purged_through', flat=True).first() or 0
+
+    def advance_horizon(self, seq):
+        state, _ = self.get_or_create(pk=1)
+        if seq > state.purged_through:
+            self.filter(pk=1, purged_through__lt=seq).update(purged_through=seq)
+
+
+class ChangeFeedState(models.Model):
+    """
+    Modelo con el estado persistente del feed de cambios de productos.
+
+    Atributos:
+        purged_through (int): Secuencia de la última marca de borrado purgada.
+    """
+
+    purged_through = models.BigIntegerField(default=0)
+
+    objects = ChangeFeedStateQuerySet.as_manager()
+
+    def __str__(self):
+        return f"purged_through={self.purged_through}"
+
+
+class OrderQuerySet(models.QuerySet):
+    """
+    QuerySet de pedidos.
+    """
+
+    def record(self, lines):
+        """
+        Registra un pedido con sus líneas y lo suma a los acumulados diarios.
+
+        Debe llamarse dentro de la transacción que descuenta el stock, de modo
+        que el pedido, su descuento y los acumulados se confirman juntos.
+
+        Args:
+            lines (list[tuple[Product, int]]): Producto y cantidad de cada línea.
+
+        Returns:
+            Order: El pedido registrado.
+        """
+        using = self._db or router.db_for_write(self.model)
+        created_at = timezone.now()
+        order = self.using(using).create(created_at=created_at)
+        OrderLine.objects.using(using).bulk_create([
+            OrderLine(order=order, product_id=product.pk, sku=product.sku, quantity=quantity, created_at=created_at)
+            for product, quantity in lines
+        ])
+        DailySales.objects.using(using).add(timezone.localdate(created_at), lines)
+        return order
+
+
+class Order(models.Model):
+    """
+    Modelo que representa un pedido atendido.
+
+    En PostgreSQL la tabla está particionada por mes de `created_at` (ver
+    `partitions.py`), de modo que los meses antiguos se eliminan borrando su
+    partición. Por eso la clave primaria real es `(id, created_at)`.
+
+    Atributos:
+        id (UUID): Identificador único del pedido.
+        created_at (datetime): Momento del pedido.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='order_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} @ {self.created_at}"
+
+
+class OrderLine(models.Model):
+    """
+    Modelo que representa una línea de un pedido.
+
+    Particionada igual que `Order`. Las referencias al pedido y al producto
+    no tienen restricción en la base de datos (PostgreSQL no admite claves
+    foráneas hacia una tabla particionada por otra columna) y el SKU se copia
+    para que el historial sobreviva al borrado del producto.
+
+    Atributos:
+        order (Order): Pedido al que pertenece la línea.
+        product (Product): Producto vendido.
+        sku (str): Codigo del producto al momento de la venta.
+        quantity (int): Unidades vendidas.
+        created_at (datetime): Momento del pedido.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    order = models.ForeignKey(Order, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, related_name='+')
+    sku = models.CharField(max_length=10)
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order'], name='order_line_order_idx'),
+            models.Index(fields=['product', 'created_at'], name='order_line_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} x {self.quantity} ({self.order_id})"
+
+
+class DailySalesQuerySet(models.QuerySet):
+    """
+    QuerySet de los acumulados de ventas por SKU y día.
+    """
+
+    def add(self, day, lines):
+        """
+        Suma las líneas `(producto, cantidad)` a los acumulados de `day` con un
+        único `INSERT ... ON CONFLICT DO UPDATE`.
+
+        Las filas se escriben ordenadas por SKU. Quien escribe ya tiene
+        bloqueados los productos de sus líneas, así que dos pedidos sólo
+        compiten por el acumulado de un SKU que ambos descuentan.
+        """
+        totals = {}
+        for product, quantity in lines:
+            units, count, _ = totals.get(product.sku, (0, 0, None))
+            totals[product.sku] = (units + quantity, count + 1, product.pk)
+        if not totals:
+            return
+
+        using = self._db or router.db_for_write(self.model)
+        connection = connections[using]
+        opts = self.model._meta
+        table = connection.ops.quote_name(opts.db_table)
+        fields = [opts.get_field(name) for name in ('day', 'sku', 'product_id', 'units', 'lines')]
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        params = []
+        for sku in sorted(totals):
+            units, count, product_id = totals[sku]
+            for field, value in zip(fields, (day, sku, product_id, units, count)):
+                params.append(field.get_db_prep_save(value, connection))
+        placeholders = ', '.join(['(%s, %s, %s, %s, %s)'] * len(totals))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {placeholders} "
+                f"ON CONFLICT (day, sku) DO UPDATE SET "
+                f"units = {table}.units + excluded.units, lines = {table}.lines + excluded.lines, "
+                f"product_id = excluded.product_id",
+                params,
+            )
+
+    def between(self, start, end, sku=None):
+        queryset = self.filter(day__range=(start, end))
+        if sku:
+            queryset = queryset.filter(sku=sku)
+        return queryset
+
+    def by_day(self, start, end, sku=None):
+        """
+        Unidades y líneas vendidas por día entre `start` y `end` (inclusive).
+        """
+        return (
+            self.between(start, end, sku).values('day')
+            .annotate(units=Sum('units'), lines=Sum('lines')).order_by('day')
+        )
+
+    def top_skus(self, start, end, limit=10):
+        """
+        Los `limit` SKU con más unidades vendidas entre `start` y `end`.
+        """
+        return (
+            self.between(start, end).values('sku')
+            .annotate(units=Sum('units'), lines=Sum('lines')).order_by('-units', 'sku')[:limit]
+        )
+
+
+class DailySales(models.Model):
+    """
+    Modelo con las ventas acumuladas de un SKU en un día.
+
+    Se actualiza en la misma transacción que cada pedido, así que los
+    reportes de ventas leen estos acumulados en lugar de recorrer las líneas
+    de pedido, y se conservan aunque se eliminen las particiones antiguas.
+
+    Atributos:
+        day (date): Día de las ventas.
+        sku (str): Codigo del producto.
+        product_id (UUID): ID del producto de la última venta registrada.
+        units (int): Unidades vendidas.
+        lines (int): Líneas de pedido que las sumaron.
+    """
+
+    day = models.DateField()
+    sku = models.CharField(max_length=10)
+    product_id = models.UUIDField(null=True)
+    units = models.PositiveBigIntegerField(default=0)
+    lines = models.PositiveIntegerField(default=0)
+
+    objects = DailySalesQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'sku'], name='daily_sales_day_sku'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.sku}: {self.units}"
+
+class StockAlert(models.Model):
+    """
+    Modelo que registra las alertas de stock bajo emitidas.
+
+    Atributos:
+        sku (str): Codigo del producto.
+        name (str): Nombre del producto.
+        stock (Decimal): Existencia al momento de la alerta.
+        threshold (int): Umbral configurado para el producto.
+        created_at (datetime): Momento en que se detectó el stock bajo.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='stock_alerts')
+    sku = models.CharField(max_length=10)
+    name = models.CharField(max_length=50)
+    stock = models.DecimalField(max_digits=10, decimal_places=2)
+    threshold = models.PositiveIntegerField()
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.sku} ({self.stock})"
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    """
+    QuerySet de claves de idempotencia.
+    """
+
+    def claim(self, scope, key, fingerprint):
+        """
+        Reserva la clave `key` en `scope` para procesar una petición.
+
+        Debe llamarse dentro de la transacción que aplica el cambio y guarda
+        la respuesta: la fila se inserta en esa transacción, así que otra
+        petición nunca ve una reserva sin respuesta confirmada. Una repetición
+        concurrente queda bloqueada en la inserción hasta que la original
+        confirma (y entonces recibe su respuesta) o revierte (y entonces la
+        procesa ella); en PostgreSQL la espera se corta a los
+        `IDEMPOTENCY_WAIT_TIMEOUT` segundos.
+
+        Retorna `(registro, True)` si esta petición debe procesarse: la clave
+        no existía o había expirado. Retorna `(registro, False)` cuando ya hay
+        respuesta guardada, cuando la clave se usó con otro cuerpo o cuando la
+        espera se agotó (registro sin `response_status`).
+        """
+        ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_TTL', 86400))
+        wait = getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 10)
+        connection = connections[self.db]
+
+        while True:
+            now = timezone.now()
+            fields = {'fingerprint': fingerprint, 'locked_at': now, 'expires_at': now + ttl}
+            try:
+                with transaction.atomic(using=self.db):
+                    previous = self._set_lock_timeout(connection, f'{max(int(wait * 1000), 1)}ms')
+                    record = self.create(scope=scope, key=key, **fields)
+                    self._set_lock_timeout(connection, previous)
+                return record, True
+            except IntegrityError:
+                pass
+            except OperationalError:
+                # Se agotó la espera: la petición original sigue en curso.
+                return self.model(scope=scope, key=key, fingerprint=fingerprint), False
+
+            # Reutiliza una clave expirada; la fila queda bloqueada hasta confirmar.
+            taken = self.filter(scope=scope, key=key, expires_at__lte=now).update(
+                response_status=None, response_body='', **fields
+            )
+            if taken:
+                return self.get(scope=scope, key=key), True
+
+            record = self.filter(scope=scope, key=key).first()
+            if record is not None:
+                return record, False
+
+    @staticmethod
+    def _set_lock_timeout(connection, value):
+        """
+        Cambia `lock_timeout` hasta el final de la transacción en PostgreSQL y
+        retorna el valor anterior.
+        """
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT current_setting('lock_timeout'), set_config('lock_timeout', %s, true)", [value])
+            return cursor.fetchone()[0]
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+    def purge_expired(self, batch_size=10000):
+        """
+        Elimina las claves expiradas en lotes de `batch_size` y retorna cuántas borró.
+        """
+        deleted = 0
+        while True:
+            pks = list(self.expired().values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            deleted += self.filter(pk__in=pks).delete()[0]
+
+
+class IdempotencyKey(models.Model):
+    """
+    Modelo que guarda la respuesta de una petición enviada con `Idempotency-Key`.
+
+    Atributos:
+        scope (str): Método y ruta de la petición.
+        key (str): Valor de la cabecera `Idempotency-Key`.
+        fingerprint (str): Huella SHA-256 del cuerpo de la petición.
+        response_status (int): Código de la respuesta, vacío mientras se procesa.
+        response_body (str): Respuesta JSON guardada.
+        locked_at (datetime): Momento en que se reservó la clave.
+        expires_at (datetime): Momento a partir del cual la clave puede reutilizarse.
+    """
+
+    scope = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True)
+    response_body = models.TextField(blank=True)
+    locked_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
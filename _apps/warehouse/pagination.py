@@ -0,0 +1,32 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+from rest_framework.request import Request
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) para el listado de productos.
+
+    Ordena por `sku`, que es único y está indexado, por lo que cada página se
+    resuelve con un `WHERE sku > cursor ORDER BY sku LIMIT n` y las páginas
+    profundas cuestan lo mismo que la primera. Los cursores `next`/`previous`
+    son opacos para el cliente.
+    """
+    ordering = 'sku'
+    page_size = getattr(settings, 'PRODUCT_PAGE_SIZE', 100)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'PRODUCT_MAX_PAGE_SIZE', 1000)
+
+
+class AsyncProductCursorPagination(ProductCursorPagination):
+    """
+    Variante de `ProductCursorPagination` para las vistas asíncronas.
+
+    Ejecuta el `paginate_queryset` de DRF con `sync_to_async`, de modo que la
+    página se lee fuera del bucle de eventos; los cursores y los enlaces
+    `next`/`previous` son los mismos que los de la vista síncrona.
+    """
+
+    async def apaginate_queryset(self, queryset, request):
+        return await sync_to_async(self.paginate_queryset)(queryset, Request(request))
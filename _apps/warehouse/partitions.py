@@ -0,0 +1,177 @@
+"""
+Almacenamiento de pedidos particionado por mes.
+
+En PostgreSQL `warehouse_order` y `warehouse_orderline` son tablas
+particionadas por rango de `created_at`, con una partición por mes UTC
+(`warehouse_order_p2026_10`...) y una partición `_default` que recibe lo que
+no cae en ninguna; las tablas y sus primeras particiones las crea la
+migración 0010. Eliminar un mes antiguo es desenganchar y borrar su
+partición, sin recorrer filas ni generar bloat. `ensure_partitions` debe
+crear los meses con anticipación: una vez que un mes tiene filas en la
+partición por defecto, ya no se le puede crear la suya. `manage.py serve` las
+crea al iniciar y cada `ORDER_PARTITION_INTERVAL` segundos, y registra un
+error crítico si el mes siguiente queda sin partición; el comando
+`order_partitions` hace lo mismo y además elimina los meses antiguos.
+
+En los demás motores son tablas normales y los meses antiguos se eliminan
+con `DELETE` por lotes.
+"""
+import logging
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import DatabaseError, transaction
+
+from .models import Order, OrderLine
+
+# Tablas particionadas, en el orden en que se eliminan las filas de un mes
+PARTITIONED_TABLES = ('warehouse_orderline', 'warehouse_order')
+
+# Filas borradas por sentencia en los motores sin particiones
+DELETE_BATCH_SIZE = 10000
+
+_PARTITION_NAME = re.compile(r'_p(\d{4})_(\d{2})$')
+
+logger = logging.getLogger(__name__)
+
+
+def add_months(month, months):
+    """
+    Retorna el primer día del mes `months` meses después de `month`.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_of(value):
+    return date(value.year, value.month, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month.year:04d}_{month.month:02d}'
+
+
+def ensure_partitions(connection, months_ahead=3, today=None):
+    """
+    Crea las particiones que falten desde el mes de `today` hasta
+    `months_ahead` meses después. Retorna los nombres de las creadas.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    current = month_of(today or datetime.now(dt_timezone.utc).date())
+    existing = set(list_partitions(connection))
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            for table in reversed(PARTITIONED_TABLES):
+                name = partition_name(table, month)
+                if name in existing:
+                    continue
+                cursor.execute(
+                    f"CREATE TABLE {connection.ops.quote_name(name)} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+                    f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+                )
+                created.append(name)
+    return created
+
+
+def maintain_partitions(connection, months_ahead=3, today=None):
+    """
+    Crea las particiones que falten con `ensure_partitions` y comprueba el
+    horizonte: si el mes siguiente al de `today` no tiene partición en todas
+    las tablas, registra un error crítico, porque sus pedidos caerían en la
+    partición por defecto y ese mes ya no se podría particionar.
+
+    Returns:
+        list[str]: Nombres de las particiones creadas.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    try:
+        created = ensure_partitions(connection, months_ahead, today)
+    except DatabaseError:
+        logger.exception("No se pudieron crear las particiones de pedidos.")
+        created = []
+    horizon = partition_horizon(connection)
+    following = add_months(month_of(today or datetime.now(dt_timezone.utc).date()), 1)
+    if horizon is None or horizon < following:
+        logger.critical(
+            f"Las particiones de pedidos llegan sólo hasta {horizon or 'ningún mes'}: "
+            f"los pedidos de {following:%Y-%m} irán a la partición por defecto."
+        )
+    return created
+
+
+def partition_horizon(connection):
+    """
+    Retorna el último mes con partición en todas las tablas de pedidos, o
+    `None` si alguna no tiene particiones mensuales.
+    """
+    last = {}
+    for name, month in list_partitions(connection).items():
+        table = name[:name.rindex('_p')]
+        last[table] = max(month, last.get(table, month))
+    if len(last) < len(PARTITIONED_TABLES):
+        return None
+    return min(last.values())
+
+
+def list_partitions(connection):
+    """
+    Retorna `{nombre: mes}` de las particiones mensuales existentes.
+    """
+    if connection.vendor != 'postgresql':
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE parent.relname = ANY(%s)',
+            [list(PARTITIONED_TABLES)],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = _PARTITION_NAME.search(name)
+        if match:
+            partitions[name] = date(int(match[1]), int(match[2]), 1)
+    return partitions
+
+
+def drop_orders_before(connection, before):
+    """
+    Elimina los pedidos de los meses anteriores al mes de `before`.
+
+    En PostgreSQL desengancha y borra las particiones de esos meses; en otros
+    motores borra las filas por lotes.
+
+    Returns:
+        tuple[list[str], int]: Particiones eliminadas y filas borradas.
+    """
+    cutoff = month_of(before)
+    if connection.vendor == 'postgresql':
+        dropped = []
+        for name, month in sorted(list_partitions(connection).items(), key=lambda item: item[1]):
+            if month >= cutoff:
+                continue
+            parent = name[:name.rindex('_p')]
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                quoted = connection.ops.quote_name(name)
+                cursor.execute(f'ALTER TABLE {parent} DETACH PARTITION {quoted}')
+                cursor.execute(f'DROP TABLE {quoted}')
+            dropped.append(name)
+        return dropped, 0
+
+    boundary = datetime(cutoff.year, cutoff.month, 1, tzinfo=dt_timezone.utc)
+    deleted = 0
+    for model in (OrderLine, Order):
+        queryset = model.objects.using(connection.alias).filter(created_at__lt=boundary)
+        while True:
+            pks = list(queryset.values_list('pk', flat=True)[:DELETE_BATCH_SIZE])
+            if not pks:
+                break
+            deleted += model.objects.using(connection.alias).filter(pk__in=pks).delete()[0]
+    return [], deleted
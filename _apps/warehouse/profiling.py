@@ -0,0 +1,252 @@
+"""
+Perfilado de peticiones bajo demanda.
+
+`ProfilingMiddleware` perfila una fracción `PROFILING_SAMPLE_RATE` de las
+peticiones y, además, las que envían la cabecera `X-Profile-Token` con el
+valor de `PROFILING_TOKEN`. Con ambos desactivados (por defecto) el costo por
+petición es leer dos settings.
+
+De cada petición perfilada se guarda, en un archivo JSON dentro de
+`PROFILING_DIR`:
+
+- las funciones de Python con su número de llamadas y tiempos propio y
+  acumulado (`cProfile`), sólo en las peticiones síncronas: en una petición
+  asíncrona el bucle de eventos intercala otras corrutinas y el trabajo de
+  `sync_to_async` ocurre en otros hilos, así que el perfil no sería de la
+  petición;
+- las sentencias SQL ejecutadas, con su duración. Cada conexión lleva un
+  envoltorio permanente (`install_query_hook`) que sólo registra si hay un
+  perfil activo en la variable de contexto, así que también captura las
+  consultas que una vista asíncrona ejecuta en otro hilo con `sync_to_async`.
+
+El directorio funciona como un anillo: al escribir un perfil se borran los
+más antiguos para conservar como máximo `PROFILING_RING_SIZE`. El comando
+`profile_report` los agrega en un reporte de funciones y consultas.
+"""
+import contextvars
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+# Cabecera con la que se pide perfilar una petición
+PROFILE_HEADER = 'X-Profile-Token'
+
+# Cabecera de respuesta con el ID del perfil de una petición pedida por cabecera
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+# Funciones y consultas guardadas por perfil
+MAX_FUNCTIONS = 500
+MAX_QUERIES = 1000
+
+PROFILE_SUFFIX = '.profile.json'
+
+_PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+
+_active_profile = contextvars.ContextVar('warehouse_request_profile', default=None)
+
+
+def should_profile(request):
+    """
+    Retorna `(perfilar, pedido_por_cabecera)` para `request`.
+    """
+    token = getattr(settings, 'PROFILING_TOKEN', '')
+    if token:
+        sent = request.headers.get(PROFILE_HEADER)
+        if sent and hmac.compare_digest(sent.encode(), token.encode()):
+            return True, True
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+    return bool(rate) and random.random() < rate, False
+
+
+def normalize_sql(sql):
+    """
+    Une las listas de parámetros (`IN (%s, %s, ...)`, `VALUES`) de distinto
+    largo para que la misma consulta se agregue en una sola fila.
+    """
+    return _PLACEHOLDER_LIST.sub('%s, ...', ' '.join(sql.split()))
+
+
+def capture_query(execute, sql, params, many, context):
+    profile = _active_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, context['connection'].alias, many, time.perf_counter() - start)
+
+
+def install_query_hook(connection):
+    """
+    Agrega `capture_query` a los envoltorios de `connection`, si no lo tiene.
+
+    Se inserta primero en la lista: `connection.execute_wrapper` quita el
+    último envoltorio al salir, así que uno agregado al final mientras otro
+    está activo se perdería.
+    """
+    if capture_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, capture_query)
+
+
+class RequestProfile:
+    """
+    Perfil de una petición: funciones (si `functions` es True) y consultas SQL.
+
+    Se usa como contexto alrededor del manejo de la petición.
+    """
+
+    def __init__(self, request, functions=True):
+        self.request = request
+        self.queries = []
+        self.duration = 0.0
+        # Sólo un perfilador por hilo: si ya hay uno activo (depurador,
+        # coverage) se capturan sólo las consultas.
+        self.profiler = cProfile.Profile() if functions and sys.getprofile() is None else None
+        self._token = None
+
+    def __enter__(self):
+        for connection in connections.all(initialized_only=True):
+            install_query_hook(connection)
+        self._token = _active_profile.set(self)
+        self._start = time.perf_counter()
+        if self.profiler is not None:
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Python 3.12+: otra herramienta ya usa sys.monitoring.
+                self.profiler = None
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.duration = time.perf_counter() - self._start
+        _active_profile.reset(self._token)
+
+    def add_query(self, sql, alias, many, duration):
+        if len(self.queries) < MAX_QUERIES:
+            self.queries.append({'sql': sql, 'alias': alias, 'many': many, 'duration': duration})
+
+    def functions(self):
+        """
+        Retorna las funciones perfiladas ordenadas por tiempo acumulado.
+        """
+        if self.profiler is None:
+            return []
+        rows = [
+            {
+                'function': f'{filename}:{line}({name})',
+                'calls': calls,
+                'tottime': tottime,
+                'cumtime': cumtime,
+            }
+            for (filename, line, name), (_, calls, tottime, cumtime, _) in pstats.Stats(self.profiler).stats.items()
+        ]
+        rows.sort(key=lambda row: row['cumtime'], reverse=True)
+        return rows[:MAX_FUNCTIONS]
+
+    def as_dict(self, response):
+        match = self.request.resolver_match
+        return {
+            'method': self.request.method,
+            'path': self.request.path,
+            'route': match.view_name if match else 'unmatched',
+            'status': response.status_code,
+            'started_at': time.time() - self.duration,
+            'duration': self.duration,
+            'queries': self.queries,
+            'functions': self.functions(),
+        }
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILING_DIR'))
+
+
+def save_profile(data, directory=None):
+    """
+    Escribe el perfil en el anillo y borra los más antiguos que sobren.
+    Retorna el ID del perfil.
+    """
+    directory = Path(directory or profile_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    # El nombre empieza por el instante, así que el orden alfabético es el cronológico.
+    profile_id = f'{time.time_ns():020d}-{uuid.uuid4().hex[:8]}'
+    descriptor, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(descriptor, 'w') as stream:
+        json.dump(data, stream)
+    os.replace(tmp_path, directory / f'{profile_id}{PROFILE_SUFFIX}')
+
+    ring_size = getattr(settings, 'PROFILING_RING_SIZE', 200)
+    for path in list_profiles(directory)[:-ring_size]:
+        path.unlink(missing_ok=True)
+    return profile_id
+
+
+def list_profiles(directory=None):
+    """
+    Retorna las rutas de los perfiles guardados, del más antiguo al más nuevo.
+    """
+    directory = Path(directory or profile_dir())
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob(f'*{PROFILE_SUFFIX}'))
+
+
+def load_profiles(directory=None, route=None):
+    profiles = []
+    for path in list_profiles(directory):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            # Un perfil borrado o a medio escribir por otro proceso.
+            continue
+        if route is None or data['route'] == route:
+            profiles.append(data)
+    return profiles
+
+
+def aggregate(profiles, top=20, sort='tottime'):
+    """
+    Agrega los perfiles en un reporte de las `top` funciones (por `sort`) y
+    consultas (por tiempo total) más costosas, y de las rutas perfiladas.
+    """
+    routes = {}
+    functions = {}
+    queries = {}
+    for profile in profiles:
+        route = routes.setdefault(profile['route'], {'route': profile['route'], 'requests': 0, 'duration': 0.0, 'queries': 0})
+        route['requests'] += 1
+        route['duration'] += profile['duration']
+        route['queries'] += len(profile['queries'])
+        for row in profile['functions']:
+            total = functions.setdefault(row['function'], {'function': row['function'], 'calls': 0, 'tottime': 0.0, 'cumtime': 0.0})
+            total['calls'] += row['calls']
+            total['tottime'] += row['tottime']
+            total['cumtime'] += row['cumtime']
+        for query in profile['queries']:
+            sql = normalize_sql(query['sql'])
+            total = queries.setdefault(sql, {'sql': sql, 'count': 0, 'total': 0.0, 'max': 0.0})
+            total['count'] += 1
+            total['total'] += query['duration']
+            total['max'] = max(total['max'], query['duration'])
+
+    return {
+        'profiles': len(profiles),
+        'routes': sorted(routes.values(), key=lambda row: row['duration'], reverse=True),
+        'functions': sorted(functions.values(), key=lambda row: row[sort], reverse=True)[:top],
+        'queries': sorted(queries.values(), key=lambda row: row['total'], reverse=True)[:top],
+    }
@@ -0,0 +1,46 @@
+import re
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Números en notación exponencial, que orjson escribe distinto que `json` ("1e-5" frente a "1e-05")
+EXPONENT_PATTERN = re.compile(rb'\de[-+]?\d')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` que codifica con orjson cuando está instalado.
+
+    La salida es idéntica byte a byte a la de `JSONRenderer`: los tipos que
+    orjson no conoce (Decimal, fechas, objetos perezosos...) pasan por el
+    mismo `JSONEncoder.default` de DRF. Se usa el renderer estándar cuando no
+    hay orjson, cuando se pide indentación, cuando orjson no puede codificar
+    los datos (claves no textuales, enteros de más de 64 bits) o cuando el
+    resultado contiene números en notación exponencial.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if EXPONENT_PATTERN.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Igual que JSONRenderer, se escapan U+2028 y U+2029.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,249 @@
+"""
+Enrutamiento de lecturas del catálogo a réplicas.
+
+`ReplicaRouter` envía las lecturas de los modelos de `REPLICA_READ_MODELS` a
+una de las réplicas de `DATABASE_REPLICAS`, elegida al azar según su peso
+entre las que están sanas. Todo lo demás va a la primaria (`default`):
+
+- las escrituras y cualquier lectura dentro de una transacción de la primaria;
+- toda la petición, si su método no es seguro (POST, PATCH...) o si ya
+  ejecutó un INSERT, UPDATE o DELETE (ver `track_writes`);
+- las peticiones de un cliente que escribió hace menos de
+  `REPLICA_PIN_SECONDS` segundos, para que lea sus propias escrituras aunque
+  las réplicas vayan retrasadas.
+
+El estado de cada petición lo mantiene `ReplicaRoutingMiddleware` en una
+variable de contexto, así que también se respeta en las vistas asíncronas.
+Fuera de una petición (comandos, hilos propios) cada lectura elige réplica.
+La marca de los clientes fijados vive en `REPLICA_PIN_CACHE_ALIAS`, que debe
+ser una caché compartida entre procesos (ver `check_pin_cache`): con una
+local, la siguiente petición del cliente puede caer en otro worker que no lo
+sabe fijado.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .admission import get_client_ident
+from .cache import is_shared_cache
+
+logger = logging.getLogger(__name__)
+
+# Prefijo de las claves que marcan a los clientes que acaban de escribir
+PIN_KEY_PREFIX = 'warehouse:replica-pin:'
+
+# Sentencias que cuentan como escritura para fijar al cliente en la primaria
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_request_state = contextvars.ContextVar('warehouse_replica_routing', default=None)
+
+
+class RoutingState:
+    """
+    Decisiones de enrutamiento de una petición.
+
+    Atributos:
+        pinned (bool): Si las lecturas deben ir a la primaria.
+        wrote (bool): Si la petición escribió en la base de datos.
+        replica (str): Réplica elegida para la petición, si ya se eligió.
+    """
+    __slots__ = ('pinned', 'wrote', 'replica')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+def begin_request(request):
+    """
+    Abre el estado de enrutamiento de `request`. Retorna `(estado, token)`.
+    """
+    pinned = request.method not in ('GET', 'HEAD', 'OPTIONS')
+    if not pinned and settings.DATABASE_REPLICAS:
+        pinned = bool(get_pin_cache().get(PIN_KEY_PREFIX + get_client_ident(request)))
+    state = RoutingState(pinned)
+    return state, _request_state.set(state)
+
+
+def end_request(request, state, token):
+    """
+    Cierra el estado de la petición y, si escribió, fija al cliente en la
+    primaria durante `REPLICA_PIN_SECONDS`.
+    """
+    _request_state.reset(token)
+    if state.wrote and settings.DATABASE_REPLICAS:
+        get_pin_cache().set(PIN_KEY_PREFIX + get_client_ident(request), 1, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def track_writes(execute, sql, params, many, context):
+    """
+    Envoltorio de consultas que fija en la primaria a la petición en curso
+    cuando ejecuta una escritura en ella.
+
+    Sólo cuentan las sentencias que escriben: pedir el alias de escritura
+    (por ejemplo para `select_for_update` o la búsqueda de `get_or_create`)
+    no fija al cliente.
+    """
+    result = execute(sql, params, many, context)
+    state = _request_state.get()
+    if (
+        state is not None and not state.wrote
+        and context['connection'].alias == DEFAULT_DB_ALIAS
+        and sql.lstrip().upper().startswith(WRITE_STATEMENTS)
+    ):
+        state.pinned = state.wrote = True
+    return result
+
+
+def install_write_tracker(connection):
+    """
+    Agrega `track_writes` a los envoltorios de `connection`, si no lo tiene.
+
+    Igual que `install_query_counter`, se inserta primero para no interferir
+    con los envoltorios temporales de `connection.execute_wrapper`.
+    """
+    if track_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, track_writes)
+
+
+def is_pinned():
+    """
+    Retorna si la petición en curso lee de la primaria.
+    """
+    state = _request_state.get()
+    return state is not None and state.pinned
+
+
+def get_pin_cache():
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE_ALIAS', 'default')]
+
+
+def check_pin_cache():
+    """
+    Advierte si `REPLICA_PIN_CACHE_ALIAS` no es una caché compartida entre
+    procesos: un cliente fijado en un worker podría leer de una réplica en
+    otro. Con `REQUIRE_SHARED_CACHE` lanza `ImproperlyConfigured` en su lugar.
+    """
+    alias = getattr(settings, 'REPLICA_PIN_CACHE_ALIAS', 'default')
+    if is_shared_cache(alias):
+        return
+    message = (
+        f"DB_REPLICAS necesita una caché compartida entre procesos y REPLICA_PIN_CACHE_ALIAS='{alias}' "
+        f"es local al proceso; configure CACHE_REDIS_URL o quite las réplicas."
+    )
+    if getattr(settings, 'REQUIRE_SHARED_CACHE', False):
+        raise ImproperlyConfigured(message)
+    logger.warning(message)
+
+
+class ReplicaHealth:
+    """
+    Estado de salud de las réplicas, por proceso.
+
+    Cada réplica se verifica como máximo una vez cada
+    `REPLICA_HEALTH_INTERVAL` segundos: debe responder y, en PostgreSQL, no
+    llevar más de `REPLICA_MAX_LAG` segundos de retraso en la replicación.
+    Mientras un hilo verifica, los demás usan el resultado anterior.
+    """
+
+    def __init__(self):
+        self._status = {}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        status = self._status.get(alias)
+        if status is not None and status[1] > now:
+            return status[0]
+        if not self._lock.acquire(blocking=False):
+            return status[0] if status is not None else False
+        try:
+            healthy = self.check(alias)
+            self._status[alias] = (healthy, now + getattr(settings, 'REPLICA_HEALTH_INTERVAL', 5))
+            return healthy
+        finally:
+            self._lock.release()
+
+    def check(self, alias):
+        """
+        Consulta la réplica `alias` y retorna si puede recibir lecturas.
+        """
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor != 'postgresql':
+                    cursor.execute('SELECT 1')
+                    return True
+                # Sin WAL pendiente de aplicar no hay retraso, aunque la primaria esté inactiva.
+                cursor.execute(
+                    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+                    'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+                )
+                lag = cursor.fetchone()[0]
+        except DatabaseError:
+            return False
+        return lag <= getattr(settings, 'REPLICA_MAX_LAG', 10)
+
+    def reset(self):
+        self._status.clear()
+
+
+replica_health = ReplicaHealth()
+
+
+def choose_replica():
+    """
+    Elige una réplica sana al azar según su peso, o `None` si no hay ninguna.
+    """
+    replicas = getattr(settings, 'DATABASE_REPLICAS', {})
+    healthy = [alias for alias in replicas if replica_health.is_healthy(alias)]
+    if not healthy:
+        return None
+    return random.choices(healthy, weights=[replicas[alias] for alias in healthy])[0]
+
+
+class ReplicaRouter:
+    """
+    Router que lee el catálogo de las réplicas y escribe en la primaria.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not getattr(settings, 'DATABASE_REPLICAS', None):
+            return None
+        if model._meta.label_lower not in settings.REPLICA_READ_MODELS:
+            return None
+        state = _request_state.get()
+        if state is not None and state.pinned:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state is None:
+            return choose_replica() or DEFAULT_DB_ALIAS
+        if state.replica is None:
+            # La misma réplica durante toda la petición, para leer un estado coherente.
+            state.replica = choose_replica() or DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        # La petición se fija en la primaria al escribir (ver `track_writes`).
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las réplicas contienen los mismos datos que la primaria.
+        aliases = {DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', {})}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', {}):
+            return False
+        return None
@@ -0,0 +1,100 @@
+"""
+Índice de trigramas para buscar productos por nombre.
+
+Django no declara estos índices de forma portable, así que se crean con SQL
+propio de cada motor:
+
+- PostgreSQL: índice GIN `gin_trgm_ops` (extensión `pg_trgm`) sobre
+  `UPPER(name)`, la misma expresión que genera `name__icontains`.
+- SQLite: tabla virtual FTS5 con el tokenizador `trigram`, mantenida al día
+  con triggers. La clave de cada fila es un entero estable de la tabla
+  `warehouse_product_name_key` (`INTEGER PRIMARY KEY`, con el `id` del
+  producto), no el `rowid` implícito de la tabla de productos, que cambia
+  con `VACUUM` o al rehacer la tabla porque su clave primaria es un UUID.
+
+Al rehacer una tabla, SQLite elimina sus triggers, por lo que
+`ensure_name_index` se ejecuta tras cada `migrate`.
+"""
+
+PRODUCT_TABLE = 'warehouse_product'
+FTS_TABLE = 'warehouse_product_name_fts'
+KEY_TABLE = 'warehouse_product_name_key'
+
+POSTGRESQL_CREATE = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON {PRODUCT_TABLE} USING gin (UPPER(name) gin_trgm_ops)',
+]
+POSTGRESQL_DROP = [
+    'DROP INDEX IF EXISTS product_name_trgm_idx',
+]
+
+_key = f'(SELECT id FROM {KEY_TABLE} WHERE product_id = %s.id)'
+
+SQLITE_CREATE = [
+    f'CREATE TABLE {KEY_TABLE} (id integer NOT NULL PRIMARY KEY, product_id char(32) NOT NULL UNIQUE)',
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, tokenize='trigram')",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {KEY_TABLE}(product_id) VALUES (new.id);
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES ({_key % 'new'}, new.name);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {PRODUCT_TABLE} BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = {_key % 'old'};
+        DELETE FROM {KEY_TABLE} WHERE product_id = old.id;
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF name ON {PRODUCT_TABLE} BEGIN
+        UPDATE {FTS_TABLE} SET name = new.name WHERE rowid = {_key % 'new'};
+    END""",
+    f'INSERT INTO {KEY_TABLE}(product_id) SELECT id FROM {PRODUCT_TABLE}',
+    f"""INSERT INTO {FTS_TABLE}(rowid, name)
+        SELECT k.id, p.name FROM {KEY_TABLE} k JOIN {PRODUCT_TABLE} p ON p.id = k.product_id""",
+]
+SQLITE_DROP = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+    f'DROP TABLE IF EXISTS {KEY_TABLE}',
+]
+
+# Búsqueda de candidatos: IDs de los productos cuyo nombre contiene el texto
+SQLITE_CANDIDATES = (
+    f'SELECT k.product_id FROM {FTS_TABLE} f JOIN {KEY_TABLE} k ON k.id = f.rowid WHERE f.name LIKE %s'
+)
+
+
+def create_name_index(connection):
+    """
+    Crea el índice de nombres para el motor de `connection`.
+
+    En otros motores no hace nada y la búsqueda recorre la tabla.
+    """
+    drop_name_index(connection)
+    statements = {'postgresql': POSTGRESQL_CREATE, 'sqlite': SQLITE_CREATE}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def drop_name_index(connection):
+    """
+    Elimina el índice de nombres, si existe.
+    """
+    statements = {'postgresql': POSTGRESQL_DROP, 'sqlite': SQLITE_DROP}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def ensure_name_index(connection):
+    """
+    Reconstruye el índice FTS5 de SQLite si una migración eliminó sus triggers.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    triggers = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)", [FTS_TABLE, *triggers])
+        found = {name for name, in cursor.fetchall()}
+    # Sin la tabla virtual, la migración 0006 aún no se ha aplicado.
+    if FTS_TABLE in found and not found.issuperset(triggers):
+        create_name_index(connection)
@@ -1,3 +1,7 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Product
 
@@ -10,7 +14,7 @@ class ProductSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Product
-        fields = ['id', 'sku', 'name', 'description']
+        fields = ['id', 'sku', 'name', 'description', 'low_stock_threshold']
         read_only_fields = ['id']
 
     def validate_sku(self, value):
@@ -23,6 +27,95 @@ class ProductSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("El nombre debe tener al menos 5 caracteres.")
         return value
 
+class LowStockProductSerializer(serializers.ModelSerializer):
+    """
+    Serializador para el reporte de productos con stock bajo.
+
+    Incluye el stock, el umbral propio de cada producto y el faltante para
+    alcanzarlo, anotado por `ProductQuerySet.low_stock`.
+    """
+    deficit = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'sku', 'name', 'stock', 'low_stock_threshold', 'deficit']
+        read_only_fields = fields
+
+class ProductSearchSerializer(serializers.Serializer):
+    """
+    Serializador para validar los parámetros de búsqueda del listado de productos.
+    """
+    sku = serializers.CharField(required=False, allow_blank=True, max_length=10)
+    q = serializers.CharField(required=False, allow_blank=True, min_length=3, max_length=50)
+    stock_min = serializers.DecimalField(required=False, max_digits=10, decimal_places=2)
+    stock_max = serializers.DecimalField(required=False, max_digits=10, decimal_places=2)
+    low_stock = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        """
+        Validar que el rango de stock no esté invertido.
+        """
+        if data.get('stock_min') is not None and data.get('stock_max') is not None and data['stock_min'] > data['stock_max']:
+            raise serializers.ValidationError("stock_min no puede ser mayor que stock_max.")
+        return data
+
+class ProductChangesSerializer(serializers.Serializer):
+    """
+    Serializador para validar los parámetros de una página del feed de cambios.
+    """
+    since = serializers.IntegerField(required=False, default=0, min_value=0)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_limit(self, value):
+        """
+        Validar que la página no exceda `CHANGE_FEED_MAX_PAGE_SIZE`.
+        """
+        if value > settings.CHANGE_FEED_MAX_PAGE_SIZE:
+            raise serializers.ValidationError(f"limit no puede ser mayor que {settings.CHANGE_FEED_MAX_PAGE_SIZE}.")
+        return value
+
+class SalesReportSerializer(serializers.Serializer):
+    """
+    Serializador para validar los parámetros de los reportes de ventas.
+
+    Sin fechas, el reporte cubre los últimos 30 días hasta hoy.
+    """
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    sku = serializers.CharField(required=False, allow_blank=True, max_length=10)
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=100)
+
+    def validate(self, data):
+        """
+        Validar que el rango no esté invertido ni exceda `SALES_REPORT_MAX_DAYS`.
+        """
+        data['end'] = data.get('end') or timezone.localdate()
+        data['start'] = data.get('start') or data['end'] - timedelta(days=29)
+        if data['start'] > data['end']:
+            raise serializers.ValidationError("start no puede ser posterior a end.")
+        if (data['end'] - data['start']).days >= settings.SALES_REPORT_MAX_DAYS:
+            raise serializers.ValidationError(f"El rango no puede superar los {settings.SALES_REPORT_MAX_DAYS} días.")
+        return data
+
+class StockStreamSerializer(serializers.Serializer):
+    """
+    Serializador para validar los productos (`id`) y SKU (`sku`) a los que se
+    suscribe un cliente del stream de stock.
+    """
+    id = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+    sku = serializers.ListField(child=serializers.CharField(max_length=10), required=False, default=list)
+
+    def validate(self, data):
+        """
+        Validar que se indique al menos un producto y no más de `STOCK_STREAM_MAX_KEYS`.
+        """
+        keys = len(data['id']) + len(data['sku'])
+        if not keys:
+            raise serializers.ValidationError("Debe indicar al menos un id o sku.")
+        if keys > settings.STOCK_STREAM_MAX_KEYS:
+            raise serializers.ValidationError(f"No puede suscribirse a más de {settings.STOCK_STREAM_MAX_KEYS} productos.")
+        return data
+
 class ProductStockUpdateSerializer(serializers.ModelSerializer):
     """
     Serializador para actualizar el stock de un producto.
@@ -32,18 +125,65 @@ class ProductStockUpdateSerializer(serializers.ModelSerializer):
         fields = ['stock']
 
     def validate_stock(self, value):
+        return validate_stock_amount(value)
+
+def validate_stock_amount(value):
+    """
+    Validar que el stock sea un valor positivo y razonable.
+    """
+    if value <= 0:
+        raise serializers.ValidationError("El stock debe ser un valor positivo.")
+    if value > 10000:
+        raise serializers.ValidationError("El stock no puede exceder los 10,000.")
+    return value
+
+# Cantidad máxima de líneas aceptadas en un ajuste de inventario
+MAX_ADJUSTMENT_LINES = 20000
+
+
+class StockAdjustmentLineSerializer(serializers.Serializer):
+    """
+    Serializador de una línea de ajuste de inventario.
+
+    El producto se identifica por `product_id` o por `sku`, y `delta` sigue
+    las mismas reglas que `ProductStockUpdateSerializer.validate_stock`.
+    """
+    product_id = serializers.UUIDField(required=False)
+    sku = serializers.CharField(required=False, max_length=10)
+    delta = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    def validate_delta(self, value):
+        return validate_stock_amount(value)
+
+    def validate(self, data):
         """
-        Validar que el stock sea un valor positivo y razonable.
+        Validar que la línea indique exactamente uno de `product_id` o `sku`.
         """
-        if value <= 0:
-            raise serializers.ValidationError("El stock debe ser un valor positivo.")
-        if value > 10000:
-            raise serializers.ValidationError("El stock no puede exceder los 10,000.")
-        return value
+        if ('product_id' in data) == ('sku' in data):
+            raise serializers.ValidationError("Debe indicar product_id o sku, pero no ambos.")
+        return data
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    """
+    Serializador para ajustar el stock de muchos productos a la vez.
+    """
+    lines = StockAdjustmentLineSerializer(many=True, allow_empty=False, max_length=MAX_ADJUSTMENT_LINES)
+    all_or_nothing = serializers.BooleanField(default=False)
+
+    class Meta:
+        fields = ['lines', 'all_or_nothing']
+
+# Cantidad máxima de líneas aceptadas en un pedido por lotes
+MAX_BATCH_ORDER_LINES = 1000
+
 
 class OrderSerializer(serializers.Serializer):
     """
     Serializador para realizar un pedido de un producto.
+
+    La existencia del producto no se valida aquí: la vista la resuelve con el
+    mismo UPDATE condicional que descuenta el stock.
     """
     product_id = serializers.UUIDField()
     quantity = serializers.IntegerField(min_value=1)
@@ -51,11 +191,35 @@ class OrderSerializer(serializers.Serializer):
     class Meta:
         fields = ['product_id', 'quantity']
 
-    def validate(self, data):
-        """
-        Validar que el product_id existe en la base de datos.
-        """
-        product_id = data.get('product_id')
-        if not Product.objects.filter(id=product_id).exists():
-            raise serializers.ValidationError(f"El producto con ID {product_id} no existe.")
-        return data
+
+class BatchOrderSerializer(serializers.Serializer):
+    """
+    Serializador para realizar un pedido de varios productos a la vez.
+
+    Con `all_or_nothing`, valida la existencia de todos los productos con una
+    única consulta `IN` y reporta los errores alineados con cada línea. Sin
+    él, los productos inexistentes no rechazan el lote: `decrement_stock_batch`
+    los reporta como `not_found` en el resultado de su línea.
+    """
+    lines = OrderSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_ORDER_LINES)
+    all_or_nothing = serializers.BooleanField(default=False)
+
+    class Meta:
+        fields = ['lines', 'all_or_nothing']
+
+    def validate(self, attrs):
+        if not attrs['all_or_nothing']:
+            return attrs
+
+        lines = attrs['lines']
+        product_ids = {line['product_id'] for line in lines}
+        existing = set(Product.objects.filter(id__in=product_ids).values_list('id', flat=True))
+
+        errors = [
+            {} if line['product_id'] in existing
+            else {'product_id': [f"El producto con ID {line['product_id']} no existe."]}
+            for line in lines
+        ]
+        if any(errors):
+            raise serializers.ValidationError({'lines': errors})
+        return attrs
@@ -1,15 +1,89 @@
-import logging
-from django.db.models.signals import post_save
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
-from .models import Product
+from .alerts import alert_dispatcher
+from .cache import product_cache
+from .changefeed import ensure_change_triggers
+from .events import publish_stock_change
+from .metrics import install_query_counter
+from .models import Product, StockMovement
+from .profiling import install_query_hook
+from .routers import install_write_tracker
+from .search import ensure_name_index
 
-# Configurar el logger
-logger = logging.getLogger(__name__)
+@receiver(post_save, sender=Product)
+def check_product_stock(sender, instance, using, **kwargs):
+    """
+    Revisa si el stock de un producto es menor a su umbral después de guardarse.
+
+    La alerta se encola al confirmarse la transacción; el envío ocurre fuera
+    del camino de la petición.
+    """
+    if instance.is_low_stock:
+        alert_dispatcher.enqueue(instance, using=using)
 
 @receiver(post_save, sender=Product)
-def check_product_stock(sender, instance, **kwargs):
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, using, **kwargs):
+    """
+    Invalida la representación cacheada del producto al guardarse o
+    eliminarse, y otra vez al confirmarse la transacción.
+    """
+    product_cache.invalidate(instance.pk, using=using)
+
+@receiver(post_save, sender=Product)
+def publish_stock_event(sender, instance, using, update_fields=None, raw=False, **kwargs):
+    """
+    Publica el nuevo stock en el stream de eventos al confirmarse la transacción.
+    """
+    if not raw and (update_fields is None or 'stock' in update_fields):
+        publish_stock_change(instance, using=using)
+
+@receiver(post_save, sender=Product)
+def record_initial_stock(sender, instance, created, using, raw=False, **kwargs):
+    """
+    Registra el stock inicial de un producto nuevo como ajuste en el libro.
+
+    Las escrituras masivas que ya lo registraron en lote (la importación)
+    marcan la instancia con `_initial_stock_recorded`.
+    """
+    if created and not raw and not getattr(instance, '_initial_stock_recorded', False):
+        StockMovement.objects.using(using).create(
+            product=instance,
+            kind=StockMovement.Kind.ADJUSTMENT,
+            delta=instance.stock,
+            applied=True,
+        )
+
+@receiver(post_migrate)
+def restore_product_triggers(sender, using, **kwargs):
+    """
+    Restaura el índice de búsqueda por nombre y los triggers del feed de
+    cambios si una migración rehízo la tabla de productos.
+    """
+    if sender.name == '_apps.warehouse':
+        ensure_name_index(connections[using])
+        ensure_change_triggers(connections[using])
+
+@receiver(connection_created)
+def install_metrics_hook(sender, connection, **kwargs):
+    """
+    Permite que `MetricsMiddleware` cuente las consultas de cada conexión nueva,
+    también las que se abren en los hilos de `sync_to_async`.
+    """
+    install_query_counter(connection)
+
+@receiver(connection_created)
+def install_profiling_hook(sender, connection, **kwargs):
+    """
+    Permite que `ProfilingMiddleware` capture las consultas de cada conexión nueva.
+    """
+    install_query_hook(connection)
+
+@receiver(connection_created)
+def install_routing_hook(sender, connection, **kwargs):
     """
-    Revisa si el stock de un producto es menor a 10 después de guardarse.
+    Permite que `ReplicaRouter` fije en la primaria a las peticiones que escriben.
     """
-    if instance.stock < 10:
-        logger.warning(f"Alerta: El stock del producto '{instance.name}' es bajo ({instance.stock}).")
+    install_write_tracker(connection)
@@ -1,21 +1,61 @@
 from django.urls import path
 from .views import (
     ProductListCreateView,
+    ProductImportView,
+    ProductExportView,
+    ProductCacheStatsView,
+    ProductLowStockView,
+    ProductChangesView,
+    ProductSnapshotView,
     ProductRetrieveUpdateDestroyView,
     ProductStockUpdateView,
-    OrderCreateView
+    StockAdjustmentView,
+    OrderCreateView,
+    OrderBatchCreateView,
+    SalesByDayView,
+    TopSellingView
 )
 
 urlpatterns = [
     # Ruta para listar y crear productos
     path('products/', ProductListCreateView.as_view(), name='product-list-create'),
     
+    # Ruta para importar productos desde un archivo CSV o NDJSON
+    path('products/import/', ProductImportView.as_view(), name='product-import'),
+    
+    # Ruta para exportar el catálogo en streaming
+    path('products/export/', ProductExportView.as_view(), name='product-export'),
+    
+    # Ruta para consultar los contadores de la caché de productos
+    path('products/cache-stats/', ProductCacheStatsView.as_view(), name='product-cache-stats'),
+    
+    # Ruta para el reporte de productos con stock bajo
+    path('products/low-stock/', ProductLowStockView.as_view(), name='product-low-stock'),
+    
+    # Ruta para consultar los cambios del catálogo desde una secuencia
+    path('products/changes/', ProductChangesView.as_view(), name='product-changes'),
+    
+    # Ruta para descargar la foto completa del catálogo
+    path('products/snapshot/', ProductSnapshotView.as_view(), name='product-snapshot'),
+    
     # Ruta para recuperar, actualizar y eliminar productos por ID
     path('products/<uuid:pk>/', ProductRetrieveUpdateDestroyView.as_view(), name='product-detail'),
     
     # Ruta para actualizar el stock de un producto por ID
     path('inventories/product/<uuid:pk>/', ProductStockUpdateView.as_view(), name='product-update-stock'),
     
+    # Ruta para ajustar el stock de muchos productos a la vez
+    path('inventories/adjustments/', StockAdjustmentView.as_view(), name='inventory-adjustments'),
+    
     # Ruta para crear órdenes
     path('orders/', OrderCreateView.as_view(), name='create-order'),
+    
+    # Ruta para crear órdenes con varias líneas
+    path('orders/batch/', OrderBatchCreateView.as_view(), name='create-order-batch'),
+    
+    # Ruta para el reporte de ventas por día
+    path('reports/sales/daily/', SalesByDayView.as_view(), name='sales-daily'),
+    
+    # Ruta para el reporte de los productos más vendidos
+    path('reports/sales/top/', TopSellingView.as_view(), name='sales-top'),
 ]
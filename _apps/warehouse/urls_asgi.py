@@ -0,0 +1,21 @@
+from django.urls import path
+from .async_views import order_create, product_detail, product_export, product_list_create, product_stock_stream
+
+# Rutas asíncronas que reemplazan a sus equivalentes síncronas bajo ASGI.
+# Conservan la misma ruta y el mismo nombre que en `urls.py`.
+urlpatterns = [
+    # Ruta para listar y crear productos
+    path('products/', product_list_create, name='product-list-create'),
+    
+    # Ruta para exportar el catálogo en streaming
+    path('products/export/', product_export, name='product-export'),
+    
+    # Ruta para recibir los cambios de stock en vivo (server-sent events)
+    path('products/stream/', product_stock_stream, name='product-stock-stream'),
+    
+    # Ruta para recuperar, actualizar y eliminar productos por ID
+    path('products/<uuid:pk>/', product_detail, name='product-detail'),
+    
+    # Ruta para crear órdenes
+    path('orders/', order_create, name='create-order'),
+]
@@ -1,20 +1,267 @@
-from drf_yasg import openapi
-from drf_yasg.utils import swagger_auto_schema
+import gzip
+
 from rest_framework import generics, status
+from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
-from .models import Product
-from .serializers import ProductSerializer, ProductStockUpdateSerializer, OrderSerializer
+from .cache import product_cache
+from .changefeed import read_changes, snapshot_path
+from .docs import openapi, swagger_auto_schema
+from .exporter import CONTENT_TYPES, EXPORT_FORMATS, gzip_stream, iter_export
+from .fastpath import PRODUCT_COLUMNS, fast_serialization_enabled, map_product_row
+from .filters import PRODUCT_SEARCH_PARAMETERS, ProductSearchFilter
+from .idempotency import IDEMPOTENCY_PARAMETER, idempotent
+from .importer import IMPORT_FORMATS, detect_format, import_products
+from .metrics import registry
+from .models import ChangeFeedState, DailySales, Product
+from .pagination import ProductCursorPagination
+from .routers import is_pinned
+from .serializers import LowStockProductSerializer, ProductSerializer, ProductChangesSerializer, ProductStockUpdateSerializer, SalesReportSerializer, StockAdjustmentSerializer, OrderSerializer, BatchOrderSerializer
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import parse_etags
+from core.http import accepts_encoding
 
 class ProductListCreateView(generics.ListCreateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = ProductCursorPagination
+    filter_backends = [ProductSearchFilter]
+
+    @swagger_auto_schema(
+        operation_description="Listar productos filtrando por prefijo de SKU, nombre, rango de stock o stock bajo",
+        manual_parameters=PRODUCT_SEARCH_PARAMETERS,
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Con `PRODUCT_FAST_SERIALIZATION`, pagina tuplas de `values_list()` y
+        las convierte con el mapeador precompilado en lugar del serializador.
+        """
+        if not fast_serialization_enabled():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*PRODUCT_COLUMNS, named=True)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response([map_product_row(row) for row in page])
 
 class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Devuelve el producto desde la caché de lectura con un ETag fuerte.
+        
+        Si el cliente envía un `If-None-Match` que coincide, responde 304 sin
+        cuerpo. A un cliente fijado en la primaria se le lee de ella y su
+        lectura reemplaza la entrada de la caché.
+        """
+        data, etag = product_cache.get(kwargs['pk'], lambda: self.load_representation(kwargs['pk']), refresh=is_pinned())
+        
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        return Response(data, headers={'ETag': etag})
+
+    def load_representation(self, pk):
+        """
+        Lee el producto y lo serializa; con `PRODUCT_FAST_SERIALIZATION`, a
+        partir de una sola tupla de `values_list()`.
+        """
+        if not fast_serialization_enabled():
+            return self.get_serializer(self.get_object()).data
+        row = self.get_queryset().filter(pk=pk).values_list(*PRODUCT_COLUMNS).first()
+        if row is None:
+            raise Http404(f"No {Product._meta.object_name} matches the given query.")
+        return map_product_row(row)
+
+
+class ProductLowStockView(generics.ListAPIView):
+    """
+    Vista del reporte de productos con stock bajo.
+
+    Lista, paginados por cursor, los productos con el stock por debajo de su
+    umbral. El orden por defecto es por SKU, el mismo del índice parcial
+    que los contiene; con `ordering=-deficit` primero los de mayor faltante.
+    """
+    queryset = Product.objects.low_stock()
+    serializer_class = LowStockProductSerializer
+    pagination_class = ProductCursorPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['sku', 'deficit']
+    ordering = 'sku'
+
+    @swagger_auto_schema(
+        operation_description="Listar los productos con stock por debajo de su umbral",
+        manual_parameters=[
+            openapi.Parameter('ordering', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['sku', '-sku', 'deficit', '-deficit'], description='Orden del reporte'),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class ProductCacheStatsView(APIView):
+    """
+    Vista para consultar los contadores de la caché de productos.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Consultar aciertos, fallos y desalojos de la caché de productos",
+        responses={200: "Contadores de la caché"}
+    )
+    def get(self, request):
+        return Response(product_cache.stats(), status=status.HTTP_200_OK)
+
+class ProductImportView(APIView):
+    """
+    Vista para importar productos masivamente desde un archivo CSV o NDJSON.
+    
+    El archivo se procesa por bloques y los SKU existentes se actualizan.
+    """
+    parser_classes = [MultiPartParser]
+
+    @swagger_auto_schema(
+        operation_description="Importar productos desde un archivo CSV o NDJSON",
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description='Archivo a importar'),
+            openapi.Parameter('file_format', openapi.IN_FORM, type=openapi.TYPE_STRING, enum=list(IMPORT_FORMATS), description='Formato del archivo'),
+        ],
+        responses={200: "Importación procesada", 400: "Error en la solicitud"}
+    )
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "Debe adjuntar un archivo en el campo 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        
+        file_format = request.data.get('file_format') or detect_format(upload.name)
+        if file_format not in IMPORT_FORMATS:
+            return Response({"error": f"Formato no soportado: {file_format}"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        report = import_products(upload.file, file_format)
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+
+
+class ProductExportView(APIView):
+    """
+    Vista para exportar el catálogo completo en streaming.
+    
+    Las filas se envían a medida que se leen de la base de datos, opcionalmente
+    comprimidas con gzip.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Exportar el catálogo de productos en NDJSON o CSV",
+        manual_parameters=[
+            openapi.Parameter('file_format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(EXPORT_FORMATS), description='Formato de salida'),
+            openapi.Parameter('gzip', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, description='Comprimir la salida con gzip'),
+        ],
+        responses={200: "Catálogo exportado", 400: "Error en la solicitud"}
+    )
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'ndjson')
+        if file_format not in EXPORT_FORMATS:
+            return Response({"error": f"Formato no soportado: {file_format}"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true')
+        chunks = iter_export(file_format)
+        return export_response(gzip_stream(chunks) if compress else chunks, file_format, compress)
+
+
+def export_response(chunks, file_format, compress):
+    """
+    Respuesta en streaming de la exportación, con `chunks` síncrono o asíncrono.
+    """
+    filename = f"products.{file_format}" + ('.gz' if compress else '')
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[file_format])
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+class ProductChangesView(APIView):
+    """
+    Vista del feed de cambios del catálogo.
+
+    Devuelve, en orden, los productos creados o modificados y los eliminados
+    desde la secuencia `since`. El cliente aplica la página y pide la
+    siguiente con `since=next` hasta que `has_more` sea falso. Si las marcas
+    de borrado posteriores a `since` ya se purgaron, responde 410 y el
+    cliente debe volver a partir de la foto del catálogo.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Listar los cambios del catálogo posteriores a una secuencia",
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Secuencia del último cambio aplicado (0 al empezar)'),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Cambios por página'),
+        ],
+        responses={200: "Página de cambios", 400: "Error en la solicitud", 410: "La secuencia es anterior a la última purga; descargue la foto"}
+    )
+    def get(self, request):
+        serializer = ProductChangesSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        since = serializer.validated_data['since']
+        if since < ChangeFeedState.objects.horizon():
+            return Response(
+                {"error": "Los cambios posteriores a esta secuencia ya no están disponibles; descargue la foto del catálogo.",
+                 "snapshot": reverse('product-snapshot')},
+                status=status.HTTP_410_GONE
+            )
+
+        limit = serializer.validated_data.get('limit') or settings.CHANGE_FEED_PAGE_SIZE
+        return Response(read_changes(since, limit), status=status.HTTP_200_OK)
+
+
+class ProductSnapshotView(APIView):
+    """
+    Vista que sirve la foto completa del catálogo para iniciar una réplica.
+
+    El archivo lo genera `build_product_snapshot` ya comprimido, así que a los
+    clientes que aceptan gzip se les envía tal cual, con un ETag derivado de
+    su fecha de modificación y tamaño.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Descargar la foto completa del catálogo y la secuencia desde la que seguir el feed",
+        responses={200: "Foto del catálogo", 304: "Sin cambios", 404: "Foto no generada"}
+    )
+    def get(self, request):
+        path = snapshot_path()
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return Response(
+                {"error": "La foto del catálogo no se ha generado; ejecute manage.py build_product_snapshot."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        use_gzip = accepts_encoding(request, 'gzip')
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-gzip" if use_gzip else ""}"'
+        headers = {'ETag': etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if use_gzip:
+            response = FileResponse(path.open('rb'), content_type='application/json', headers=headers)
+            response['Content-Encoding'] = 'gzip'
+            return response
+        return FileResponse(gzip.open(path, 'rb'), content_type='application/json', headers=headers)
+
+
 class ProductStockUpdateView(APIView):
     """
     Vista para actualizar el stock de un producto.
@@ -28,8 +275,10 @@ class ProductStockUpdateView(APIView):
                 'stock': openapi.Schema(type=openapi.TYPE_NUMBER, description='Cantidad de stock a añadir'),
             }
         ),
+        manual_parameters=[IDEMPOTENCY_PARAMETER],
         responses={200: "Stock actualizado correctamente", 400: "Error en la solicitud"}
     )
+    @idempotent
     def patch(self, request, pk):
         """
         Manejar el PATCH request para actualizar el stock del producto.
@@ -51,13 +300,53 @@ class ProductStockUpdateView(APIView):
             if stock_to_add <= 0:
                 return Response({"error": "El stock a añadir debe ser un valor positivo."}, status=status.HTTP_400_BAD_REQUEST)
 
-            product.stock += stock_to_add
-            product.save()
-            return Response({"message": "Stock actualizado correctamente", "new_stock": product.stock}, status=status.HTTP_200_OK)
+            # El stock y su movimiento en el libro se escriben en la misma transacción
+            _, [result] = Product.objects.adjust_stock_batch([{'product_id': product.pk, 'delta': stock_to_add}])
+            if result['status'] != 'ok':
+                raise Http404(f"No {Product._meta.object_name} matches the given query.")
+            registry.inc('warehouse_restocks_total')
+            return Response({"message": "Stock actualizado correctamente", "new_stock": result['new_stock']}, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class StockAdjustmentView(APIView):
+    """
+    Vista para ajustar el stock de muchos productos en una sola petición.
+
+    Pensada para registrar una entrega completa: las líneas se aplican con
+    unas pocas sentencias en una sola transacción y se informa el nuevo stock
+    de cada una. Con `all_or_nothing` el lote se rechaza si algún producto no
+    existe; en caso contrario esas líneas se omiten.
+    """
+    @swagger_auto_schema(
+        operation_description="Ajustar el stock de varios productos por ID o SKU",
+        request_body=StockAdjustmentSerializer,
+        manual_parameters=[IDEMPOTENCY_PARAMETER],
+        responses={200: "Ajuste procesado", 400: "Error en la solicitud o ajuste rechazado"}
+    )
+    @idempotent
+    def post(self, request):
+        serializer = StockAdjustmentSerializer(data=request.data)
+
+        if serializer.is_valid():
+            applied, results = Product.objects.adjust_stock_batch(
+                serializer.validated_data['lines'],
+                all_or_nothing=serializer.validated_data['all_or_nothing'],
+            )
+
+            if not applied:
+                return Response(
+                    {"error": "El ajuste no se aplicó porque algún producto no existe.", "results": results},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            registry.inc('warehouse_restocks_total', [result['status'] for result in results].count('ok'))
+            return Response({"message": "Ajuste procesado", "results": results}, status=status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 class OrderCreateView(APIView):
     """
     Vista para crear una orden de compra.
@@ -67,8 +356,10 @@ class OrderCreateView(APIView):
     @swagger_auto_schema(
         operation_description="Crear una orden de compra",
         request_body=OrderSerializer,
+        manual_parameters=[IDEMPOTENCY_PARAMETER],
         responses={200: "Compra realizada con éxito", 400: "No hay suficiente stock para completar la compra"}
     )
+    @idempotent
     def post(self, request):
         serializer = OrderSerializer(data=request.data)
         
@@ -76,23 +367,136 @@ class OrderCreateView(APIView):
             product_id = serializer.validated_data['product_id']
             quantity = serializer.validated_data['quantity']
             
-            # Obtener el producto a través del ID
-            product = get_object_or_404(Product, id=product_id)
+            # Descontar el stock en una sola sentencia condicional
+            product = Product.objects.decrement_stock(product_id, quantity)
             
-            # Verificar si hay suficiente stock
-            if product.stock < quantity:
+            if product is None:
+                # Sólo en el camino de error se distingue la causa del rechazo
+                if not Product.objects.filter(id=product_id).exists():
+                    return Response(
+                        {api_settings.NON_FIELD_ERRORS_KEY: [f"El producto con ID {product_id} no existe."]},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                registry.inc('warehouse_stock_rejected_total')
                 return Response(
                     {"error": "No hay suficiente stock para completar la compra."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Restar el stock
-            product.stock -= quantity
-            product.save()
-            
+            registry.inc('warehouse_orders_placed_total')
             return Response(
                 {"message": "Compra realizada con éxito", "remaining_stock": product.stock},
                 status=status.HTTP_200_OK
             )
         
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class OrderBatchCreateView(APIView):
+    """
+    Vista para crear una orden de compra con varias líneas.
+    
+    Todas las líneas se aplican en una sola transacción. Con `all_or_nothing`
+    el lote completo se rechaza si alguna línea no puede atenderse; en caso
+    contrario se aplican las líneas posibles y se informa el resultado de cada una.
+    """
+    @swagger_auto_schema(
+        operation_description="Crear una orden de compra por lotes",
+        request_body=BatchOrderSerializer,
+        manual_parameters=[IDEMPOTENCY_PARAMETER],
+        responses={200: "Lote procesado", 400: "Error en la solicitud o lote rechazado"}
+    )
+    @idempotent
+    def post(self, request):
+        serializer = BatchOrderSerializer(data=request.data)
+        
+        if serializer.is_valid():
+            applied, results = Product.objects.decrement_stock_batch(
+                serializer.validated_data['lines'],
+                all_or_nothing=serializer.validated_data['all_or_nothing'],
+            )
+            statuses = [result['status'] for result in results]
+            registry.inc('warehouse_stock_rejected_total', statuses.count('insufficient_stock'))
+            if applied:
+                registry.inc('warehouse_orders_placed_total', statuses.count('ok'))
+            
+            if not applied:
+                return Response(
+                    {"error": "El lote no se aplicó porque alguna línea no pudo completarse.", "results": results},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            return Response({"message": "Lote procesado", "results": results}, status=status.HTTP_200_OK)
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+SALES_REPORT_PARAMETERS = [
+    openapi.Parameter('start', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description='Primer día (por defecto, 29 días antes de end)'),
+    openapi.Parameter('end', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description='Último día (por defecto, hoy)'),
+]
+
+
+class SalesByDayView(APIView):
+    """
+    Vista del reporte de unidades vendidas por día.
+
+    Lee los acumulados diarios (`DailySales`), no las líneas de pedido. Los
+    días sin ventas no aparecen.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Unidades vendidas por día, de todo el catálogo o de un SKU",
+        manual_parameters=SALES_REPORT_PARAMETERS + [
+            openapi.Parameter('sku', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='SKU a reportar'),
+        ],
+        responses={200: "Ventas por día", 400: "Error en la solicitud"}
+    )
+    def get(self, request):
+        serializer = SalesReportSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        start, end, sku = (serializer.validated_data.get(name) for name in ('start', 'end', 'sku'))
+        return Response({
+            "start": start,
+            "end": end,
+            "sku": sku or None,
+            "results": list(DailySales.objects.by_day(start, end, sku)),
+        }, status=status.HTTP_200_OK)
+
+
+class TopSellingView(APIView):
+    """
+    Vista del reporte de los SKU más vendidos en un rango de días.
+
+    Suma los acumulados diarios (`DailySales`), no las líneas de pedido.
+    """
+
+    @swagger_auto_schema(
+        operation_description="SKU con más unidades vendidas en un rango de días",
+        manual_parameters=SALES_REPORT_PARAMETERS + [
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description='Cantidad de SKU (máximo 100)'),
+        ],
+        responses={200: "SKU más vendidos", 400: "Error en la solicitud"}
+    )
+    def get(self, request):
+        serializer = SalesReportSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        start, end, limit = (serializer.validated_data[name] for name in ('start', 'end', 'limit'))
+        return Response({
+            "start": start,
+            "end": end,
+            "results": list(DailySales.objects.top_skus(start, end, limit)),
+        }, status=status.HTTP_200_OK)
+
+class MetricsView(APIView):
+    """
+    Vista que expone las métricas del servicio en formato de texto de Prometheus.
+    """
+    swagger_schema = None
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
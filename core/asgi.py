@@ -9,8 +9,9 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault("DJANGO_CONFIGURATION", "Prod")
+
+from configurations.asgi import get_asgi_application
 
 application = get_asgi_application()
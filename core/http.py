@@ -0,0 +1,29 @@
+"""
+Utilidades HTTP compartidas por las vistas del proyecto.
+"""
+
+
+def accepts_encoding(request, coding):
+    """
+    Indica si el cliente acepta la codificación `coding` según su cabecera
+    `Accept-Encoding`, respetando los valores `q`.
+
+    `gzip;q=0` la rechaza y `*` la acepta si no aparece por su nombre. Sin la
+    cabecera, o con un `q` inválido, la codificación no se considera aceptada.
+    """
+    weights = {}
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        name, *params = [part.strip() for part in item.split(';')]
+        if not name:
+            continue
+        weight = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.lower()] = weight
+    weight = weights.get(coding, weights.get(f'x-{coding}', weights.get('*', 0.0)))
+    return weight > 0
@@ -0,0 +1,147 @@
+"""
+Esquema OpenAPI precalculado.
+
+`manage.py build_api_schema` genera con drf_yasg el esquema (`swagger.json`)
+y las páginas de Swagger UI y ReDoc que lo cargan, y los escribe en
+`API_SCHEMA_DIR` junto con su versión gzip. `SchemaArtifactView` sirve esos
+archivos desde memoria con ETag y, si el cliente lo acepta, ya comprimidos.
+
+Si un artefacto no existe, se genera una sola vez en el primer acceso. Con
+`API_SCHEMA_PREBUILT_ONLY` drf_yasg no se importa y los artefactos deben
+generarse antes del despliegue.
+"""
+import gzip
+import hashlib
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils.http import parse_etags
+from django.views import View
+
+from .http import accepts_encoding
+
+# Artefactos generados y su tipo de contenido
+ARTIFACTS = {
+    'swagger.json': 'application/json',
+    'swagger.html': 'text/html; charset=utf-8',
+    'redoc.html': 'text/html; charset=utf-8',
+}
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+def get_api_info():
+    """
+    Información general de la API. Importa drf_yasg al llamarse.
+    """
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="BBB Warehouse API",  # Título de la documentación de la API
+        default_version='v1',  # Versión de la API
+        description="Django Warehouse API Documentation",  # Descripción de la API
+        terms_of_service="https://www.google.com/policies/terms/",  # Términos de servicio
+        contact=openapi.Contact(email="oblancomorales@gmail.com"),  # Información de contacto
+        license=openapi.License(name="BSD License"),  # Licencia de la API
+    )
+
+
+def get_schema_view():
+    """
+    Vista de drf_yasg que describe la API. Importa drf_yasg al llamarse.
+    """
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    return get_schema_view(
+        get_api_info(),
+        public=True,  # Especifica si la documentación debe ser pública
+        permission_classes=(permissions.AllowAny,),  # Permite el acceso a cualquier usuario
+    )
+
+
+def build_artifacts(output_dir=None):
+    """
+    Genera el esquema y las páginas de documentación en `output_dir`.
+
+    El esquema se genera sin petición, así que no fija `host` ni `schemes` y
+    los clientes usan el servidor desde el que lo descargan. Retorna el
+    tamaño en bytes de cada artefacto.
+    """
+    from drf_yasg.codecs import OpenAPICodecJson
+
+    output_dir = Path(output_dir or settings.API_SCHEMA_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    schema_view = get_schema_view()
+    factory = RequestFactory()
+
+    generator = schema_view.generator_class(get_api_info())
+    contents = {'swagger.json': OpenAPICodecJson(validators=[]).encode(generator.get_schema(request=None, public=True))}
+    with override_settings(ALLOWED_HOSTS=['*']):
+        for name, renderer, url_name in (('swagger.html', 'swagger', 'schema-swagger-ui'), ('redoc.html', 'redoc', 'schema-redoc')):
+            response = schema_view.with_ui(renderer, cache_timeout=0)(factory.get(reverse(url_name)))
+            contents[name] = response.render().content
+
+    for name, content in contents.items():
+        (output_dir / name).write_bytes(content)
+        (output_dir / f'{name}.gz').write_bytes(gzip.compress(content, mtime=0))
+    _loaded.clear()
+    return {name: len(content) for name, content in contents.items()}
+
+
+def load_artifact(name):
+    """
+    Retorna `(contenido, contenido_gzip, etag)` del artefacto `name`.
+
+    Se lee del disco una vez por proceso. Si no existe, se genera (salvo con
+    `API_SCHEMA_PREBUILT_ONLY`, en cuyo caso retorna `None`).
+    """
+    if name in _loaded:
+        return _loaded[name]
+    with _lock:
+        if name not in _loaded:
+            path = Path(settings.API_SCHEMA_DIR) / name
+            if not path.exists():
+                if settings.API_SCHEMA_PREBUILT_ONLY:
+                    return None
+                build_artifacts()
+            content = path.read_bytes()
+            gz_path = path.with_name(f'{name}.gz')
+            compressed = gz_path.read_bytes() if gz_path.exists() else gzip.compress(content, mtime=0)
+            _loaded[name] = (content, compressed, hashlib.sha256(content).hexdigest()[:32])
+    return _loaded[name]
+
+
+class SchemaArtifactView(View):
+    """
+    Sirve un artefacto del esquema con ETag, 304 y compresión gzip precalculada.
+    """
+    artifact = None
+
+    def get(self, request):
+        loaded = load_artifact(self.artifact)
+        if loaded is None:
+            raise Http404("Esquema no generado; ejecute manage.py build_api_schema.")
+        content, compressed, digest = loaded
+
+        use_gzip = accepts_encoding(request, 'gzip')
+        etag = f'"{digest}-gzip"' if use_gzip else f'"{digest}"'
+        headers = {
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': f'public, max-age={settings.API_SCHEMA_MAX_AGE}',
+        }
+
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return HttpResponseNotModified(headers=headers)
+
+        if use_gzip:
+            headers['Content-Encoding'] = 'gzip'
+        return HttpResponse(compressed if use_gzip else content, content_type=ARTIFACTS[self.artifact], headers=headers)
@@ -5,6 +5,26 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def replica_databases(primary):
+    """
+    Alias de las réplicas de lectura declaradas en `DB_REPLICAS`.
+
+    `DB_REPLICAS` es una lista separada por comas de `host[:puerto][=peso]`.
+    Cada réplica usa la configuración de `primary` con su propio host y, en
+    las pruebas, apunta a la base de datos de la primaria. Retorna
+    `(databases, pesos)`, con los alias `replica_1`, `replica_2`...
+    """
+    databases, weights = {}, {}
+    for number, entry in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+        address, _, weight = entry.strip().partition('=')
+        host, _, port = address.partition(':')
+        alias = f'replica_{number}'
+        databases[alias] = {**primary, 'HOST': host, 'PORT': port or primary['PORT'], 'TEST': {'MIRROR': 'default'}}
+        weights[alias] = float(weight or 1)
+    return databases, weights
+
+
 # Global Settings
 class Common(Configuration):
     """
@@ -16,6 +36,15 @@ class Common(Configuration):
     SECRET_KEY = os.getenv('SECRET_KEY', '')
     ALLOWED_HOSTS = []
 
+    # Esquema OpenAPI precalculado (manage.py build_api_schema). Con
+    # API_SCHEMA_PREBUILT_ONLY no se importa drf_yasg y sólo se sirven los
+    # artefactos ya generados
+    API_SCHEMA_DIR = os.getenv('API_SCHEMA_DIR', str(BASE_DIR / 'schema'))
+    API_SCHEMA_PREBUILT_ONLY = os.getenv('API_SCHEMA_PREBUILT_ONLY', '') == '1'
+    API_SCHEMA_MAX_AGE = int(os.getenv('API_SCHEMA_MAX_AGE', 300))
+    SWAGGER_SETTINGS = {'SPEC_URL': 'schema-json'}  # Swagger UI carga el esquema precalculado
+    REDOC_SETTINGS = {'SPEC_URL': 'schema-json'}
+
     # SECURITY WARNING: keep the secret key used in production secret!
     INSTALLED_APPS = [
         'django.contrib.admin',
@@ -26,11 +55,16 @@ class Common(Configuration):
         'django.contrib.staticfiles',
         'corsheaders', # Django Cors Headers
         'rest_framework',  # Django REST Framework para construir APIs
-        'drf_yasg',  # Herramienta para generar documentación de API con Swagger
+        *([] if API_SCHEMA_PREBUILT_ONLY else ['drf_yasg']),  # Herramienta para generar documentación de API con Swagger
         '_apps.warehouse'
     ]
     
     MIDDLEWARE = [
+        '_apps.warehouse.middleware.ProfilingMiddleware',  # Perfilado de peticiones por muestreo o bajo pedido
+        '_apps.warehouse.middleware.MetricsMiddleware',  # Métricas por ruta (latencia, estados, consultas)
+        '_apps.warehouse.middleware.AsgiUrlconfMiddleware',  # Vistas asíncronas para las peticiones ASGI
+        '_apps.warehouse.middleware.AdmissionControlMiddleware',  # Límites por cliente y de concurrencia por ruta
+        '_apps.warehouse.middleware.ReplicaRoutingMiddleware',  # Lecturas en réplicas y lectura de las propias escrituras
         'corsheaders.middleware.CorsMiddleware',
         'django.middleware.security.SecurityMiddleware',
         'django.contrib.sessions.middleware.SessionMiddleware',
@@ -42,6 +76,7 @@ class Common(Configuration):
     ]
 
     ROOT_URLCONF = 'core.urls'
+    ASGI_URLCONF = 'core.urls_asgi'
 
     TEMPLATES = [
         {
@@ -60,6 +95,7 @@ class Common(Configuration):
     ]
 
     WSGI_APPLICATION = 'core.wsgi.application'
+    ASGI_APPLICATION = 'core.asgi.application'
 
     # Configuración de Loggin para registrar errores
     LOGGING = {
@@ -102,18 +138,171 @@ class Common(Configuration):
     # Configuración de la Base de Datos usando PostgreSQL
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.postgresql_psycopg2',
+            'ENGINE': 'django.db.backends.postgresql',
             'NAME': os.getenv('POSTGRES_DB', ''),
             'USER': os.getenv('POSTGRES_USER', ''),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
             'HOST': os.getenv('POSTGRES_HOST', ''),
             'PORT': os.getenv('POSTGRES_PORT', ''),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),  # Segundos que se reutiliza una conexión (0 = una por petición)
+            'CONN_HEALTH_CHECKS': True,  # Verifica la conexión antes de reutilizarla
             'OPTIONS': {
                 'options': '-c search_path=public'  # Define el esquema por defecto
             },
         }        
     }
 
+    # Réplicas de lectura (DB_REPLICAS): las lecturas de los modelos de
+    # REPLICA_READ_MODELS se reparten entre ellas según su peso. Un cliente que
+    # escribió lee de la primaria durante REPLICA_PIN_SECONDS; una réplica se
+    # verifica cada REPLICA_HEALTH_INTERVAL segundos y se descarta si no
+    # responde o su retraso supera REPLICA_MAX_LAG segundos
+    DATABASES.update(replica_databases(DATABASES['default'])[0])
+    DATABASE_REPLICAS = replica_databases(DATABASES['default'])[1]
+    DATABASE_ROUTERS = ['_apps.warehouse.routers.ReplicaRouter']
+    REPLICA_READ_MODELS = ['warehouse.product']
+    REPLICA_PIN_SECONDS = float(os.getenv('REPLICA_PIN_SECONDS', 5))
+    REPLICA_HEALTH_INTERVAL = float(os.getenv('REPLICA_HEALTH_INTERVAL', 5))
+    REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 10))
+    REPLICA_PIN_CACHE_ALIAS = os.getenv('REPLICA_PIN_CACHE_ALIAS', 'default')
+
+    # Caché por defecto: local a cada proceso o, con CACHE_REDIS_URL, un Redis
+    # compartido por todos los workers (`poetry install -E cache`). Sobre una
+    # caché local el control de admisión y la lectura de las propias
+    # escrituras sólo advierten; con REQUIRE_SHARED_CACHE=1 no arrancan
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_REDIS_URL,
+        } if CACHE_REDIS_URL else {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+    REQUIRE_SHARED_CACHE = os.getenv('REQUIRE_SHARED_CACHE', '') == '1'
+
+    # Renderer y parser JSON basados en orjson (con la librería estándar si no está instalado)
+    REST_FRAMEWORK = {
+        'DEFAULT_RENDERER_CLASSES': [
+            '_apps.warehouse.renderers.FastJSONRenderer',
+            'rest_framework.renderers.BrowsableAPIRenderer',
+        ],
+        'DEFAULT_PARSER_CLASSES': [
+            '_apps.warehouse.parsers.FastJSONParser',
+            'rest_framework.parsers.FormParser',
+            'rest_framework.parsers.MultiPartParser',
+        ],
+        # Proxies inversos de confianza delante de la aplicación: con 0 la IP
+        # del cliente es REMOTE_ADDR y se ignora X-Forwarded-For
+        'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
+    }
+
+    # Serialización rápida (values_list + mapeador precompilado) del listado y
+    # el detalle de productos
+    PRODUCT_FAST_SERIALIZATION = os.getenv('PRODUCT_FAST_SERIALIZATION', '') == '1'
+
+    # Paginación por cursor del listado de productos
+    PRODUCT_PAGE_SIZE = int(os.getenv('PRODUCT_PAGE_SIZE', 100))
+    PRODUCT_MAX_PAGE_SIZE = int(os.getenv('PRODUCT_MAX_PAGE_SIZE', 1000))
+
+    # Feed de cambios del catálogo: tamaño de página, días que se guardan las
+    # marcas de borrado y ruta de la foto comprimida que genera build_product_snapshot
+    CHANGE_FEED_PAGE_SIZE = int(os.getenv('CHANGE_FEED_PAGE_SIZE', 500))
+    CHANGE_FEED_MAX_PAGE_SIZE = int(os.getenv('CHANGE_FEED_MAX_PAGE_SIZE', 5000))
+    CHANGE_FEED_TOMBSTONE_DAYS = int(os.getenv('CHANGE_FEED_TOMBSTONE_DAYS', 7))
+    PRODUCT_SNAPSHOT_PATH = os.getenv('PRODUCT_SNAPSHOT_PATH', str(BASE_DIR / 'snapshots' / 'products.json.gz'))
+
+    # Pedidos y reportes de ventas: meses de particiones que se crean por
+    # adelantado, segundos entre las revisiones de serve (0 = sólo al iniciar),
+    # meses de pedidos que order_partitions conserva (0 = todos) y rango
+    # máximo en días de un reporte de ventas
+    ORDER_PARTITION_MONTHS_AHEAD = int(os.getenv('ORDER_PARTITION_MONTHS_AHEAD', 3))
+    ORDER_PARTITION_INTERVAL = int(os.getenv('ORDER_PARTITION_INTERVAL', 21600))
+    ORDER_RETENTION_MONTHS = int(os.getenv('ORDER_RETENTION_MONTHS', 0))
+    SALES_REPORT_MAX_DAYS = int(os.getenv('SALES_REPORT_MAX_DAYS', 366))
+
+    # Caché de lectura de productos: nivel local por proceso y, opcionalmente,
+    # un nivel compartido usando un alias de CACHES
+    PRODUCT_CACHE_TTL = int(os.getenv('PRODUCT_CACHE_TTL', 30))
+    PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv('PRODUCT_CACHE_MAX_ENTRIES', 10000))
+    PRODUCT_CACHE_ALIAS = os.getenv('PRODUCT_CACHE_ALIAS') or None
+
+    # Alertas de stock bajo: se encolan y un hilo en segundo plano las envía
+    # por lotes a los destinos configurados, sin repetir un SKU dentro de la ventana
+    LOW_STOCK_ALERT_SINKS = [
+        '_apps.warehouse.alerts.LogSink',
+    ]
+    LOW_STOCK_ALERT_WEBHOOK_URL = os.getenv('LOW_STOCK_ALERT_WEBHOOK_URL', '')
+    LOW_STOCK_ALERT_DEDUP_SECONDS = int(os.getenv('LOW_STOCK_ALERT_DEDUP_SECONDS', 300))
+    LOW_STOCK_ALERT_FLUSH_INTERVAL = float(os.getenv('LOW_STOCK_ALERT_FLUSH_INTERVAL', 5))
+    LOW_STOCK_ALERT_BATCH_SIZE = 500
+    LOW_STOCK_ALERT_QUEUE_SIZE = 10000
+    LOW_STOCK_ALERT_WORKER = True
+
+    # Métricas Prometheus: con varios procesos, cada uno vuelca su estado en
+    # este directorio y /metrics suma los de todos
+    METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR') or None
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+
+    # Perfilado de peticiones: fracción de peticiones muestreadas (0 = ninguna),
+    # token que permite pedir un perfil con la cabecera X-Profile-Token
+    # (vacío = desactivado) y directorio anillo donde se guardan como máximo
+    # PROFILING_RING_SIZE perfiles
+    PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+    PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+    PROFILING_RING_SIZE = int(os.getenv('PROFILING_RING_SIZE', 200))
+
+    # Stream de stock (SSE, sólo bajo ASGI): backend que reparte los eventos
+    # entre procesos (vacío = LocalBackend, o PostgresNotifyBackend si serve
+    # inicia varios workers uvicorn), segundos
+    # mínimos entre envíos a un cliente, keepalive, reintento sugerido al
+    # cliente, clientes por proceso y productos por suscripción
+    STOCK_EVENT_BACKEND = os.getenv('STOCK_EVENT_BACKEND') or None
+    STOCK_STREAM_INTERVAL = float(os.getenv('STOCK_STREAM_INTERVAL', 1))
+    STOCK_STREAM_HEARTBEAT = float(os.getenv('STOCK_STREAM_HEARTBEAT', 15))
+    STOCK_STREAM_RETRY = float(os.getenv('STOCK_STREAM_RETRY', 3))
+    STOCK_STREAM_MAX_CLIENTS = int(os.getenv('STOCK_STREAM_MAX_CLIENTS', 1000))
+    STOCK_STREAM_MAX_KEYS = 100
+
+    # Control de admisión por nombre de ruta: cubeta de tokens por cliente
+    # (`rate` peticiones/segundo con ráfagas de hasta `burst`) y un máximo de
+    # `concurrency` peticiones en curso entre todos los procesos. El estado vive
+    # en la caché ADMISSION_CACHE_ALIAS, que debe ser compartida (Redis o
+    # Memcached); cada plaza de concurrencia expira tras ADMISSION_SLOT_LEASE
+    # segundos
+    ADMISSION_CONTROL = {
+        'create-order': {
+            'rate': float(os.getenv('ORDER_RATE_LIMIT', 10)),
+            'burst': int(os.getenv('ORDER_RATE_BURST', 20)),
+            'concurrency': int(os.getenv('ORDER_MAX_CONCURRENCY', 32)),
+        },
+        'create-order-batch': {
+            'rate': float(os.getenv('ORDER_BATCH_RATE_LIMIT', 2)),
+            'burst': int(os.getenv('ORDER_BATCH_RATE_BURST', 5)),
+            'concurrency': int(os.getenv('ORDER_BATCH_MAX_CONCURRENCY', 8)),
+        },
+    }
+    ADMISSION_CACHE_ALIAS = os.getenv('ADMISSION_CACHE_ALIAS', 'default')
+    ADMISSION_SLOT_LEASE = int(os.getenv('ADMISSION_SLOT_LEASE', 30))
+
+    # Idempotency-Key: segundos que se guarda cada respuesta y espera máxima
+    # de una repetición mientras la original sigue en curso
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400))
+    IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', 10))
+
+    # Servidor de producción (manage.py serve); sin SERVE_WORKERS el número de
+    # procesos se calcula a partir de las CPUs disponibles. Los workers sólo
+    # aceptan las cabeceras X-Forwarded-* de las IP de SERVE_FORWARDED_ALLOW_IPS
+    # (separadas por comas)
+    SERVE_BIND = os.getenv('SERVE_BIND', f"0.0.0.0:{os.getenv('PORT', '8000')}")
+    SERVE_WORKER_CLASS = os.getenv('SERVE_WORKER_CLASS', 'gthread')
+    SERVE_WORKERS = int(os.getenv('SERVE_WORKERS', 0)) or None
+    SERVE_THREADS = int(os.getenv('SERVE_THREADS', 4))
+    SERVE_MAX_REQUESTS = int(os.getenv('SERVE_MAX_REQUESTS', 2000))
+    SERVE_MAX_REQUESTS_JITTER = int(os.getenv('SERVE_MAX_REQUESTS_JITTER', 200))
+    SERVE_TIMEOUT = int(os.getenv('SERVE_TIMEOUT', 30))
+    SERVE_FORWARDED_ALLOW_IPS = os.getenv('SERVE_FORWARDED_ALLOW_IPS', '127.0.0.1')
+
     # Validación de contraseñas
     AUTH_PASSWORD_VALIDATORS = [
         {
@@ -150,6 +339,22 @@ class Dev(Common):
     CORS_ALLOWED_ORIGINS = ['http://localhost:5173']
     ALLOWED_HOSTS = ['localhost', 'bbb-backend.up.railway.app']
     DEBUG = True  # Habilita el modo de depuración
+    REQUIRE_SHARED_CACHE = False  # runserver usa un solo proceso
+
+# Configuración para la suite de pruebas
+class Test(Dev):
+    """
+    Configuración para ejecutar las pruebas: igual que Dev, pero los logs no
+    se escriben en archivos dentro del repositorio.
+    """
+    LOGGING = {
+        **Common.LOGGING,
+        'handlers': {
+            **Common.LOGGING['handlers'],
+            'file_errors': {'class': 'logging.NullHandler'},
+            'file_warnings': {'class': 'logging.NullHandler'},
+        },
+    }
 
 # Configuración para entornos de producción
 class Prod(Common):
@@ -160,6 +365,26 @@ class Prod(Common):
     ALLOWED_HOSTS = ['bbb-backend.up.railway.app']
     DEBUG = True
 
+    # Conexiones a la base de datos: persistentes por defecto, o un pool de
+    # psycopg 3 con DB_POOL=1 (necesario con workers ASGI, donde las
+    # conexiones persistentes no se reutilizan entre peticiones)
+    DB_POOL = os.getenv('DB_POOL', '') == '1'
+    DATABASES = {
+        'default': {
+            **Common.DATABASES['default'],
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 600)),
+            'OPTIONS': {
+                **Common.DATABASES['default']['OPTIONS'],
+                **({'pool': {
+                    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+                }} if DB_POOL else {}),
+            },
+        }
+    }
+    DATABASES.update(replica_databases(DATABASES['default'])[0])
+
     SECURE_SSL_REDIRECT = True
     SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
     SESSION_COOKIE_SECURE = True
@@ -0,0 +1,8 @@
+from django.urls import path, include
+from .urls import urlpatterns as wsgi_urlpatterns
+
+# Rutas para las peticiones servidas por ASGI: las vistas asíncronas tienen
+# prioridad y todo lo demás se resuelve con las rutas síncronas de siempre.
+urlpatterns = [
+    path('api/', include('_apps.warehouse.urls_asgi')),
+] + wsgi_urlpatterns
@@ -1,7 +1,32 @@
 import pytest
 from django.conf import settings
+from django.core.cache import caches
 from django.test import Client
 
+from _apps.warehouse.alerts import alert_dispatcher
+from _apps.warehouse.cache import product_cache
+
 @pytest.fixture
 def client():
-    return Client()
\ No newline at end of file
+    return Client()
+
+@pytest.fixture(autouse=True)
+def clear_product_cache():
+    product_cache.clear()
+    yield
+    product_cache.clear()
+
+@pytest.fixture(autouse=True)
+def clear_admission_state():
+    # Las cubetas y plazas del control de admisión viven en la caché.
+    caches[settings.ADMISSION_CACHE_ALIAS].clear()
+    yield
+    caches[settings.ADMISSION_CACHE_ALIAS].clear()
+
+@pytest.fixture(autouse=True)
+def reset_alert_dispatcher(settings):
+    # Las alertas se envían sólo cuando la prueba llama a flush().
+    settings.LOW_STOCK_ALERT_WORKER = False
+    alert_dispatcher.reset()
+    yield
+    alert_dispatcher.reset()
@@ -0,0 +1,122 @@
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from rest_framework import status
+
+from _apps.warehouse.alerts import alert_dispatcher
+from _apps.warehouse.models import Product, StockMovement, StockShard
+
+@pytest.fixture
+def products():
+    return [
+        Product.objects.create(sku='AAAA000001', name='Product A', stock=10),
+        Product.objects.create(sku='BBBB000001', name='Product B', stock=2, low_stock_threshold=10),
+    ]
+
+@pytest.mark.django_db
+def test_adjustment_applies_lines_by_id_and_sku(client, products, django_capture_on_commit_callbacks):
+    first, second = products
+    alert_dispatcher.reset()
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(reverse('inventory-adjustments'), {
+            'lines': [
+                {'product_id': str(first.id), 'delta': '5'},
+                {'sku': 'BBBB000001', 'delta': '3'},
+                {'sku': 'AAAA000001', 'delta': '1.5'},
+            ],
+        }, content_type='application/json')
+
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()['results']
+    assert [result['status'] for result in results] == ['ok', 'ok', 'ok']
+    assert [Decimal(str(result['new_stock'])) for result in results] == [Decimal('15'), Decimal('5'), Decimal('16.5')]
+    assert results[1]['product_id'] == str(second.id)
+
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert (first.stock, second.stock) == (Decimal('16.5'), Decimal('5'))
+    assert StockMovement.objects.filter(kind=StockMovement.Kind.RESTOCK, applied=True).count() == 3
+    # El producto B sigue por debajo de su umbral después de la reposición.
+    assert alert_dispatcher.flush() == 1
+
+@pytest.mark.django_db
+def test_adjustment_uses_a_fixed_number_of_statements(django_assert_max_num_queries):
+    products = Product.objects.bulk_create(
+        Product(sku=f'SKU{index:07d}', name=f'Product {index}', stock=10) for index in range(200)
+    )
+    lines = [{'product_id': product.id, 'delta': Decimal(1)} for product in products]
+
+    with django_assert_max_num_queries(12):
+        applied, results = Product.objects.adjust_stock_batch(lines, batch_size=500)
+
+    assert applied
+    assert {result['new_stock'] for result in results} == {Decimal(11)}
+
+@pytest.mark.django_db
+def test_adjustment_reports_missing_products(client, products):
+    url = reverse('inventory-adjustments')
+    lines = [{'sku': 'AAAA000001', 'delta': '5'}, {'sku': 'ZZZZ000001', 'delta': '5'}]
+
+    response = client.post(url, {'lines': lines, 'all_or_nothing': True}, content_type='application/json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [result['status'] for result in response.json()['results']] == ['not_applied', 'not_found']
+    products[0].refresh_from_db()
+    assert products[0].stock == 10
+
+    response = client.post(url, {'lines': lines}, content_type='application/json')
+    assert response.status_code == status.HTTP_200_OK
+    assert [result['status'] for result in response.json()['results']] == ['ok', 'not_found']
+    products[0].refresh_from_db()
+    assert products[0].stock == 15
+
+@pytest.mark.django_db
+def test_adjustment_validates_lines_with_the_stock_rules(client, products):
+    response = client.post(reverse('inventory-adjustments'), {
+        'lines': [
+            {'sku': 'AAAA000001', 'delta': '0'},
+            {'sku': 'AAAA000001', 'delta': '20000'},
+            {'sku': 'AAAA000001', 'product_id': str(products[0].id), 'delta': '1'},
+        ],
+    }, content_type='application/json')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    errors = response.json()['lines']
+    assert errors[0]['delta'] == ["El stock debe ser un valor positivo."]
+    assert errors[1]['delta'] == ["El stock no puede exceder los 10,000."]
+    assert errors[2]['non_field_errors'] == ["Debe indicar product_id o sku, pero no ambos."]
+
+@pytest.mark.django_db
+def test_adjustment_of_sharded_products_goes_to_a_shard():
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=10)
+    product.set_stock_shards(2)
+
+    applied, results = Product.objects.adjust_stock_batch([{'product_id': product.id, 'delta': Decimal(4)}])
+
+    assert applied
+    assert results[0]['new_stock'] == Decimal(14)
+    assert StockShard.objects.total(product) == Decimal(14)
+
+@pytest.mark.django_db
+def test_adjust_stock_command(tmp_path, products):
+    path = tmp_path / 'entrega.csv'
+    path.write_text('sku,delta\nAAAA000001,5\nBBBB000001,2.5\nZZZZ000001,1\n')
+    out, err = StringIO(), StringIO()
+
+    call_command('adjust_stock', str(path), stdout=out, stderr=err)
+
+    assert 'Líneas procesadas: 3, aplicadas: 2, productos inexistentes: 1' in out.getvalue()
+    assert 'Línea 4: El producto ZZZZ000001 no existe.' in err.getvalue()
+    assert list(Product.objects.order_by('sku').values_list('stock', flat=True)) == [Decimal(15), Decimal('4.5')]
+
+@pytest.mark.django_db
+def test_adjust_stock_command_rejects_invalid_files(tmp_path, products):
+    path = tmp_path / 'entrega.csv'
+    path.write_text('sku,delta\nAAAA000001,5\nBBBB000001,-1\n')
+
+    with pytest.raises(CommandError):
+        call_command('adjust_stock', str(path), stdout=StringIO(), stderr=StringIO())
+
+    assert list(Product.objects.order_by('sku').values_list('stock', flat=True)) == [Decimal(10), Decimal(2)]
@@ -0,0 +1,116 @@
+import pytest
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+from rest_framework import status
+
+from _apps.warehouse.admission import KEY_PREFIX, ConcurrencyLimiter, TokenBucket
+from _apps.warehouse.metrics import registry
+from _apps.warehouse.models import Product
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+def post_order(client, product, **kwargs):
+    return client.post(
+        reverse('create-order'),
+        {'product_id': str(product.id), 'quantity': 1},
+        content_type='application/json',
+        **kwargs,
+    )
+
+@pytest.mark.django_db
+def test_order_burst_is_rejected_with_retry_after(client, settings):
+    settings.ADMISSION_CONTROL = {'create-order': {'rate': 1, 'burst': 2}}
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+
+    responses = [post_order(client, product) for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [200, 200, status.HTTP_429_TOO_MANY_REQUESTS]
+    assert int(responses[2]['Retry-After']) >= 1
+    assert 'error' in responses[2].json()
+    product.refresh_from_db()
+    assert product.stock == 18
+    assert 'http_requests_shed_total{route="create-order",reason="rate_limited"} 1' in registry.render()
+
+@pytest.mark.django_db
+def test_each_api_key_has_its_own_bucket(client, settings):
+    settings.ADMISSION_CONTROL = {'create-order': {'rate': 1, 'burst': 1}}
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+
+    assert post_order(client, product, headers={'X-Api-Key': 'alpha'}).status_code == 200
+    assert post_order(client, product, headers={'X-Api-Key': 'alpha'}).status_code == 429
+    assert post_order(client, product, headers={'X-Api-Key': 'beta'}).status_code == 200
+    # Otras rutas no tienen regla y no se limitan.
+    assert client.get(reverse('product-detail', args=[product.id])).status_code == 200
+
+@pytest.mark.django_db
+def test_forwarded_for_is_ignored_without_trusted_proxies(client, settings):
+    settings.ADMISSION_CONTROL = {'create-order': {'rate': 1, 'burst': 2}}
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+
+    statuses = [
+        post_order(client, product, headers={'X-Forwarded-For': f'10.0.0.{index}'}).status_code
+        for index in range(5)
+    ]
+
+    assert statuses == [200, 200, 429, 429, 429]
+
+@pytest.mark.django_db
+def test_forwarded_for_is_used_behind_trusted_proxies(client, settings):
+    settings.ADMISSION_CONTROL = {'create-order': {'rate': 1, 'burst': 1}}
+    settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+
+    # Con un proxy de confianza cuenta la última IP que éste agregó, no lo que envía el cliente.
+    assert post_order(client, product, headers={'X-Forwarded-For': 'spoofed, 10.0.0.1'}).status_code == 200
+    assert post_order(client, product, headers={'X-Forwarded-For': 'other, 10.0.0.1'}).status_code == 429
+    assert post_order(client, product, headers={'X-Forwarded-For': '10.0.0.2'}).status_code == 200
+
+@pytest.mark.django_db
+def test_limits_warn_on_a_process_local_cache(client, settings, caplog):
+    settings.ADMISSION_CONTROL = {'create-order': {'rate': 1, 'burst': 1}}
+
+    assert client.get(reverse('product-list-create')).status_code == 200
+    assert "ADMISSION_CACHE_ALIAS='default' es local al proceso" in caplog.text
+
+@pytest.mark.django_db
+def test_limits_refuse_a_process_local_cache(client, settings):
+    settings.ADMISSION_CONTROL = {'create-order': {'rate': 1, 'burst': 1}}
+    settings.REQUIRE_SHARED_CACHE = True
+
+    with pytest.raises(ImproperlyConfigured):
+        client.get(reverse('product-list-create'))
+
+@pytest.mark.django_db
+def test_order_is_shed_when_no_slot_is_free(client, settings):
+    settings.ADMISSION_CONTROL = {'create-order': {'concurrency': 1}}
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    limiter = ConcurrencyLimiter(caches['default'], 'create-order', 1, 30)
+    held = limiter.acquire()
+
+    response = post_order(client, product)
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response['Retry-After'] == '1'
+    assert 'http_requests_shed_total{route="create-order",reason="overloaded"} 1' in registry.render()
+
+    limiter.release(held)
+    assert post_order(client, product).status_code == 200
+    # La petición libera su plaza al terminar.
+    assert post_order(client, product).status_code == 200
+    assert limiter.acquire() is not None
+
+def test_token_bucket_refills_over_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('_apps.warehouse.admission.time.time', lambda: now[0])
+    bucket = TokenBucket(caches['default'], rate=2, burst=1)
+    key = KEY_PREFIX + 'test'
+
+    assert bucket.take(key) == 0
+    assert bucket.take(key) == pytest.approx(0.5)
+    now[0] += 0.5
+    assert bucket.take(key) == 0
@@ -0,0 +1,65 @@
+import pytest
+from django.db import transaction
+
+from _apps.warehouse.alerts import DatabaseSink, LowStockAlert, alert_dispatcher
+from _apps.warehouse.models import Product, StockAlert
+
+@pytest.mark.django_db
+def test_low_stock_alert_is_queued_and_flushed(caplog, django_capture_on_commit_callbacks):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+
+    with caplog.at_level('WARNING'):
+        with django_capture_on_commit_callbacks(execute=True):
+            product.stock = 5
+            product.save()
+        alert_dispatcher.flush()
+
+    assert "Alerta: El stock del producto 'Test Product' es bajo (5)." in caplog.text
+
+@pytest.mark.django_db
+def test_low_stock_alert_uses_product_threshold(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.create(sku='1111', name='First Product', stock=5, low_stock_threshold=3)
+        Product.objects.create(sku='2222', name='Second Product', stock=40, low_stock_threshold=50)
+
+    assert alert_dispatcher.flush() == 1
+
+@pytest.mark.django_db
+def test_low_stock_alert_is_dropped_when_the_transaction_rolls_back(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(RuntimeError), transaction.atomic():
+            Product.objects.create(sku='1111', name='First Product', stock=5)
+            raise RuntimeError
+
+    assert alert_dispatcher.flush() == 0
+
+@pytest.mark.django_db
+def test_low_stock_alerts_are_deduplicated_per_sku(settings, django_capture_on_commit_callbacks):
+    settings.LOW_STOCK_ALERT_SINKS = ['_apps.warehouse.alerts.DatabaseSink']
+    alert_dispatcher.reset()
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=5)
+    with django_capture_on_commit_callbacks(execute=True):
+        for stock in (4, 3, 2):
+            product.stock = stock
+            product.save()
+
+    assert alert_dispatcher.flush() == 1
+    with django_capture_on_commit_callbacks(execute=True):
+        product.stock = 1
+        product.save()
+    assert alert_dispatcher.flush() == 0
+
+    alert = StockAlert.objects.get()
+    assert alert.sku == '1234567890'
+    assert alert.stock == 2
+
+@pytest.mark.django_db
+def test_database_sink_keeps_alerts_of_deleted_products():
+    kept = Product.objects.create(sku='1111', name='First Product', stock=5)
+    deleted = Product.objects.create(sku='2222', name='Second Product', stock=5)
+    alerts = [LowStockAlert.from_product(kept), LowStockAlert.from_product(deleted)]
+    deleted.delete()
+
+    DatabaseSink().send(alerts)
+
+    assert dict(StockAlert.objects.values_list('sku', 'product_id')) == {'1111': kept.pk, '2222': None}
@@ -0,0 +1,113 @@
+import gzip
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+
+from _apps.warehouse.models import Product
+
+@pytest.fixture
+def async_client():
+    client = AsyncClient()
+    # Peticiones síncronas contra el manejador ASGI
+    for method in ('get', 'post', 'patch'):
+        setattr(client, f'{method}_sync', async_to_sync(getattr(client, method)))
+    return client
+
+@pytest.mark.django_db
+def test_async_product_list_matches_sync_view(client, async_client):
+    for index in range(3):
+        Product.objects.create(sku=f'SKU{index:04d}', name=f'Product {index}')
+    url = reverse('product-list-create')
+
+    sync_response = client.get(url, {'page_size': 2})
+    async_response = async_client.get_sync(url, {'page_size': 2})
+
+    assert async_response.status_code == status.HTTP_200_OK
+    assert async_response.resolver_match.func.__name__ == 'product_list_create'
+    assert async_response.content == sync_response.content
+
+    next_response = async_client.get_sync(async_response.json()['next'])
+    assert [item['sku'] for item in next_response.json()['results']] == ['SKU0002']
+    assert next_response.content == client.get(sync_response.data['next']).content
+
+@pytest.mark.django_db
+def test_async_product_list_search_matches_sync_view(client, async_client):
+    Product.objects.create(sku='ABC001', name='Tornillo hexagonal')
+    Product.objects.create(sku='XYZ001', name='Clavo de acero')
+    url = reverse('product-list-create')
+
+    response = async_client.get_sync(url, {'q': 'HEXAG'})
+    assert [item['sku'] for item in response.json()['results']] == ['ABC001']
+    assert response.content == client.get(url, {'q': 'HEXAG'}).content
+
+    response = async_client.get_sync(url, {'q': 'ab'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.content == client.get(url, {'q': 'ab'}).content
+
+@pytest.mark.django_db
+def test_async_product_detail_etag_and_fallback(async_client):
+    product = Product.objects.create(sku='1234567890', name='Test Product')
+    url = reverse('product-detail', args=[product.id])
+
+    response = async_client.get_sync(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['name'] == 'Test Product'
+
+    response = async_client.get_sync(url, headers={'If-None-Match': response['ETag']})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = async_client.patch_sync(url, {'name': 'Updated Product'}, content_type='application/json')
+    assert response.status_code == status.HTTP_200_OK
+    assert async_client.get_sync(url).json()['name'] == 'Updated Product'
+
+    response = async_client.get_sync(reverse('product-detail', args=['11111111-1111-1111-1111-111111111111']))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+@pytest.mark.django_db
+def test_async_order_create(async_client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    url = reverse('create-order')
+
+    response = async_client.post_sync(url, {'product_id': str(product.id), 'quantity': 5}, content_type='application/json')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {'message': 'Compra realizada con éxito', 'remaining_stock': 15.0}
+
+    response = async_client.post_sync(url, {'product_id': str(product.id), 'quantity': 50}, content_type='application/json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {'error': 'No hay suficiente stock para completar la compra.'}
+
+    response = async_client.post_sync(url, {'product_id': str(product.id), 'quantity': 0}, content_type='application/json')
+    assert 'quantity' in response.json()
+    product.refresh_from_db()
+    assert product.stock == 15
+
+@pytest.mark.django_db
+def test_async_order_with_idempotency_key_is_applied_once(async_client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    url = reverse('create-order')
+    payload = {'product_id': str(product.id), 'quantity': 5}
+
+    first = async_client.post_sync(url, payload, content_type='application/json', headers={'Idempotency-Key': 'order-1'})
+    retry = async_client.post_sync(url, payload, content_type='application/json', headers={'Idempotency-Key': 'order-1'})
+
+    assert retry.content == first.content
+    assert retry['Idempotent-Replayed'] == 'true'
+    product.refresh_from_db()
+    assert product.stock == 15
+
+@pytest.mark.django_db(transaction=True)
+def test_async_export_streams_the_same_file(client):
+    for index in range(3):
+        Product.objects.create(sku=f'SKU{index:04d}', name=f'Product {index}')
+    url = reverse('product-export')
+    sync_body = gzip.decompress(b''.join(client.get(url, {'gzip': 'true'}).streaming_content))
+
+    async def export():
+        response = await AsyncClient().get(url, {'gzip': 'true'})
+        assert response.is_async
+        assert response.resolver_match.func.__name__ == 'product_export'
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    assert gzip.decompress(async_to_sync(export)()) == sync_body
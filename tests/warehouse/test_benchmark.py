@@ -0,0 +1,29 @@
+import json
+import pytest
+from django.core.management import call_command
+
+from _apps.warehouse.models import Product
+
+@pytest.mark.django_db
+def test_benchmark_api_writes_results(tmp_path, settings):
+    settings.ALLOWED_HOSTS = ['testserver']
+    output = tmp_path / 'bench.json'
+
+    call_command('benchmark_api', '--threads', '1', '--requests', '40', '--products', '2', '--output', str(output))
+
+    results = json.loads(output.read_text())
+    assert results['invariants']['ok']
+    assert results['overall']['requests'] == 40
+    assert set(results['order']['latency_ms']) == {'mean', 'p50', 'p95', 'p99', 'max'}
+    assert not Product.objects.exists()
+
+@pytest.mark.django_db
+def test_benchmark_serialization_writes_results(tmp_path):
+    output = tmp_path / 'bench_serialization.json'
+
+    call_command('benchmark_serialization', '--products', '20', '--page-size', '10', '--repeat', '1', '--output', str(output))
+
+    results = json.loads(output.read_text())
+    assert results['baseline']['end_to_end'] > 0
+    assert results['fast']['serialize_only'] > 0
+    assert not Product.objects.exists()
@@ -0,0 +1,107 @@
+import pytest
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from _apps.warehouse.cache import LRUCache, product_cache
+from _apps.warehouse.models import Product
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.evictions == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(max_entries=2, ttl=0)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+@pytest.mark.django_db
+def test_product_detail_is_cached_with_etag(client, django_assert_num_queries):
+    product = Product.objects.create(sku='1234567890', name='Test Product')
+    url = reverse('product-detail', args=[product.id])
+
+    response = client.get(url)
+    etag = response['ETag']
+    assert response.status_code == status.HTTP_200_OK
+
+    with django_assert_num_queries(0):
+        response = client.get(url)
+        assert response.data['name'] == 'Test Product'
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b''
+
+@pytest.mark.django_db
+def test_product_cache_invalidated_on_save_and_update(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product')
+    url = reverse('product-detail', args=[product.id])
+    etag = client.get(url)['ETag']
+
+    product.name = 'Saved Product'
+    product.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['name'] == 'Saved Product'
+
+    Product.objects.filter(id=product.id).update(name='Updated Product')
+    assert client.get(url).data['name'] == 'Updated Product'
+
+    product.delete()
+    assert client.get(url).status_code == status.HTTP_404_NOT_FOUND
+
+@pytest.mark.django_db
+def test_product_cache_refilled_before_commit_is_invalidated(client, django_assert_num_queries, django_capture_on_commit_callbacks):
+    product = Product.objects.create(sku='1234567890', name='Test Product')
+    url = reverse('product-detail', args=[product.id])
+    client.get(url)
+
+    with django_capture_on_commit_callbacks(execute=True), transaction.atomic():
+        # Lee los IDs a invalidar y actualiza, en la misma transacción
+        with django_assert_num_queries(2):
+            assert Product.objects.filter(name='Test Product').update(name='Updated Product') == 1
+        # Otra petición vuelve a llenar la entrada antes del commit
+        product_cache.local.set(str(product.pk), ({'name': 'Test Product'}, '"old"'))
+
+    assert client.get(url).data['name'] == 'Updated Product'
+
+@pytest.mark.django_db
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    PRODUCT_CACHE_ALIAS='default',
+)
+def test_product_cache_shared_tier(client, django_assert_num_queries):
+    product = Product.objects.create(sku='1234567890', name='Test Product')
+    url = reverse('product-detail', args=[product.id])
+    client.get(url)
+
+    # Un proceso con el nivel local vacío se sirve del nivel compartido.
+    product_cache.clear()
+    with django_assert_num_queries(0):
+        assert client.get(url).data['name'] == 'Test Product'
+
+    Product.objects.filter(id=product.id).update(name='Updated Product')
+    assert client.get(url).data['name'] == 'Updated Product'
+
+@pytest.mark.django_db
+def test_product_cache_stats_view(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product')
+    url = reverse('product-detail', args=[product.id])
+    before = product_cache.stats()
+    client.get(url)
+    client.get(url)
+
+    response = client.get(reverse('product-cache-stats'))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['hits'] == before['hits'] + 1
+    assert response.data['misses'] == before['misses'] + 1
@@ -0,0 +1,168 @@
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from _apps.warehouse.changefeed import SQLITE_TRIGGERS, ensure_change_triggers, stamp_changes
+from _apps.warehouse.models import Product, ProductTombstone
+
+def change_seq(product):
+    stamp_changes()
+    return Product.objects.values_list('change_seq', flat=True).get(pk=product.pk)
+
+def get_changes(client, **params):
+    response = client.get(reverse('product-changes'), params)
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+def read_body(response):
+    body = b''.join(response.streaming_content)
+    response.close()
+    return body
+
+@pytest.mark.django_db
+def test_every_write_path_advances_the_sequence():
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    seen = [change_seq(product)]
+
+    Product.objects.filter(pk=product.pk).update(stock=30)
+    seen.append(change_seq(product))
+    Product.objects.decrement_stock(product.pk, 5)
+    seen.append(change_seq(product))
+    stale = Product.objects.get(pk=product.pk)
+    Product.objects.filter(pk=product.pk).update(name='Renamed Product')
+    seen.append(change_seq(product))
+    stale.description = 'Nueva descripción'
+    stale.save()
+    seen.append(change_seq(product))
+
+    assert seen == sorted(set(seen))
+    # Una escritura que no cambia columnas del feed no avanza la secuencia.
+    Product.objects.filter(pk=product.pk).update(stock=25)
+    assert change_seq(product) == seen[-1]
+
+@pytest.mark.django_db
+def test_saving_a_deleted_product_inserts_it_again():
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    before = change_seq(product)
+    Product.objects.filter(pk=product.pk).delete()
+
+    product.save()
+
+    assert Product.objects.filter(pk=product.pk).exists()
+    assert change_seq(product) > before
+
+@pytest.mark.django_db
+def test_feed_pages_upserts_and_deletes_in_order(client):
+    first = Product.objects.create(sku='AAAA000001', name='First Product', stock=10)
+    second = Product.objects.create(sku='AAAA000002', name='Second Product', stock=10)
+    third = Product.objects.create(sku='AAAA000003', name='Third Product', stock=10)
+    deleted_id = str(first.pk)
+    first.delete()
+    Product.objects.decrement_stock(second.pk, 4)
+
+    page = get_changes(client, since=0, limit=2)
+    columns = page['columns']
+    assert page['has_more'] is True
+    assert [row[columns.index('sku')] for row in page['upserts']] == ['AAAA000003']
+    assert page['deletes'] == [deleted_id]
+    assert page['next'] == ProductTombstone.objects.get().change_seq > change_seq(third)
+
+    page = get_changes(client, since=page['next'], limit=2)
+    assert page['deletes'] == []
+    upsert = dict(zip(columns, page['upserts'][0]))
+    assert upsert['id'] == str(second.pk)
+    assert upsert['stock'] == '6.00'
+    assert page['has_more'] is False
+
+    assert get_changes(client, since=page['next']) == {**page, 'since': page['next'], 'upserts': [], 'deletes': []}
+
+@pytest.mark.django_db
+def test_restocks_and_shard_writes_advance_the_feed(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=10)
+    since = get_changes(client, since=0)['next']
+
+    Product.objects.adjust_stock_batch([{'product_id': product.pk, 'delta': 5}])
+    page = get_changes(client, since=since)
+    columns = page['columns']
+    assert [row[columns.index('stock')] for row in page['upserts']] == ['15.00']
+
+    product.set_stock_shards(3)
+    since = get_changes(client, since=page['next'])['next']
+    Product.objects.decrement_stock(product.pk, 4)
+    page = get_changes(client, since=since)
+    [row] = page['upserts']
+    assert row[columns.index('id')] == str(product.pk)
+    assert row[columns.index('stock')] == '11.00'
+    assert row[columns.index('change_seq')] == page['next'] > since
+
+@pytest.mark.django_db
+def test_snapshot_bootstraps_a_replica(client, settings, tmp_path):
+    settings.PRODUCT_SNAPSHOT_PATH = str(tmp_path / 'products.json.gz')
+    assert client.get(reverse('product-snapshot')).status_code == status.HTTP_404_NOT_FOUND
+    kept = Product.objects.create(sku='1234567890', name='Test Product', stock=10)
+    call_command('build_product_snapshot')
+
+    compressed = client.get(reverse('product-snapshot'), headers={'Accept-Encoding': 'gzip'})
+    assert compressed['Content-Encoding'] == 'gzip'
+    snapshot = json.loads(gzip.decompress(read_body(compressed)))
+    assert [row[1] for row in snapshot['rows']] == ['1234567890']
+    assert snapshot['seq'] == change_seq(kept)
+
+    plain = client.get(reverse('product-snapshot'))
+    assert json.loads(read_body(plain)) == snapshot
+    assert plain['ETag'] != compressed['ETag']
+    refused = client.get(reverse('product-snapshot'), headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    assert not refused.has_header('Content-Encoding')
+    assert refused['ETag'] == plain['ETag']
+    not_modified = client.get(reverse('product-snapshot'), headers={'If-None-Match': plain['ETag']})
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+
+    added = Product.objects.create(sku='0987654321', name='Later Product', stock=10)
+    page = get_changes(client, since=snapshot['seq'])
+    assert [row[0] for row in page['upserts']] == [str(added.pk)]
+
+@pytest.mark.django_db
+def test_purged_tombstones_send_clients_back_to_the_snapshot(client, settings, tmp_path):
+    settings.PRODUCT_SNAPSHOT_PATH = str(tmp_path / 'products.json.gz')
+    Product.objects.create(sku='1234567890', name='Test Product', stock=10).delete()
+    ProductTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=30))
+    tombstone_seq = ProductTombstone.objects.get().change_seq
+
+    call_command('build_product_snapshot')
+
+    assert not ProductTombstone.objects.exists()
+    response = client.get(reverse('product-changes'), {'since': 0})
+    assert response.status_code == status.HTTP_410_GONE
+    assert response.json()['snapshot'] == reverse('product-snapshot')
+    assert get_changes(client, since=tombstone_seq)['next'] == tombstone_seq
+
+@pytest.mark.django_db
+def test_feed_rejects_oversized_pages(client, settings):
+    settings.CHANGE_FEED_MAX_PAGE_SIZE = 10
+
+    response = client.get(reverse('product-changes'), {'limit': 11})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'limit' in response.json()
+
+@pytest.mark.django_db
+def test_triggers_are_restored_after_table_remake():
+    if connection.vendor != 'sqlite':
+        pytest.skip('Los triggers sólo se pierden al rehacer tablas en SQLite')
+    with connection.cursor() as cursor:
+        for name in SQLITE_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER {name}')
+
+    ensure_change_triggers(connection)
+
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=10)
+    before = change_seq(product)
+    Product.objects.filter(pk=product.pk).update(stock=5)
+    assert change_seq(product) > before
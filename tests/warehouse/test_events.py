@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+
+from _apps.warehouse.events import LOCAL_BACKEND, NOTIFY_BACKEND, Subscription, broker, check_backend
+from _apps.warehouse.models import Product
+
+STREAM_URL = '/api/products/stream/'
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+def parse_event(chunk):
+    lines = chunk.decode().strip().split('\n')
+    assert lines[0] == 'event: stock'
+    return json.loads(lines[1].removeprefix('data: '))
+
+@pytest.mark.django_db
+def test_order_and_restock_paths_publish_on_commit(client, loop, django_capture_on_commit_callbacks):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    subscription = Subscription(loop, skus=['1234567890'])
+    assert broker.subscribe(subscription)
+    try:
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse('create-order'), {'product_id': str(product.id), 'quantity': 5}, content_type='application/json')
+            client.post(reverse('create-order'), {'product_id': str(product.id), 'quantity': 3}, content_type='application/json')
+        # Dos cambios seguidos del mismo producto quedan en un solo evento pendiente.
+        assert subscription.drain() == [{'product_id': str(product.id), 'sku': '1234567890', 'stock': '12.00'}]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            client.patch(reverse('product-update-stock', args=[product.id]), {'stock': 8}, content_type='application/json')
+        assert [event['stock'] for event in subscription.drain()] == ['20.00']
+    finally:
+        broker.unsubscribe(subscription)
+
+@pytest.mark.django_db
+def test_events_reach_only_matching_subscriptions(loop):
+    first = Subscription(loop, product_ids=['a'])
+    second = Subscription(loop, skus=['SKU2'])
+    broker.subscribe(first)
+    broker.subscribe(second)
+    try:
+        broker.dispatch([{'product_id': 'a', 'sku': 'SKU1', 'stock': '1'}, {'product_id': 'b', 'sku': 'SKU2', 'stock': '2'}])
+        assert [event['product_id'] for event in first.drain()] == ['a']
+        assert [event['product_id'] for event in second.drain()] == ['b']
+    finally:
+        broker.unsubscribe(first)
+        broker.unsubscribe(second)
+    assert broker.clients == 0
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_sends_current_stock_and_coalesced_changes(settings):
+    settings.STOCK_STREAM_INTERVAL = 0.05
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+
+    def place_orders():
+        for quantity in (1, 2, 3):
+            Product.objects.decrement_stock(product.id, quantity)
+
+    async def scenario():
+        response = await AsyncClient().get(STREAM_URL, {'id': str(product.id)})
+        assert response['Content-Type'] == 'text/event-stream'
+        content = aiter(response.streaming_content)
+        assert await anext(content) == b'retry: 3000\n\n'
+        assert parse_event(await anext(content))['stock'] == '20.00'
+
+        await sync_to_async(place_orders)()
+        assert parse_event(await anext(content))['stock'] == '14.00'
+        await content.aclose()
+
+    async_to_sync(scenario)()
+    assert broker.clients == 0
+
+@pytest.mark.django_db
+def test_stream_validates_subscriptions(settings):
+    client = AsyncClient()
+    get = async_to_sync(client.get)
+
+    assert get(STREAM_URL).status_code == status.HTTP_400_BAD_REQUEST
+    assert get(STREAM_URL, {'id': 'not-a-uuid'}).status_code == status.HTTP_400_BAD_REQUEST
+    settings.STOCK_STREAM_MAX_KEYS = 2
+    assert get(STREAM_URL, {'sku': ['A', 'B', 'C']}).status_code == status.HTTP_400_BAD_REQUEST
+
+    settings.STOCK_STREAM_MAX_CLIENTS = 0
+    response = get(STREAM_URL, {'sku': 'A'})
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response['Retry-After'] == '5'
+
+@pytest.mark.django_db
+def test_stream_is_only_served_over_asgi(client):
+    assert client.get(STREAM_URL, {'sku': 'A'}).status_code == status.HTTP_404_NOT_FOUND
+
+@pytest.mark.django_db
+def test_sharded_stock_events_match_the_stock_column(loop, django_capture_on_commit_callbacks):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    product.set_stock_shards(4)
+    subscription = Subscription(loop, product_ids=[str(product.id)])
+    assert broker.subscribe(subscription)
+    try:
+        with django_capture_on_commit_callbacks(execute=True):
+            Product.objects.decrement_stock(product.id, 8)
+        product.refresh_from_db()
+        assert [event['stock'] for event in subscription.drain()] == [str(product.stock)] == ['12.00']
+    finally:
+        broker.unsubscribe(subscription)
+
+def test_several_workers_need_a_cross_process_backend(settings):
+    settings.STOCK_EVENT_BACKEND = None
+    assert check_backend(1) == LOCAL_BACKEND
+    with pytest.raises(ImproperlyConfigured):
+        check_backend(2)
+    with pytest.raises(CommandError):
+        call_command('serve', '--worker-class', 'uvicorn', '--workers', '2')
+
+    settings.STOCK_EVENT_BACKEND = LOCAL_BACKEND
+    with pytest.raises(ImproperlyConfigured):
+        check_backend(2)
+
+    settings.STOCK_EVENT_BACKEND = NOTIFY_BACKEND
+    assert check_backend(4) == NOTIFY_BACKEND
@@ -0,0 +1,48 @@
+import gzip
+import json
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from _apps.warehouse.exporter import iter_export
+from _apps.warehouse.models import Product
+
+@pytest.mark.django_db
+def test_iter_export_ndjson():
+    product = Product.objects.create(sku='2222', name='Second Product', stock=5)
+    Product.objects.create(sku='1111', name='First Product', description='Primero')
+
+    rows = [json.loads(line) for line in b''.join(iter_export('ndjson')).decode().splitlines()]
+
+    assert [row['sku'] for row in rows] == ['1111', '2222']
+    assert rows[1] == {'id': str(product.id), 'sku': '2222', 'name': 'Second Product', 'description': None, 'stock': '5.00'}
+
+@pytest.mark.django_db
+def test_iter_export_csv():
+    Product.objects.create(sku='1111', name='First Product')
+
+    lines = b''.join(iter_export('csv')).decode().splitlines()
+
+    assert lines[0] == 'id,sku,name,description,stock'
+    assert lines[1].endswith(',1111,First Product,,100.00')
+
+@pytest.mark.django_db
+def test_product_export_view_gzip(client):
+    Product.objects.create(sku='1111', name='First Product')
+
+    response = client.get(reverse('product-export'), {'file_format': 'csv', 'gzip': 'true'})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Encoding'] == 'gzip'
+    body = gzip.decompress(b''.join(response.streaming_content)).decode()
+    assert body.splitlines()[1].endswith(',1111,First Product,,100.00')
+
+@pytest.mark.django_db
+def test_export_products_command(tmp_path):
+    Product.objects.create(sku='1111', name='First Product')
+    path = tmp_path / 'products.ndjson'
+
+    call_command('export_products', '-o', str(path))
+
+    assert json.loads(path.read_text())['sku'] == '1111'
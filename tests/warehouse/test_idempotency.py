@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from _apps.warehouse import views as warehouse_views
+from _apps.warehouse.idempotency import fingerprint, idempotent
+from _apps.warehouse.models import IdempotencyKey, Product
+
+def post_order(client, product, quantity=5, key='order-1'):
+    return client.post(
+        reverse('create-order'),
+        {'product_id': str(product.id), 'quantity': quantity},
+        content_type='application/json',
+        headers={'Idempotency-Key': key},
+    )
+
+@pytest.mark.django_db
+def test_order_retry_is_answered_from_storage(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+
+    first = post_order(client, product)
+    with CaptureQueriesContext(connection) as queries:
+        retry = post_order(client, product)
+
+    assert first.status_code == retry.status_code == status.HTTP_200_OK
+    assert retry.content == first.content
+    assert retry['Idempotent-Replayed'] == 'true'
+    assert not any('warehouse_product' in query['sql'] for query in queries.captured_queries)
+    product.refresh_from_db()
+    assert product.stock == 15
+
+    post_order(client, product, key='order-2')
+    product.refresh_from_db()
+    assert product.stock == 10
+
+@pytest.mark.django_db
+def test_stock_update_retry_is_answered_from_storage(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    url = reverse('product-update-stock', args=[product.id])
+
+    for _ in range(2):
+        response = client.patch(url, {'stock': 10}, content_type='application/json', headers={'Idempotency-Key': 'restock-1'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['new_stock'] == 30.0
+
+@pytest.mark.django_db
+def test_idempotency_key_reused_with_other_body_is_rejected(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+
+    post_order(client, product, quantity=5)
+    response = post_order(client, product, quantity=6)
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    product.refresh_from_db()
+    assert product.stock == 15
+
+@pytest.mark.django_db
+def test_unanswered_key_is_never_taken_over(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    now = timezone.now()
+    IdempotencyKey.objects.create(
+        scope=f"POST {reverse('create-order')}", key='order-1',
+        fingerprint=fingerprint({'product_id': str(product.id), 'quantity': 5}),
+        locked_at=now - timedelta(hours=1), expires_at=now + timedelta(days=1),
+    )
+
+    response = post_order(client, product)
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response['Retry-After'] == '1'
+    product.refresh_from_db()
+    assert product.stock == 20
+
+@pytest.mark.django_db
+def test_expired_key_is_reused(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    now = timezone.now()
+    record = IdempotencyKey.objects.create(
+        scope=f"POST {reverse('create-order')}", key='order-1', fingerprint='old', response_status=200,
+        locked_at=now - timedelta(days=2), expires_at=now - timedelta(days=1),
+    )
+
+    response = post_order(client, product)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert IdempotencyKey.objects.get(pk=record.pk).fingerprint != 'old'
+    product.refresh_from_db()
+    assert product.stock == 15
+
+@pytest.mark.django_db
+def test_failed_request_rolls_back_change_and_key(client, monkeypatch):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    original_inc = warehouse_views.registry.inc
+
+    def fail_after_decrement(name, value=1, **labels):
+        if name == 'warehouse_orders_placed_total':
+            raise RuntimeError('fallo')
+        original_inc(name, value, **labels)
+    monkeypatch.setattr(warehouse_views.registry, 'inc', fail_after_decrement)
+
+    with pytest.raises(RuntimeError):
+        post_order(client, product)
+    assert not IdempotencyKey.objects.exists()
+    product.refresh_from_db()
+    assert product.stock == 20
+
+@pytest.mark.django_db
+def test_server_error_response_rolls_back_change_and_key(client, monkeypatch):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    original_post = warehouse_views.OrderCreateView.post.__wrapped__
+
+    def post_then_fail(view, request):
+        original_post(view, request)
+        return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    monkeypatch.setattr(warehouse_views.OrderCreateView, 'post', idempotent(post_then_fail))
+
+    assert post_order(client, product).status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert not IdempotencyKey.objects.exists()
+    product.refresh_from_db()
+    assert product.stock == 20
+
+@pytest.mark.django_db
+def test_purge_idempotency_keys_deletes_expired_in_batches():
+    now = timezone.now()
+    for index in range(5):
+        IdempotencyKey.objects.create(
+            scope='POST /api/orders/', key=f'key-{index}', fingerprint='', response_status=200,
+            locked_at=now, expires_at=now + timedelta(seconds=-1 if index < 3 else 60),
+        )
+
+    call_command('purge_idempotency_keys', '--batch-size', '2')
+
+    assert sorted(IdempotencyKey.objects.values_list('key', flat=True)) == ['key-3', 'key-4']
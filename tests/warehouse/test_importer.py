@@ -0,0 +1,109 @@
+import io
+import json
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from _apps.warehouse.importer import import_products
+from _apps.warehouse.models import Product, ProductQuerySet, StockMovement
+
+@pytest.mark.django_db
+def test_import_products_csv_upserts_by_sku():
+    Product.objects.create(sku='1111', name='Old Product', stock=5)
+    data = (
+        "sku,name,description,stock\n"
+        "1111,Renamed Product,,40\n"
+        "2222,New Product,Nuevo,\n"
+        "33,Bad,,\n"
+    ).encode()
+
+    report = import_products(io.BytesIO(data), 'csv', chunk_size=2)
+
+    assert report.processed == 3
+    assert report.imported == 2
+    assert report.failed == 1
+    assert report.errors[0]['line'] == 4
+    assert set(report.errors[0]['errors']) == {'sku', 'name'}
+    assert Product.objects.get(sku='1111').name == 'Renamed Product'
+    assert Product.objects.get(sku='1111').stock == 40
+    assert Product.objects.get(sku='2222').stock == 100
+
+@pytest.mark.django_db
+def test_import_products_ndjson_reports_invalid_lines():
+    lines = [
+        json.dumps({'sku': '1111', 'name': 'First Product', 'stock': 7}),
+        'not json',
+        json.dumps({'sku': '1111', 'name': 'Last Product'}),
+    ]
+
+    report = import_products(io.BytesIO('\n'.join(lines).encode()), 'ndjson')
+
+    assert report.imported == 1
+    assert report.errors == [{'line': 2, 'errors': {'non_field_errors': ['JSON inválido.']}}]
+    assert Product.objects.get(sku='1111').name == 'Last Product'
+
+@pytest.mark.django_db
+def test_import_products_command(tmp_path):
+    path = tmp_path / 'products.ndjson'
+    path.write_text(json.dumps({'sku': '1111', 'name': 'First Product'}) + '\n')
+    out = io.StringIO()
+
+    call_command('import_products', str(path), stdout=out)
+
+    assert 'importadas: 1' in out.getvalue()
+    assert Product.objects.filter(sku='1111').exists()
+
+@pytest.mark.django_db
+def test_product_import_view(client):
+    upload = SimpleUploadedFile('products.csv', b"sku,name\n1111,First Product\n", content_type='text/csv')
+
+    response = client.post(reverse('product-import'), {'file': upload})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['imported'] == 1
+    assert Product.objects.filter(sku='1111').exists()
+
+@pytest.mark.django_db
+def test_import_products_records_stock_changes_in_the_ledger():
+    product = Product.objects.create(sku='1111', name='Old Product', stock=5)
+    product.set_stock_shards(2)
+    data = b"sku,name,stock\n1111,Old Product,40\n2222,New Product,7\n"
+
+    assert import_products(io.BytesIO(data), 'csv').imported == 2
+
+    assert product.total_stock == 40
+    assert sorted(
+        StockMovement.objects.filter(kind=StockMovement.Kind.ADJUSTMENT).values_list('product__sku', 'delta')
+    ) == [('1111', 5), ('1111', 35), ('2222', 7)]
+
+@pytest.mark.django_db
+def test_import_products_records_initial_stock_in_one_insert():
+    data = b"sku,name,stock\n1111,First Product,1\n2222,Second Product,2\n3333,Third Product,3\n"
+
+    with CaptureQueriesContext(connection) as queries:
+        assert import_products(io.BytesIO(data), 'csv').imported == 3
+
+    inserts = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('INSERT INTO "warehouse_stockmovement"')]
+    assert len(inserts) == 1
+    assert sorted(StockMovement.objects.values_list('product__sku', 'delta')) == [('1111', 1), ('2222', 2), ('3333', 3)]
+
+@pytest.mark.django_db
+def test_import_products_retries_a_failed_chunk_row_by_row(monkeypatch):
+    original = ProductQuerySet.bulk_create
+
+    def bulk_create(queryset, objs, *args, **kwargs):
+        if any(product.sku == '2222' for product in objs):
+            raise DatabaseError('fila rechazada')
+        return original(queryset, objs, *args, **kwargs)
+    monkeypatch.setattr(ProductQuerySet, 'bulk_create', bulk_create)
+    data = b"sku,name\n1111,First Product\n2222,Second Product\n3333,Third Product\n"
+
+    report = import_products(io.BytesIO(data), 'csv')
+
+    assert (report.imported, report.failed) == (2, 1)
+    assert report.errors == [{'line': 3, 'errors': {'non_field_errors': ['fila rechazada']}}]
+    assert sorted(Product.objects.values_list('sku', flat=True)) == ['1111', '3333']
@@ -0,0 +1,61 @@
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from _apps.warehouse.models import Product, StockMovement, StockSnapshot
+
+@pytest.mark.django_db
+def test_restock_updates_stock_and_ledger_together(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=0)
+    url = reverse('product-update-stock', args=[product.id])
+
+    response = client.patch(url, {'stock': 50}, content_type='application/json')
+    assert response.data['new_stock'] == 50
+
+    product.refresh_from_db()
+    assert product.stock == 50
+    assert not Product.objects.low_stock().filter(pk=product.pk).exists()
+    assert Product.objects.search(stock_min=10).filter(pk=product.pk).exists()
+    assert list(StockMovement.objects.filter(product=product).values_list('kind', 'delta', 'applied')) == [
+        ('adjustment', 0, True), ('restock', 50, True),
+    ]
+
+    assert StockMovement.objects.compact() == 1
+    assert StockSnapshot.objects.get(product=product).stock == 50
+    assert not StockMovement.objects.filter(snapshot__isnull=True).exists()
+
+@pytest.mark.django_db
+def test_order_uses_restocked_stock(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=2)
+    client.patch(reverse('product-update-stock', args=[product.id]), {'stock': 8}, content_type='application/json')
+
+    response = client.post(reverse('create-order'), {'product_id': str(product.id), 'quantity': 7}, content_type='application/json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['remaining_stock'] == 3
+    kinds = list(StockMovement.objects.filter(product=product).order_by('id').values_list('kind', 'delta'))
+    assert kinds == [('adjustment', 2), ('restock', 8), ('order', -7)]
+
+@pytest.mark.django_db
+def test_stock_as_of_uses_snapshot_and_tail(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=10)
+    before_order = timezone.now()
+    client.post(reverse('create-order'), {'product_id': str(product.id), 'quantity': 4}, content_type='application/json')
+    StockMovement.objects.compact()
+    client.patch(reverse('product-update-stock', args=[product.id]), {'stock': 5}, content_type='application/json')
+    after_restock = timezone.now()
+
+    assert product.stock_as_of(before_order - timedelta(seconds=1)) == 0
+    assert product.stock_as_of(before_order) == 10
+    assert product.stock_as_of(after_restock) == 11
+
+@pytest.mark.django_db
+def test_compact_stock_ledger_command(capsys):
+    Product.objects.create(sku='1234567890', name='Test Product')
+
+    call_command('compact_stock_ledger')
+
+    assert 'Productos fotografiados: 1' in capsys.readouterr().out
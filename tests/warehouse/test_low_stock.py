@@ -0,0 +1,96 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.urls import reverse
+from rest_framework import status
+
+from _apps.warehouse.alerts import alert_dispatcher
+from _apps.warehouse.models import Product, StockShard
+
+@pytest.fixture
+def products():
+    return [
+        Product.objects.create(sku='CCCC000001', name='Low Product C', stock=2, low_stock_threshold=10),
+        Product.objects.create(sku='AAAA000001', name='Low Product A', stock=4, low_stock_threshold=5),
+        Product.objects.create(sku='BBBB000001', name='Full Product B', stock=50, low_stock_threshold=10),
+        Product.objects.create(sku='DDDD000001', name='Low Product D', stock=0, low_stock_threshold=30),
+    ]
+
+@pytest.mark.django_db
+def test_low_stock_report_pages_by_sku(client, products):
+    url = reverse('product-low-stock')
+
+    first = client.get(url, {'page_size': 2}).json()
+    second = client.get(first['next']).json()
+
+    assert [row['sku'] for row in first['results'] + second['results']] == ['AAAA000001', 'CCCC000001', 'DDDD000001']
+    assert first['results'][0] == {
+        'id': str(products[1].id),
+        'sku': 'AAAA000001',
+        'name': 'Low Product A',
+        'stock': '4.00',
+        'low_stock_threshold': 5,
+        'deficit': '1.00',
+    }
+    assert second['next'] is None
+
+@pytest.mark.django_db
+def test_low_stock_report_orders_by_deficit(client, products):
+    response = client.get(reverse('product-low-stock'), {'ordering': '-deficit'})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [row['deficit'] for row in response.json()['results']] == ['30.00', '8.00', '1.00']
+
+@pytest.mark.django_db
+def test_stock_at_the_threshold_is_not_low(client, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        product = Product.objects.create(sku='EEEE000001', name='Even Product E', stock=5, low_stock_threshold=5)
+
+    assert alert_dispatcher.flush() == 0
+    assert not product.is_low_stock
+    assert not Product.objects.low_stock().exists()
+    assert not Product.objects.search(low_stock=True).exists()
+    assert client.get(reverse('product-low-stock')).json()['results'] == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.decrement_stock(product.pk, 1)
+
+    assert alert_dispatcher.flush() == 1
+
+    assert list(Product.objects.low_stock().values_list('sku', flat=True)) == ['EEEE000001']
+    assert list(Product.objects.search(low_stock=True).values_list('sku', flat=True)) == ['EEEE000001']
+
+@pytest.mark.django_db
+def test_low_stock_report_reads_the_partial_index():
+    plan = Product.objects.low_stock().order_by('sku').explain()
+
+    assert 'product_low_stock_idx' in plan
+
+@pytest.mark.django_db
+def test_low_stock_report_command(products):
+    out = StringIO()
+
+    call_command('low_stock_report', '--order', 'deficit', '--format', 'csv', stdout=out)
+
+    assert out.getvalue().splitlines() == [
+        'sku,name,stock,low_stock_threshold,deficit',
+        'DDDD000001,Low Product D,0.00,30,30.00',
+        'CCCC000001,Low Product C,2.00,10,8.00',
+        'AAAA000001,Low Product A,4.00,5,1.00',
+    ]
+
+@pytest.mark.django_db
+def test_database_rejects_negative_stock():
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=3)
+    product.set_stock_shards(2)
+
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Product.objects.filter(pk=product.pk).update(stock=F('stock') - 4)
+    with pytest.raises(IntegrityError), transaction.atomic():
+        StockShard.objects.filter(product=product, index=0).update(stock=-1)
+
+    product.refresh_from_db()
+    assert product.stock == 3
@@ -0,0 +1,90 @@
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+
+from _apps.warehouse.metrics import registry
+from _apps.warehouse.models import Product
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+@pytest.mark.django_db
+def test_metrics_endpoint_reports_requests_queries_and_orders(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=5)
+    url = reverse('create-order')
+    client.post(url, {'product_id': str(product.id), 'quantity': 2}, content_type='application/json')
+    client.post(url, {'product_id': str(product.id), 'quantity': 9}, content_type='application/json')
+
+    response = client.get(reverse('metrics'))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    body = response.content.decode()
+    assert 'http_requests_total{route="create-order",method="POST",status="200"} 1' in body
+    assert 'http_requests_total{route="create-order",method="POST",status="400"} 1' in body
+    assert 'http_request_duration_seconds_count{route="create-order",method="POST"} 2' in body
+    assert 'db_queries_per_request_count{route="create-order"} 2' in body
+    assert 'warehouse_orders_placed_total 1' in body
+    assert 'warehouse_stock_rejected_total 1' in body
+    assert 'http_requests_in_flight 1' in body
+
+@pytest.mark.django_db
+def test_metrics_aggregate_across_processes(client, settings, tmp_path):
+    settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+    registry.inc('warehouse_restocks_total', 2)
+    # Proceso ya terminado: sus contadores se suman, sus gauges no.
+    (tmp_path / 'metrics_999999.json').write_text(json.dumps([
+        ['warehouse_restocks_total', [], 3],
+        ['http_requests_in_flight', [], 7],
+    ]))
+
+    body = registry.render()
+
+    assert 'warehouse_restocks_total 5' in body
+    assert 'http_requests_in_flight 0' in body
+    # Su archivo se fundió en el acumulado y se borró
+    assert not (tmp_path / 'metrics_999999.json').exists()
+    assert 'warehouse_restocks_total 5' in registry.render()
+
+@pytest.mark.django_db
+def test_dead_process_files_merge_into_one(settings, tmp_path):
+    settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+    for pid in (999997, 999998, 999999):
+        (tmp_path / f'metrics_{pid}.json').write_text(json.dumps([
+            ['warehouse_restocks_total', [], 1],
+            ['db_queries_per_request', ['product-detail'], [1] + [0] * 9 + [0, 1]],
+        ]))
+
+    registry.render()
+    body = registry.render()
+
+    assert [path.name for path in tmp_path.glob('metrics_*.json')] == ['metrics_merged.json']
+    assert 'warehouse_restocks_total 3' in body
+    assert 'db_queries_per_request_count{route="product-detail"} 3' in body
+
+@pytest.mark.django_db
+def test_async_requests_count_queries_run_in_threads():
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=5)
+
+    async_to_sync(AsyncClient().post)(
+        reverse('create-order'), {'product_id': str(product.id), 'quantity': 2}, content_type='application/json'
+    )
+
+    body = registry.render()
+    [line] = [line for line in body.splitlines() if line.startswith('db_queries_total{route="create-order"}')]
+    assert int(line.split()[-1]) > 0
+
+def test_metrics_flush_writes_process_file(settings, tmp_path):
+    settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+    registry.inc('warehouse_restocks_total')
+
+    registry.flush()
+
+    [path] = tmp_path.glob('metrics_*.json')
+    assert json.loads(path.read_text()) == [['warehouse_restocks_total', [], 1]]
@@ -0,0 +1,87 @@
+import json
+from io import StringIO
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import AsyncClient
+from django.urls import reverse
+
+from _apps.warehouse.models import Product
+from _apps.warehouse.profiling import list_profiles, load_profiles, normalize_sql
+
+@pytest.fixture
+def profiling(settings, tmp_path):
+    settings.PROFILING_DIR = str(tmp_path)
+    settings.PROFILING_SAMPLE_RATE = 0
+    settings.PROFILING_TOKEN = 'secret'
+    return settings
+
+@pytest.mark.django_db
+def test_requests_are_not_profiled_by_default(client, profiling):
+    url = reverse('product-list-create')
+
+    response = client.get(url)
+    client.get(url, headers={'X-Profile-Token': 'wrong'})
+
+    assert 'X-Profile-Id' not in response
+    assert list_profiles() == []
+
+@pytest.mark.django_db
+def test_authorized_header_profiles_the_request(client, profiling):
+    Product.objects.create(sku='1234567890', name='Test Product')
+
+    response = client.get(reverse('product-list-create'), headers={'X-Profile-Token': 'secret'})
+
+    [path] = list_profiles()
+    assert path.name.startswith(response['X-Profile-Id'])
+    profile = json.loads(path.read_text())
+    assert profile['route'] == 'product-list-create'
+    assert profile['status'] == 200
+    assert any('warehouse_product' in query['sql'] for query in profile['queries'])
+    assert any('views.py' in row['function'] for row in profile['functions'])
+
+@pytest.mark.django_db
+def test_sampled_profiles_are_kept_in_a_bounded_ring(client, profiling):
+    profiling.PROFILING_SAMPLE_RATE = 1
+    profiling.PROFILING_RING_SIZE = 3
+    url = reverse('product-list-create')
+
+    responses = [client.get(url) for _ in range(5)]
+
+    assert 'X-Profile-Id' not in responses[-1]
+    assert len(list_profiles()) == 3
+
+@pytest.mark.django_db
+def test_async_requests_capture_queries_only(profiling):
+    client = AsyncClient()
+
+    async_to_sync(client.get)(reverse('product-list-create'), headers={'X-Profile-Token': 'secret'})
+
+    [profile] = load_profiles()
+    assert profile['queries']
+    assert profile['functions'] == []
+
+@pytest.mark.django_db
+def test_profile_report_aggregates_functions_and_queries(client, profiling):
+    products = [Product.objects.create(sku=f'SKU{index:04d}', name=f'Product {index}') for index in range(2)]
+    for product in products:
+        client.get(reverse('product-detail', args=[product.id]), headers={'X-Profile-Token': 'secret'})
+    out = StringIO()
+
+    call_command('profile_report', '--format', 'json', '--route', 'product-detail', '--top', '5', stdout=out)
+
+    report = json.loads(out.getvalue())
+    assert report['profiles'] == 2
+    assert report['routes'][0]['route'] == 'product-detail'
+    assert report['routes'][0]['requests'] == 2
+    assert len(report['functions']) == 5
+    assert any(row['count'] == 2 and 'warehouse_product' in row['sql'] for row in report['queries'])
+
+    out = StringIO()
+    call_command('profile_report', '--clear', stdout=out)
+    assert 'Consultas' in out.getvalue()
+    assert list_profiles() == []
+
+def test_normalize_sql_collapses_parameter_lists():
+    assert normalize_sql('SELECT * FROM t WHERE id IN (%s, %s, %s)') == normalize_sql('SELECT *  FROM t\nWHERE id IN (%s,%s)')
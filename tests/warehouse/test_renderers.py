@@ -0,0 +1,65 @@
+import io
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from _apps.warehouse import renderers
+from _apps.warehouse.cache import product_cache
+from _apps.warehouse.models import Product
+from _apps.warehouse.parsers import FastJSONParser
+from _apps.warehouse.renderers import FastJSONRenderer
+
+SAMPLES = [
+    {'id': uuid.uuid4(), 'stock': Decimal('15.00'), 'name': 'Ñandú \u2028\u2029 "x" \x01', 'tags': ('a', 'b')},
+    {'when': datetime(2026, 1, 2, 3, 4, 5, 600000, tzinfo=timezone.utc), 'ratio': 1 / 3, 'tiny': 1e-05, 'huge': 1e16},
+    {'big': 2 ** 70, 1: 'non-str key', 'none': None, 'flag': True, 'lazy': gettext_lazy('Not found.')},
+    [],
+    None,
+]
+
+@pytest.mark.parametrize('data', SAMPLES)
+def test_fast_renderer_matches_drf_renderer(data):
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+def test_fast_renderer_without_orjson_uses_stdlib(monkeypatch):
+    monkeypatch.setattr(renderers, 'orjson', None)
+    assert FastJSONRenderer().render(SAMPLES[0]) == JSONRenderer().render(SAMPLES[0])
+
+def test_fast_renderer_honours_indent():
+    rendered = FastJSONRenderer().render({'a': 1}, 'application/json; indent=2')
+    assert rendered == JSONRenderer().render({'a': 1}, 'application/json; indent=2')
+
+@pytest.mark.parametrize('body', [b'{"a": [1, 2.5, "\\u00f1"]}', str(2 ** 70).encode(), b'{"a": 1'])
+def test_fast_parser_matches_drf_parser(body):
+    def parse(parser):
+        try:
+            return parser.parse(io.BytesIO(body))
+        except ParseError as exc:
+            return str(exc.detail)
+    assert parse(FastJSONParser()) == parse(JSONParser())
+
+@pytest.mark.django_db
+def test_fast_serialization_is_byte_compatible(client, settings):
+    for index in range(5):
+        Product.objects.create(sku=f'SKU{index:04d}', name=f'Product {index}', description=None if index % 2 else 'Desc')
+    list_url = reverse('product-list-create')
+    detail_url = reverse('product-detail', args=[Product.objects.get(sku='SKU0001').pk])
+
+    def fetch():
+        first = client.get(list_url, {'page_size': 2})
+        return [first.content, client.get(first.data['next']).content, client.get(list_url, {'q': 'product'}).content, client.get(detail_url).content]
+
+    settings.PRODUCT_FAST_SERIALIZATION = False
+    expected = fetch()
+    settings.PRODUCT_FAST_SERIALIZATION = True
+    product_cache.clear()
+
+    assert fetch() == expected
+    assert client.get(reverse('product-detail', args=[uuid.uuid4()])).status_code == 404
@@ -0,0 +1,140 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, router, transaction
+from django.db.utils import load_backend
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory
+from django.urls import reverse
+
+from _apps.warehouse.admission import get_client_ident
+from _apps.warehouse.cache import product_cache
+from _apps.warehouse.models import Product, StockMovement
+from _apps.warehouse.routers import PIN_KEY_PREFIX, begin_request, choose_replica, end_request, get_pin_cache, replica_health
+
+def add_alias(alias, **overrides):
+    # Conexión creada al vuelo que apunta a la misma base de datos de pruebas que la primaria.
+    settings_dict = {**connections.settings['default'], **overrides}
+    connections[alias] = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, alias)
+
+def remove_alias(alias):
+    connections[alias].close()
+    del connections[alias]
+
+@pytest.fixture
+def replica(settings):
+    add_alias('replica')
+    settings.DATABASE_REPLICAS = {'replica': 1}
+    replica_health.reset()
+    yield 'replica'
+    replica_health.reset()
+    remove_alias('replica')
+
+def product_queries(context):
+    return [query['sql'] for query in context.captured_queries if 'warehouse_product' in query['sql']]
+
+@pytest.mark.django_db(transaction=True)
+def test_catalog_reads_go_to_the_replica(client, replica):
+    Product.objects.create(sku='1234567890', name='Test Product', stock=10)
+
+    with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections[replica]) as read:
+        response = client.get(reverse('product-list-create'))
+
+    assert response.status_code == 200
+    assert response.json()['results'][0]['sku'] == '1234567890'
+    assert product_queries(read)
+    assert not product_queries(primary)
+
+@pytest.mark.django_db(transaction=True)
+def test_client_reads_its_own_writes_from_the_primary(client, replica):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=10)
+    url = reverse('product-update-stock', args=[product.id])
+
+    with CaptureQueriesContext(connections[replica]) as read:
+        response = client.patch(url, {'stock': 5}, content_type='application/json', headers={'X-Api-Key': 'alpha'})
+    assert response.status_code == 200
+    assert not read.captured_queries
+
+    with CaptureQueriesContext(connections['default']) as primary:
+        client.get(reverse('product-list-create'), headers={'X-Api-Key': 'alpha'})
+    assert product_queries(primary)
+
+    with CaptureQueriesContext(connections['default']) as primary:
+        client.get(reverse('product-list-create'), headers={'X-Api-Key': 'beta'})
+    assert not product_queries(primary)
+
+@pytest.mark.django_db(transaction=True)
+def test_transactions_and_other_models_stay_on_the_primary(replica):
+    assert router.db_for_read(Product) == replica
+    assert router.db_for_read(StockMovement) == 'default'
+    assert router.db_for_write(Product) == 'default'
+    with transaction.atomic():
+        assert router.db_for_read(Product) == 'default'
+    assert not router.allow_migrate(replica, 'warehouse')
+
+@pytest.mark.django_db(transaction=True)
+def test_unhealthy_replicas_are_skipped(settings, replica, tmp_path):
+    add_alias('broken', NAME=str(tmp_path / 'missing' / 'db.sqlite3'))
+    try:
+        settings.DATABASE_REPLICAS = {'broken': 100, replica: 1}
+        assert {choose_replica() for _ in range(20)} == {replica}
+
+        settings.DATABASE_REPLICAS = {'broken': 1}
+        assert router.db_for_read(Product) == 'default'
+    finally:
+        remove_alias('broken')
+
+@pytest.mark.django_db(transaction=True)
+def test_replicas_are_chosen_by_weight(settings, replica):
+    add_alias('idle')
+    try:
+        settings.DATABASE_REPLICAS = {replica: 1, 'idle': 0}
+        assert {choose_replica() for _ in range(20)} == {replica}
+    finally:
+        remove_alias('idle')
+
+@pytest.mark.django_db(transaction=True)
+def test_pinned_client_bypasses_a_stale_cache_entry(client, replica):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=10)
+    client.patch(reverse('product-update-stock', args=[product.id]), {'stock': 5}, content_type='application/json', headers={'X-Api-Key': 'alpha'})
+    # Entrada llenada por otra petición desde una réplica retrasada
+    product_cache.local.set(str(product.pk), ({'id': str(product.pk), 'name': 'Stale Product'}, '"stale"'))
+    url = reverse('product-detail', args=[product.id])
+
+    with CaptureQueriesContext(connections['default']) as primary:
+        response = client.get(url, headers={'X-Api-Key': 'alpha'})
+    assert response.json()['name'] == 'Test Product'
+    assert product_queries(primary)
+
+    assert client.get(url, headers={'X-Api-Key': 'beta'}).json()['name'] == 'Test Product'
+
+@pytest.mark.django_db
+def test_replicas_refuse_a_process_local_pin_cache(client, settings, replica):
+    settings.REQUIRE_SHARED_CACHE = True
+
+    with pytest.raises(ImproperlyConfigured):
+        client.get(reverse('product-list-create'))
+
+@pytest.mark.django_db(transaction=True)
+def test_only_actual_writes_pin_the_client(client, replica):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=10)
+    request = RequestFactory().get('/', headers={'X-Api-Key': 'alpha'})
+    pin_key = PIN_KEY_PREFIX + get_client_ident(request)
+
+    state, token = begin_request(request)
+    with transaction.atomic():
+        Product.objects.select_for_update().get(pk=product.pk)
+        Product.objects.get_or_create(sku='1234567890', defaults={'name': 'Other Product'})
+    end_request(request, state, token)
+    assert not state.wrote
+    assert get_pin_cache().get(pin_key) is None
+
+    state, token = begin_request(request)
+    Product.objects.filter(pk=product.pk).update(name='Renamed Product')
+    end_request(request, state, token)
+    assert state.wrote
+    assert get_pin_cache().get(pin_key) == 1
+
+@pytest.mark.django_db
+def test_replicas_warn_on_a_process_local_pin_cache(client, replica, caplog):
+    assert client.get(reverse('product-list-create')).status_code == 200
+    assert "REPLICA_PIN_CACHE_ALIAS='default' es local al proceso" in caplog.text
@@ -0,0 +1,138 @@
+from datetime import date, timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from _apps.warehouse.models import DailySales, Order, OrderLine, Product
+from _apps.warehouse import partitions
+from _apps.warehouse.partitions import add_months, maintain_partitions
+
+@pytest.fixture
+def products():
+    return [
+        Product.objects.create(sku='AAAA000001', name='Product A', stock=50),
+        Product.objects.create(sku='BBBB000001', name='Product B', stock=50),
+    ]
+
+@pytest.mark.django_db
+def test_orders_are_persisted_with_their_rollups(client, products):
+    first, second = products
+    client.post(reverse('create-order'), {'product_id': str(first.id), 'quantity': 2}, content_type='application/json')
+    client.post(reverse('create-order-batch'), {'lines': [
+        {'product_id': str(first.id), 'quantity': 3},
+        {'product_id': str(second.id), 'quantity': 1},
+        {'product_id': str(first.id), 'quantity': 1},
+    ]}, content_type='application/json')
+
+    assert Order.objects.count() == 2
+    assert sorted(OrderLine.objects.values_list('sku', 'quantity')) == [
+        ('AAAA000001', 1), ('AAAA000001', 2), ('AAAA000001', 3), ('BBBB000001', 1),
+    ]
+    today = timezone.localdate()
+    assert sorted(DailySales.objects.values_list('day', 'sku', 'units', 'lines')) == [
+        (today, 'AAAA000001', 6, 3),
+        (today, 'BBBB000001', 1, 1),
+    ]
+
+@pytest.mark.django_db
+def test_rejected_orders_are_not_persisted(client, products):
+    client.post(reverse('create-order'), {'product_id': str(products[0].id), 'quantity': 500}, content_type='application/json')
+    client.post(reverse('create-order-batch'), {'all_or_nothing': True, 'lines': [
+        {'product_id': str(products[0].id), 'quantity': 1},
+        {'product_id': str(products[1].id), 'quantity': 500},
+    ]}, content_type='application/json')
+
+    assert not Order.objects.exists()
+    assert not OrderLine.objects.exists()
+    assert not DailySales.objects.exists()
+
+@pytest.fixture
+def rollups():
+    DailySales.objects.bulk_create([
+        DailySales(day=date(2026, 10, 1), sku='AAAA000001', units=5, lines=2),
+        DailySales(day=date(2026, 10, 1), sku='BBBB000001', units=7, lines=1),
+        DailySales(day=date(2026, 10, 2), sku='AAAA000001', units=4, lines=4),
+        DailySales(day=date(2026, 9, 1), sku='CCCC000001', units=100, lines=1),
+    ])
+
+@pytest.mark.django_db
+def test_sales_by_day_reads_the_rollups(client, rollups):
+    url = reverse('sales-daily')
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, {'start': '2026-10-01', 'end': '2026-10-31'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['results'] == [
+        {'day': '2026-10-01', 'units': 12, 'lines': 3},
+        {'day': '2026-10-02', 'units': 4, 'lines': 4},
+    ]
+    assert not any('warehouse_order' in query['sql'] for query in context.captured_queries)
+
+    response = client.get(url, {'start': '2026-10-01', 'end': '2026-10-31', 'sku': 'BBBB000001'})
+    assert response.json()['results'] == [{'day': '2026-10-01', 'units': 7, 'lines': 1}]
+
+@pytest.mark.django_db
+def test_top_selling_skus(client, rollups):
+    response = client.get(reverse('sales-top'), {'start': '2026-10-01', 'end': '2026-10-31', 'limit': 2})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        'start': '2026-10-01',
+        'end': '2026-10-31',
+        'results': [
+            {'sku': 'AAAA000001', 'units': 9, 'lines': 6},
+            {'sku': 'BBBB000001', 'units': 7, 'lines': 1},
+        ],
+    }
+
+@pytest.mark.django_db
+def test_sales_report_validates_the_range(client, settings):
+    settings.SALES_REPORT_MAX_DAYS = 31
+    url = reverse('sales-daily')
+
+    assert client.get(url, {'start': '2026-10-02', 'end': '2026-10-01'}).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get(url, {'start': '2026-01-01', 'end': '2026-10-01'}).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get(url).status_code == status.HTTP_200_OK
+
+@pytest.mark.django_db
+def test_order_partitions_drops_old_months_but_keeps_rollups(products):
+    Order.objects.record([(products[0], 2)])
+    old = timezone.now() - timedelta(days=120)
+    Order.objects.update(created_at=old)
+    OrderLine.objects.update(created_at=old)
+    Order.objects.record([(products[1], 1)])
+    out = StringIO()
+
+    call_command('order_partitions', '--retain-months', '2', stdout=out)
+
+    assert 'filas borradas: 2' in out.getvalue()
+    assert list(OrderLine.objects.values_list('sku', flat=True)) == ['BBBB000001']
+    assert Order.objects.count() == 1
+    assert DailySales.objects.count() == 2
+
+def test_add_months():
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+def test_maintain_partitions_alerts_before_the_horizon_runs_out(monkeypatch, caplog):
+    class PostgreSQLConnection:
+        vendor = 'postgresql'
+
+    def fail(*args, **kwargs):
+        raise DatabaseError('sin permisos')
+    monkeypatch.setattr(partitions, 'ensure_partitions', fail)
+    monkeypatch.setattr(partitions, 'list_partitions', lambda connection: {
+        'warehouse_order_p2026_10': date(2026, 10, 1),
+        'warehouse_orderline_p2026_10': date(2026, 10, 1),
+        'warehouse_order_p2026_11': date(2026, 11, 1),
+    })
+
+    assert maintain_partitions(PostgreSQLConnection(), today=date(2026, 10, 18)) == []
+    assert [record.levelname for record in caplog.records] == ['ERROR', 'CRITICAL']
+    assert '2026-11' in caplog.records[-1].getMessage()
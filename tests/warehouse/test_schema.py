@@ -0,0 +1,73 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from core import schema
+
+@pytest.fixture
+def schema_dir(tmp_path, settings):
+    settings.API_SCHEMA_DIR = str(tmp_path)
+    settings.API_SCHEMA_PREBUILT_ONLY = False
+    schema._loaded.clear()
+    yield tmp_path
+    schema._loaded.clear()
+
+def test_schema_is_built_once_and_served_with_etag(client, schema_dir, monkeypatch):
+    response = client.get(reverse('schema-json'))
+    assert response.status_code == 200
+    assert json.loads(response.content)['info']['title'] == 'BBB Warehouse API'
+    assert (schema_dir / 'swagger.json.gz').exists()
+
+    def fail():
+        raise AssertionError('el esquema no debe regenerarse')
+    monkeypatch.setattr(schema, 'build_artifacts', fail)
+
+    etag = response['ETag']
+    assert client.get(reverse('schema-json'), headers={'If-None-Match': etag}).status_code == 304
+
+    compressed = client.get(reverse('schema-json'), headers={'Accept-Encoding': 'gzip, br'})
+    assert compressed['Content-Encoding'] == 'gzip'
+    assert compressed['ETag'] != etag
+    assert gzip.decompress(compressed.content) == response.content
+
+    for accept in ('gzip;q=0', 'br, gzip; q=0.0', '*;q=0'):
+        refused = client.get(reverse('schema-json'), headers={'Accept-Encoding': accept})
+        assert not refused.has_header('Content-Encoding')
+        assert refused['ETag'] == etag
+    assert client.get(reverse('schema-json'), headers={'Accept-Encoding': 'br, *;q=0.5'})['Content-Encoding'] == 'gzip'
+
+def test_schema_ui_pages_load_prebuilt_schema(client, schema_dir):
+    call_command('build_api_schema', '--output-dir', str(schema_dir))
+
+    response = client.get(reverse('schema-swagger-ui'))
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/html')
+    assert f'"url": "{reverse("schema-json")}"' in response.content.decode()
+    assert client.get(reverse('schema-redoc')).status_code == 200
+
+def test_prebuilt_only_does_not_build_missing_schema(client, schema_dir, settings):
+    settings.API_SCHEMA_PREBUILT_ONLY = True
+
+    assert client.get(reverse('schema-json')).status_code == 404
+    assert not (schema_dir / 'swagger.json').exists()
+
+def test_prebuilt_only_skips_drf_yasg_import(schema_dir):
+    call_command('build_api_schema', '--output-dir', str(schema_dir))
+    script = (
+        "import sys, configurations; configurations.setup()\n"
+        "from django.test import Client\n"
+        "from django.test.utils import override_settings\n"
+        "with override_settings(ALLOWED_HOSTS=['testserver']):\n"
+        "    assert Client().get('/swagger.json').status_code == 200\n"
+        "assert not any(name.startswith('drf_yasg') for name in sys.modules)\n"
+    )
+    env = {**os.environ, 'API_SCHEMA_PREBUILT_ONLY': '1', 'API_SCHEMA_DIR': str(schema_dir), 'PYTHONPATH': os.pathsep.join(sys.path)}
+
+    result = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection
+from rest_framework import status
+from django.urls import reverse
+from _apps.warehouse.models import Product
+
+@pytest.fixture
+def catalog():
+    return [
+        Product.objects.create(sku='ABC001', name='Tornillo hexagonal', stock=5, low_stock_threshold=10),
+        Product.objects.create(sku='ABC002', name='Tuerca HEXAGONAL', stock=50),
+        Product.objects.create(sku='ABD001', name='Arandela plana', stock=500),
+        Product.objects.create(sku='XYZ001', name='Clavo de acero', stock=8, low_stock_threshold=5),
+    ]
+
+def list_skus(client, **params):
+    response = client.get(reverse('product-list-create'), params)
+    assert response.status_code == status.HTTP_200_OK
+    return [item['sku'] for item in response.data['results']]
+
+@pytest.mark.django_db
+def test_product_search_filters(client, catalog):
+    assert list_skus(client, sku='ABC') == ['ABC001', 'ABC002']
+    assert list_skus(client, sku='AB') == ['ABC001', 'ABC002', 'ABD001']
+    assert list_skus(client, q='hexag') == ['ABC001', 'ABC002']
+    assert list_skus(client, stock_min=8, stock_max=50) == ['ABC002', 'XYZ001']
+    assert list_skus(client, low_stock='true') == ['ABC001']
+    assert list_skus(client, sku='ABC', q='tuerca') == ['ABC002']
+
+@pytest.mark.django_db
+def test_product_name_search_follows_updates_and_deletes(client, catalog):
+    Product.objects.filter(sku='ABD001').update(name='Arandela hexagonal')
+    catalog[0].delete()
+
+    assert list_skus(client, q='HEXAG') == ['ABC002', 'ABD001']
+
+@pytest.mark.django_db
+def test_product_name_search_survives_rowid_changes(client, catalog):
+    # VACUUM o rehacer la tabla renumeran el rowid implícito de los productos.
+    with connection.cursor() as cursor:
+        cursor.execute('UPDATE warehouse_product SET rowid = rowid + 1000')
+    Product.objects.filter(sku='ABD001').update(name='Arandela hexagonal')
+
+    assert list_skus(client, q='hexag') == ['ABC001', 'ABC002', 'ABD001']
+
+@pytest.mark.django_db
+def test_product_search_rejects_invalid_parameters(client):
+    url = reverse('product-list-create')
+
+    assert client.get(url, {'q': 'ab'}).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get(url, {'stock_min': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+    response = client.get(url, {'stock_min': 10, 'stock_max': 5})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'non_field_errors' in response.data
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('filters, index', [
+    ({'sku': 'ABC'}, '(sku>? AND sku<?)'),
+    ({'q': 'hexag'}, 'VIRTUAL TABLE INDEX'),
+    ({'stock_min': 10, 'stock_max': 20}, 'product_stock_idx'),
+    ({'low_stock': True}, 'product_low_stock_idx'),
+])
+def test_product_search_uses_indexes(filters, index):
+    plan = Product.objects.search(**filters).explain()
+
+    assert index in plan
+    assert 'SCAN warehouse_product\n' not in plan + '\n'
@@ -0,0 +1,30 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from _apps.warehouse.management.commands.serve import default_workers
+
+
+def test_serve_print_config_uses_cpu_sized_preloaded_workers():
+    output = StringIO()
+
+    call_command('serve', '--print-config', '--max-requests', '500', stdout=output)
+
+    lines = output.getvalue().splitlines()
+    assert f"workers = {default_workers('gthread')}" in lines
+    assert 'worker_class = gthread' in lines
+    assert 'preload_app = True' in lines
+    assert 'max_requests = 500' in lines
+
+
+def test_serve_uvicorn_workers_serve_asgi_without_threads():
+    output = StringIO()
+
+    call_command('serve', '--print-config', '--worker-class', 'uvicorn', '--no-preload', stdout=output, stderr=StringIO())
+
+    lines = output.getvalue().splitlines()
+    assert 'worker_class = uvicorn.workers.UvicornWorker' in lines
+    assert f"workers = {default_workers('uvicorn')}" in lines
+    assert 'threads = 1' in lines
+    assert 'preload_app = False' in lines
+    assert 'forwarded_allow_ips = 127.0.0.1' in lines
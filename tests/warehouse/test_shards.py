@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from _apps.warehouse.models import Product, StockShard
+
+@pytest.mark.django_db
+def test_set_stock_shards_splits_and_restores_stock():
+    product = Product.objects.create(sku='1111', name='Hot Product', stock=101)
+
+    product.set_stock_shards(4)
+    assert sorted(StockShard.objects.filter(product=product).values_list('stock', flat=True)) == [Decimal('25.25')] * 4
+    assert product.total_stock == 101
+
+    product.set_stock_shards(0)
+    product.refresh_from_db()
+    assert product.stock == 101
+    assert product.stock_shards == 0
+    assert not StockShard.objects.filter(product=product).exists()
+
+@pytest.mark.django_db
+def test_order_on_sharded_product_rebalances_when_shards_run_dry(client):
+    product = Product.objects.create(sku='1111', name='Hot Product', stock=20)
+    product.set_stock_shards(4)
+    url = reverse('create-order')
+
+    # Ninguna partición tiene 8 unidades por sí sola: se rebalancea.
+    response = client.post(url, {'product_id': str(product.id), 'quantity': 8}, content_type='application/json')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['remaining_stock'] == 12
+    assert product.total_stock == 12
+
+    response = client.post(url, {'product_id': str(product.id), 'quantity': 13}, content_type='application/json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert product.total_stock == 12
+
+@pytest.mark.django_db
+def test_restock_and_batch_order_on_sharded_product(client):
+    product = Product.objects.create(sku='1111', name='Hot Product', stock=10)
+    product.set_stock_shards(2)
+
+    response = client.patch(reverse('product-update-stock', args=[product.id]), {'stock': 5}, content_type='application/json')
+    assert response.data['new_stock'] == 15
+
+    lines = [{'product_id': str(product.id), 'quantity': 9}, {'product_id': str(product.id), 'quantity': 6}]
+    response = client.post(reverse('create-order-batch'), {'lines': lines}, content_type='application/json')
+    assert [line['status'] for line in response.data['results']] == ['ok', 'ok']
+    assert product.total_stock == 0
+    product.refresh_from_db()
+    assert product.stock == 0
+
+@pytest.mark.django_db
+def test_stock_column_follows_shard_writes(client):
+    product = Product.objects.create(sku='1111', name='Hot Product', stock=20, low_stock_threshold=5)
+    product.set_stock_shards(4)
+
+    client.post(reverse('create-order'), {'product_id': str(product.id), 'quantity': 8}, content_type='application/json')
+    product.refresh_from_db()
+    assert product.stock == product.total_stock == 12
+
+    client.post(reverse('create-order'), {'product_id': str(product.id), 'quantity': 9}, content_type='application/json')
+    assert Product.objects.filter(pk=product.pk, stock=3).exists()
+    assert list(Product.objects.low_stock().values_list('pk', flat=True)) == [product.pk]
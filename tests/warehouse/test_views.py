@@ -1,7 +1,10 @@
 import json
 import pytest
 from rest_framework import status
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from _apps.warehouse.alerts import alert_dispatcher
 from _apps.warehouse.models import Product
 from _apps.warehouse.serializers import ProductSerializer
 
@@ -15,7 +18,25 @@ def test_product_list_create_view(client):
 
     response = client.get(url)
     assert response.status_code == status.HTTP_200_OK
-    assert len(response.data) == 1
+    assert len(response.data['results']) == 1
+
+@pytest.mark.django_db
+def test_product_list_cursor_pagination(client):
+    for index in range(5):
+        Product.objects.create(sku=f'SKU{index:04d}', name=f'Product {index}')
+    url = reverse('product-list-create')
+
+    response = client.get(url, {'page_size': 2})
+    assert response.status_code == status.HTTP_200_OK
+    assert [item['sku'] for item in response.data['results']] == ['SKU0000', 'SKU0001']
+    assert response.data['previous'] is None
+
+    response = client.get(response.data['next'])
+    assert [item['sku'] for item in response.data['results']] == ['SKU0002', 'SKU0003']
+
+    response = client.get(response.data['next'])
+    assert [item['sku'] for item in response.data['results']] == ['SKU0004']
+    assert response.data['next'] is None
 
 @pytest.mark.django_db
 def test_product_retrieve_update_destroy_view(client):
@@ -67,3 +88,124 @@ def test_order_create_view(client):
     # Volver a obtener el producto para verificar el stock actualizado
     product.refresh_from_db()
     assert product.stock == 15
+
+@pytest.mark.django_db
+def test_order_create_view_insufficient_stock(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=3)
+    url = reverse('create-order')
+
+    response = client.post(url, {'product_id': str(product.id), 'quantity': 5}, content_type='application/json')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['error'] == 'No hay suficiente stock para completar la compra.'
+    product.refresh_from_db()
+    assert product.stock == 3
+
+@pytest.mark.django_db
+def test_order_create_view_unknown_product(client):
+    url = reverse('create-order')
+    product_id = '11111111-1111-1111-1111-111111111111'
+
+    response = client.post(url, {'product_id': product_id, 'quantity': 1}, content_type='application/json')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['non_field_errors'] == [f'El producto con ID {product_id} no existe.']
+
+@pytest.mark.django_db
+def test_order_create_view_single_update(client):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=20)
+    url = reverse('create-order')
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(url, {'product_id': str(product.id), 'quantity': 5}, content_type='application/json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['remaining_stock'] == 15
+    # Un UPDATE condicional sobre el producto y las inserciones en el libro de
+    # movimientos, el pedido, su línea y el acumulado diario
+    statements = [query['sql'].split()[0] for query in context.captured_queries if 'SAVEPOINT' not in query['sql']]
+    assert statements == ['UPDATE', 'INSERT', 'INSERT', 'INSERT', 'INSERT']
+
+@pytest.mark.django_db
+def test_order_create_view_triggers_low_stock_signal(client, caplog, django_capture_on_commit_callbacks):
+    product = Product.objects.create(sku='1234567890', name='Test Product', stock=12)
+    url = reverse('create-order')
+
+    with caplog.at_level('WARNING'):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(url, {'product_id': str(product.id), 'quantity': 5}, content_type='application/json')
+        alert_dispatcher.flush()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "El stock del producto 'Test Product' es bajo" in caplog.text
+
+@pytest.mark.django_db
+def test_order_batch_create_view_partial(client):
+    first = Product.objects.create(sku='1111', name='First Product', stock=10)
+    second = Product.objects.create(sku='2222', name='Second Product', stock=1)
+    url = reverse('create-order-batch')
+    lines = [
+        {'product_id': str(first.id), 'quantity': 4},
+        {'product_id': str(second.id), 'quantity': 5},
+        {'product_id': str(first.id), 'quantity': 6},
+    ]
+
+    response = client.post(url, {'lines': lines}, content_type='application/json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [line['status'] for line in response.data['results']] == ['ok', 'insufficient_stock', 'ok']
+    assert response.data['results'][2]['remaining_stock'] == 0
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert first.stock == 0
+    assert second.stock == 1
+
+@pytest.mark.django_db
+def test_order_batch_create_view_all_or_nothing(client):
+    first = Product.objects.create(sku='1111', name='First Product', stock=10)
+    second = Product.objects.create(sku='2222', name='Second Product', stock=1)
+    url = reverse('create-order-batch')
+    lines = [
+        {'product_id': str(first.id), 'quantity': 4},
+        {'product_id': str(second.id), 'quantity': 5},
+    ]
+
+    response = client.post(url, {'lines': lines, 'all_or_nothing': True}, content_type='application/json')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert [line['status'] for line in response.data['results']] == ['not_applied', 'insufficient_stock']
+    first.refresh_from_db()
+    assert first.stock == 10
+
+@pytest.mark.django_db
+def test_order_batch_create_view_unknown_product(client, django_capture_on_commit_callbacks):
+    product = Product.objects.create(sku='1111', name='First Product', stock=10)
+    url = reverse('create-order-batch')
+    lines = [
+        {'product_id': str(product.id), 'quantity': 1},
+        {'product_id': '11111111-1111-1111-1111-111111111111', 'quantity': 1},
+    ]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(url, {'lines': lines}, content_type='application/json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [line['status'] for line in response.data['results']] == ['ok', 'not_found']
+    product.refresh_from_db()
+    assert product.stock == 9
+
+@pytest.mark.django_db
+def test_order_batch_create_view_unknown_product_all_or_nothing(client, django_assert_max_num_queries):
+    product = Product.objects.create(sku='1111', name='First Product', stock=10)
+    url = reverse('create-order-batch')
+    lines = [
+        {'product_id': str(product.id), 'quantity': 1},
+        {'product_id': '11111111-1111-1111-1111-111111111111', 'quantity': 1},
+    ]
+
+    with django_assert_max_num_queries(1):
+        response = client.post(url, {'lines': lines, 'all_or_nothing': True}, content_type='application/json')
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['lines'][0] == {}
+    assert 'product_id' in response.data['lines'][1]